@@ -41,6 +41,9 @@ __all__ = [
         "counter",
         # Extra IVI base classes
         "extra",
+        # Background polling and data logging
+        "poll",
+        "datalog",
         # Generic IVI drivers
         "scpi",
         # IVI drivers
@@ -71,6 +71,8 @@ class agilent2000A(agilentBaseInfiniiVision, fgen.Base, fgen.StdFunc, fgen.Modul
         self._display_screenshot_image_format_mapping = ScreenshotImageFormatMapping
 
         # wavegen option
+        for op in ('memory_recall', 'system_load_setup'):
+            self._cache_invalidation[op] = self._cache_invalidation[op] + ['output_', 'am_', 'fm_']
         self._output_mode_list = OutputMode
         self._operation_mode_list = OperationMode
         self._output_count = 1
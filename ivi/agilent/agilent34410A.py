@@ -31,7 +31,7 @@ from .. import ivi
 from .. import dmm
 from .. import scpi
 
-class agilent34410A(scpi.dmm.Base):
+class agilent34410A(scpi.dmm.Base, scpi.common.Memory):
     "Agilent 34410A IVI DMM driver"
     
     def __init__(self, *args, **kwargs):
@@ -91,6 +91,7 @@ class agilent34410A(scpi.dmm.Base):
             raise OutOfRangeException()
         if not self._driver_operation_simulate:
             self._write("*sav %d" % index)
+            self._memory_store_snapshot(index)
     
     def _memory_recall(self, index):
         index = int(index)
@@ -98,6 +99,7 @@ class agilent34410A(scpi.dmm.Base):
             raise OutOfRangeException()
         if not self._driver_operation_simulate:
             self._write("*rcl %d" % index)
+            self._memory_restore_snapshot(index)
     
     def _get_memory_name(self, index):
         index = int(index)
@@ -26,10 +26,14 @@ THE SOFTWARE.
 
 from .. import ivi
 from .. import pwrmeter
+from .. import extra
 
 import time
 
-class agilent436A(ivi.Driver, pwrmeter.Base, pwrmeter.ZeroCorrection, pwrmeter.ManualRange):
+import numpy as np
+
+class agilent436A(ivi.Driver, pwrmeter.Base, pwrmeter.ZeroCorrection, pwrmeter.ManualRange,
+                extra.pwrmeter.BufferedAcquisition):
     "Agilent 436A RF power meter"
     
     def __init__(self, *args, **kwargs):
@@ -120,14 +124,11 @@ class agilent436A(ivi.Driver, pwrmeter.Base, pwrmeter.ZeroCorrection, pwrmeter.M
         #    error_message = error_message.strip(' "')
         return (error_code, error_message)
     
-    def _utility_lock_object(self):
-        pass
-    
     def _utility_reset(self):
         if not self._driver_operation_simulate:
             #self._write("*RST")
             self._clear()
-            self.driver_operation.invalidate_all_attributes()
+            self._invalidate_attributes('utility_reset')
     
     def _utility_reset_with_defaults(self):
         self._utility_reset()
@@ -142,9 +143,6 @@ class agilent436A(ivi.Driver, pwrmeter.Base, pwrmeter.ZeroCorrection, pwrmeter.M
         #return (code, message)
         raise ivi.OperationNotSupportedException()
     
-    def _utility_unlock_object(self):
-        pass
-    
     
     def _init_channels(self):
         try:
@@ -247,6 +245,28 @@ class agilent436A(ivi.Driver, pwrmeter.Base, pwrmeter.ZeroCorrection, pwrmeter.M
         self._measurement_initiate()
         return self._measurement_fetch()
     
+    def _buffered_initiate(self):
+        if self._buffered_trigger_source == 'immediate':
+            # free run at maximum rate
+            self._write("9+AR")
+    
+    def _buffered_trigger(self):
+        # trigger immediate, without settling time
+        self._write("9+AI")
+    
+    def _buffered_abort(self):
+        self._write("9+AH")
+    
+    def _buffered_parse(self, raw):
+        # fixed format readings: status, range, mode, then the value in
+        # columns 3 to 11
+        chars = np.array(raw, dtype='S12').view('S1').reshape(-1, 12)
+        values = np.ascontiguousarray(chars[:, 3:12]).view('S9').ravel().astype(float)
+        status = chars[:, 0]
+        values[status == b'R'] = float("inf")
+        values[(status == b'Q') | (status == b'S')] = float("-inf")
+        return values
+    
     def _get_channel_range_lower(self, index):
         index = ivi.get_index(self._channel_name, index)
         return self._channel_range_lower[index]
@@ -26,6 +26,7 @@ THE SOFTWARE.
 
 from .. import ivi
 from .. import pwrmeter
+from .. import extra
 
 import time
 
@@ -34,7 +35,7 @@ Units = set(['dBm', 'Watts'])
 class agilent437B(ivi.Driver, pwrmeter.Base, pwrmeter.ManualRange,
                 pwrmeter.DutyCycleCorrection, pwrmeter.AveragingCount,
                 pwrmeter.ZeroCorrection, pwrmeter.Calibration,
-                pwrmeter.ReferenceOscillator):
+                pwrmeter.ReferenceOscillator, extra.pwrmeter.BufferedAcquisition):
     "Agilent 437B RF power meter"
     
     def __init__(self, *args, **kwargs):
@@ -123,14 +124,11 @@ class agilent437B(ivi.Driver, pwrmeter.Base, pwrmeter.ManualRange,
         #    error_message = error_message.strip(' "')
         return (error_code, error_message)
     
-    def _utility_lock_object(self):
-        pass
-    
     def _utility_reset(self):
         if not self._driver_operation_simulate:
             self._write("*RST")
             self._clear()
-            self.driver_operation.invalidate_all_attributes()
+            self._invalidate_attributes('utility_reset')
     
     def _utility_reset_with_defaults(self):
         self._utility_reset()
@@ -145,9 +143,6 @@ class agilent437B(ivi.Driver, pwrmeter.Base, pwrmeter.ManualRange,
         return (code, message)
         raise ivi.OperationNotSupportedException()
     
-    def _utility_unlock_object(self):
-        pass
-    
     
     def _init_channels(self):
         try:
@@ -256,6 +251,19 @@ class agilent437B(ivi.Driver, pwrmeter.Base, pwrmeter.ManualRange,
         self._measurement_initiate()
         return self._measurement_fetch()
     
+    def _buffered_initiate(self):
+        if self._buffered_trigger_source == 'immediate':
+            # free run
+            self._write("TR3")
+        else:
+            self._write("TR0")
+    
+    def _buffered_trigger(self):
+        self._write("TR1")
+    
+    def _buffered_abort(self):
+        self._write("TR0")
+    
     def _get_channel_range_lower(self, index):
         index = ivi.get_index(self._channel_name, index)
         return self._channel_range_lower[index]
@@ -130,13 +130,10 @@ class agilent603xA(ivi.Driver, dcpwr.Base, dcpwr.Measurement):
             error_message = error_message.strip(' "')
         return (error_code, error_message)
     
-    def _utility_lock_object(self):
-        pass
-    
     def _utility_reset(self):
         if not self._driver_operation_simulate:
             self._write("CLR")
-            self.driver_operation.invalidate_all_attributes()
+            self._invalidate_attributes('utility_reset')
     
     def _utility_reset_with_defaults(self):
         self._utility_reset()
@@ -150,9 +147,6 @@ class agilent603xA(ivi.Driver, dcpwr.Base, dcpwr.Measurement):
                 message = "Self test failed"
         return (code, message)
     
-    def _utility_unlock_object(self):
-        pass
-    
     
     
     def _init_outputs(self):
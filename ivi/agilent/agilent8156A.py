@@ -147,14 +147,11 @@ class agilent8156A(ivi.Driver):
             error_message = error_message.strip(' "')
         return (error_code, error_message)
 
-    def _utility_lock_object(self):
-        pass
-
     def _utility_reset(self):
         if not self._driver_operation_simulate:
             self._write("*RST")
             self._clear()
-            self.driver_operation.invalidate_all_attributes()
+            self._invalidate_attributes('utility_reset')
 
     def _utility_reset_with_defaults(self):
         self._utility_reset()
@@ -168,9 +165,6 @@ class agilent8156A(ivi.Driver):
                 message = "Self test failed"
         return (code, message)
 
-    def _utility_unlock_object(self):
-        pass
-
 
 
     def _get_attenuation(self):
@@ -206,13 +206,10 @@ class agilent85644A(ivi.Driver, scpi.common.Memory):
             error_message = error_message.strip(' "')
         return (error_code, error_message)
 
-    def _utility_lock_object(self):
-        pass
-
     def _utility_reset(self):
         if not self._driver_operation_simulate:
             self._write("*RST")
-            self.driver_operation.invalidate_all_attributes()
+            self._invalidate_attributes('utility_reset')
 
     def _utility_reset_with_defaults(self):
         self._utility_reset()
@@ -229,9 +226,6 @@ class agilent85644A(ivi.Driver, scpi.common.Memory):
                 message = "Self test failed"
         return (code, message)
 
-    def _utility_unlock_object(self):
-        pass
-
 
     def _get_rf_frequency(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
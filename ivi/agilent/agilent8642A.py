@@ -236,13 +236,10 @@ class agilent8642A(ivi.Driver, rfsiggen.Base, rfsiggen.ModulateAM,
                 error_message = Messages[error_code]
         return (error_code, error_message)
     
-    def _utility_lock_object(self):
-        pass
-    
     def _utility_reset(self):
         if not self._driver_operation_simulate:
             self._write("IP")
-            self.driver_operation.invalidate_all_attributes()
+            self._invalidate_attributes('utility_reset')
     
     def _utility_reset_with_defaults(self):
         self._utility_reset()
@@ -252,9 +249,6 @@ class agilent8642A(ivi.Driver, rfsiggen.Base, rfsiggen.ModulateAM,
         message = "Self test passed"
         return (code, message)
     
-    def _utility_unlock_object(self):
-        pass
-    
     
     
     def _get_rf_frequency(self):
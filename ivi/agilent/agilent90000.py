@@ -306,7 +306,7 @@ class agilent90000(agilentBaseInfiniium):
         index = ivi.get_index(self._channel_name, index)
         
         if self._driver_operation_simulate:
-            return list()
+            return scope.Waveform(np.zeros(0))
         
         self._write(":waveform:byteorder msbfirst")
         self._write(":waveform:format word")
@@ -339,23 +339,12 @@ class agilent90000(agilentBaseInfiniium):
         # Read waveform data
         raw_data = self._read_ieee_block()
         
-        # Split out points and convert to time and voltage pairs
+        # Keep raw sample codes, scaled on demand by the Waveform object
         
-        data = list()
-        for i in range(points):
-            x = ((i - xreference) * xincrement) + xorigin
-            
-            yval = struct.unpack(">h", raw_data[i*2:i*2+2])[0]
-            
-            if yval == 31232:
-                # hole value
-                y = float('nan')
-            else:
-                y = ((yval - yreference) * yincrement) + yorigin
-            
-            data.append((x, y))
+        data = np.frombuffer(raw_data, '>i2', points)
         
-        return data
+        return scope.Waveform(data, xincrement, xorigin, xreference,
+                yincrement, yorigin, yreference, hole=31232)
     
     def _measurement_read_waveform(self, index, maximum_time):
         return self._measurement_fetch_waveform(index)
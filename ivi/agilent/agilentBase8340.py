@@ -124,13 +124,10 @@ class agilentBase8340(rfsiggen.Base, rfsiggen.ModulateAM, rfsiggen.ModulateFM,
         #        error_message = Messages[error_code]
         return (error_code, error_message)
 
-    def _utility_lock_object(self):
-        pass
-
     def _utility_reset(self):
         if not self._driver_operation_simulate:
             self._write("IP")
-            self.driver_operation.invalidate_all_attributes()
+            self._invalidate_attributes('utility_reset')
 
     def _utility_reset_with_defaults(self):
         self._utility_reset()
@@ -140,9 +137,6 @@ class agilentBase8340(rfsiggen.Base, rfsiggen.ModulateAM, rfsiggen.ModulateFM,
         message = "Self test passed"
         return (code, message)
 
-    def _utility_unlock_object(self):
-        pass
-
 
     def _memory_save(self, index):
         index = int(index)
@@ -150,6 +144,7 @@ class agilentBase8340(rfsiggen.Base, rfsiggen.ModulateAM, rfsiggen.ModulateFM,
             raise OutOfRangeException()
         if not self._driver_operation_simulate:
             self._write("SV %d" % (index+1))
+            self._memory_store_snapshot(index)
 
     def _memory_recall(self, index):
         index = int(index)
@@ -157,6 +152,7 @@ class agilentBase8340(rfsiggen.Base, rfsiggen.ModulateAM, rfsiggen.ModulateFM,
             raise OutOfRangeException()
         if not self._driver_operation_simulate:
             self._write("RC %d" % (index+1))
+            self._memory_restore_snapshot(index)
 
     def _system_fetch_setup(self):
         if self._driver_operation_simulate:
@@ -172,7 +168,7 @@ class agilentBase8340(rfsiggen.Base, rfsiggen.ModulateAM, rfsiggen.ModulateFM,
 
         self._write_raw(b'IL'+data)
 
-        self.driver_operation.invalidate_all_attributes()
+        self._invalidate_attributes('system_load_setup')
 
     def _get_rf_frequency(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
@@ -58,6 +58,30 @@ class agilentBase8590(ivi.Driver, specan.Base,
         
         super(agilentBase8590, self).__init__(*args, **kwargs)
         
+        self._cache_dependencies.update({
+            'frequency_start': ['frequency_center', 'frequency_span',
+                    'sweep_coupling_resolution_bandwidth', 'sweep_coupling_sweep_time',
+                    'sweep_coupling_video_bandwidth'],
+            'frequency_stop': ['frequency_center', 'frequency_span',
+                    'sweep_coupling_resolution_bandwidth', 'sweep_coupling_sweep_time',
+                    'sweep_coupling_video_bandwidth'],
+            'frequency_center': ['frequency_start', 'frequency_stop',
+                    'sweep_coupling_resolution_bandwidth', 'sweep_coupling_sweep_time',
+                    'sweep_coupling_video_bandwidth'],
+            'frequency_span': ['frequency_start', 'frequency_stop',
+                    'sweep_coupling_resolution_bandwidth', 'sweep_coupling_sweep_time',
+                    'sweep_coupling_video_bandwidth'],
+            'rf_power_mode': ['rf_power_span'],
+            'rf_power_offset': ['rf_level'],
+            'rf_power_span': ['rf_power_mode'],
+            'acquisition_vertical_scale': ['level_reference']
+        })
+        # settings replaced by a recalled or loaded instrument state
+        self._cache_invalidation.update({
+            'memory_recall': ['acquisition_', 'alc_', 'frequency_', 'level_', 'rf_', 'sweep_'],
+            'system_load_setup': ['acquisition_', 'alc_', 'frequency_', 'level_', 'rf_', 'sweep_']
+        })
+
         self._trace_count = 3
 
         self._memory_size = 9
@@ -181,7 +205,8 @@ class agilentBase8590(ivi.Driver, specan.Base,
             
             self._identity_instrument_manufacturer = "Agilent Technologies"
             self._identity_instrument_model = self._ask("ID?")
-            self._identity_instrument_firmware_revision = self._ask("REV?")
+            self._check_identity_cache(self._identity_instrument_model)
+            self._identity_instrument_firmware_revision = self._ask_static("REV?")
             self._set_cache_valid(True, 'identity_instrument_manufacturer')
             self._set_cache_valid(True, 'identity_instrument_model')
             self._set_cache_valid(True, 'identity_instrument_firmware_revision')
@@ -217,13 +242,10 @@ class agilentBase8590(ivi.Driver, specan.Base,
             error_message = error_message.strip(' "')
         return (error_code, error_message)
     
-    def _utility_lock_object(self):
-        pass
-    
     def _utility_reset(self):
         if not self._driver_operation_simulate:
             self._write("IP")
-            self.driver_operation.invalidate_all_attributes()
+            self._invalidate_attributes('utility_reset')
     
     def _utility_reset_with_defaults(self):
         self._utility_reset()
@@ -241,9 +263,6 @@ class agilentBase8590(ivi.Driver, specan.Base,
                 message = "Self test failed"
         return (code, message)
     
-    def _utility_unlock_object(self):
-        pass
-
 
 
     def _init_traces(self):
@@ -273,6 +292,8 @@ class agilentBase8590(ivi.Driver, specan.Base,
             return
         
         self._write_raw(data)
+        
+        self._invalidate_attributes('system_load_setup')
     
     def _system_display_string(self, string=None):
         if string is None:
@@ -331,15 +352,16 @@ class agilentBase8590(ivi.Driver, specan.Base,
         if index < 0 or index >= self._memory_size:
             raise OutOfRangeException()
         if not self._driver_operation_simulate:
-            self._write("SAVES %d" % index+1)
+            self._write("SAVES %d" % (index+1))
+            self._memory_store_snapshot(index)
     
     def _memory_recall(self, index):
         index = int(index)
         if index < 0 or index >= self._memory_size:
             raise OutOfRangeException()
         if not self._driver_operation_simulate:
-            self._write("RCLS %d" % index+1)
-            self.driver_operation.invalidate_all_attributes()
+            self._write("RCLS %d" % (index+1))
+            self._memory_restore_snapshot(index)
 
     def _get_rf_level(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
@@ -400,8 +422,8 @@ class agilentBase8590(ivi.Driver, specan.Base,
         if not self._driver_operation_simulate:
             self._write("srcpswp %s" % ('on' if value == 'sweep' else 'off'))
         self._rf_power_mode = value
-        self._set_cache_valid(False, 'rf_power_span')
         self._set_cache_valid()
+        self._invalidate_dependencies('rf_power_mode')
 
     def _get_rf_power_offset(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
@@ -415,7 +437,7 @@ class agilentBase8590(ivi.Driver, specan.Base,
             self._write("srcpofs %e" % value)
         self._rf_power_offset = value
         self._set_cache_valid()
-        self._set_cache_valid(False, 'rf_level')
+        self._invalidate_dependencies('rf_power_offset')
 
     def _get_rf_power_span(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
@@ -428,8 +450,8 @@ class agilentBase8590(ivi.Driver, specan.Base,
         if not self._driver_operation_simulate:
             self._write("srcpswp %e" % value)
         self._rf_power_span = value
-        self._set_cache_valid(False, 'rf_power_mode')
         self._set_cache_valid()
+        self._invalidate_dependencies('rf_power_span')
 
     def _get_rf_tracking_adjust(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
@@ -540,11 +562,7 @@ class agilentBase8590(ivi.Driver, specan.Base,
             self._write("fa %f" % value)
         self._frequency_start = value
         self._set_cache_valid()
-        self._set_cache_valid(False, 'frequency_center')
-        self._set_cache_valid(False, 'frequency_span')
-        self._set_cache_valid(False, 'sweep_coupling_resolution_bandwidth')
-        self._set_cache_valid(False, 'sweep_coupling_sweep_time')
-        self._set_cache_valid(False, 'sweep_coupling_video_bandwidth')
+        self._invalidate_dependencies('frequency_start')
     
     def _get_frequency_stop(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
@@ -558,11 +576,7 @@ class agilentBase8590(ivi.Driver, specan.Base,
             self._write("fb %f" % value)
         self._frequency_stop = value
         self._set_cache_valid()
-        self._set_cache_valid(False, 'frequency_center')
-        self._set_cache_valid(False, 'frequency_span')
-        self._set_cache_valid(False, 'sweep_coupling_resolution_bandwidth')
-        self._set_cache_valid(False, 'sweep_coupling_sweep_time')
-        self._set_cache_valid(False, 'sweep_coupling_video_bandwidth')
+        self._invalidate_dependencies('frequency_stop')
 
     def _get_frequency_center(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
@@ -576,11 +590,7 @@ class agilentBase8590(ivi.Driver, specan.Base,
             self._write("cf %f" % value)
         self._frequency_center = value
         self._set_cache_valid()
-        self._set_cache_valid(False, 'frequency_start')
-        self._set_cache_valid(False, 'frequency_stop')
-        self._set_cache_valid(False, 'sweep_coupling_resolution_bandwidth')
-        self._set_cache_valid(False, 'sweep_coupling_sweep_time')
-        self._set_cache_valid(False, 'sweep_coupling_video_bandwidth')
+        self._invalidate_dependencies('frequency_center')
 
     def _get_frequency_span(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
@@ -594,11 +604,7 @@ class agilentBase8590(ivi.Driver, specan.Base,
             self._write("sp %f" % value)
         self._frequency_span = value
         self._set_cache_valid()
-        self._set_cache_valid(False, 'frequency_start')
-        self._set_cache_valid(False, 'frequency_stop')
-        self._set_cache_valid(False, 'sweep_coupling_resolution_bandwidth')
-        self._set_cache_valid(False, 'sweep_coupling_sweep_time')
-        self._set_cache_valid(False, 'sweep_coupling_video_bandwidth')
+        self._invalidate_dependencies('frequency_span')
     
     def _get_frequency_offset(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
@@ -744,7 +750,7 @@ class agilentBase8590(ivi.Driver, specan.Base,
                 self._write('ln')
         self._acquisition_vertical_scale = value
         self._set_cache_valid()
-        self._set_cache_valid(False, 'level_reference')
+        self._invalidate_dependencies('acquisition_vertical_scale')
     
     def _get_sweep_coupling_video_bandwidth(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
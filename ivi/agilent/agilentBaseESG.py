@@ -59,6 +59,20 @@ class agilentBaseESG(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
         self._self_test_delay = 40
         self._memory_size = 1000
 
+        self._reset_defaults.update({
+            'rf_frequency_multiplier': 1,
+            'rf_frequency_offset': 0.0,
+            'rf_frequency_reference_enabled': False,
+            'rf_level_offset': 0.0,
+            'rf_level_reference_enabled': False,
+            'rf_output_enabled': False,
+            'alc_enabled': True,
+            'analog_modulation_am_enabled': False,
+            'analog_modulation_fm_enabled': False,
+            'analog_modulation_pm_enabled': False,
+            'pulse_modulation_enabled': False
+        })
+
         self._rf_frequency_multiplier = 1
         self._rf_frequency_offset = 0.0
         self._rf_frequency_reference = 0.0
@@ -130,12 +144,6 @@ class agilentBaseESG(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
     def _utility_disable(self):
         pass
 
-    def _utility_lock_object(self):
-        pass
-
-    def _utility_unlock_object(self):
-        pass
-
 
     def _load_catalog(self):
         self._catalog = list()
@@ -156,6 +164,7 @@ class agilentBaseESG(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
         seq = int(index/100)
         if not self._driver_operation_simulate:
             self._write("*sav %d, %d" % (reg, seq))
+            self._memory_store_snapshot(index)
 
     def _memory_recall(self, index):
         index = int(index)
@@ -165,7 +174,7 @@ class agilentBaseESG(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common
         seq = int(index/100)
         if not self._driver_operation_simulate:
             self._write("*rcl %d, %d" % (reg, seq))
-            self.driver_operation.invalidate_all_attributes()
+            self._memory_restore_snapshot(index)
 
     def _get_rf_frequency(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
@@ -81,7 +81,12 @@ class agilentBaseInfiniium(agilentBaseScope):
 
         self._display_screenshot_image_format_mapping = ScreenshotImageFormatMapping
         self._display_color_grade = False
-        
+
+        # inputs are 50 ohm only and the default timebase depends on the model
+        self._reset_defaults['channel_input_impedance'] = 50
+        for tag in ['timebase_range', 'timebase_scale', 'acquisition_time_per_record']:
+            self._reset_defaults.pop(tag, None)
+
         self._identity_description = "Agilent Infiniium series IVI oscilloscope driver"
         self._identity_supported_instrument_models = ['DSO90254A','DSO90404A','DSO90604A',
                 'DSO90804A','DSO91204A','DSO91304A','DSOX91304A','DSOX91604A','DSOX92004A',
@@ -211,7 +216,7 @@ class agilentBaseInfiniium(agilentBaseScope):
         index = ivi.get_index(self._channel_name, index)
         
         if self._driver_operation_simulate:
-            return list()
+            return scope.Waveform(np.zeros(0))
         
         self._write(":waveform:byteorder msbfirst")
         self._write(":waveform:format word")
@@ -243,23 +248,12 @@ class agilentBaseInfiniium(agilentBaseScope):
         # Read waveform data
         raw_data = self._read_ieee_block()
         
-        # Split out points and convert to time and voltage pairs
+        # Keep raw sample codes, scaled on demand by the Waveform object
         
-        data = list()
-        for i in range(points):
-            x = ((i - xreference) * xincrement) + xorigin
-            
-            yval = struct.unpack(">h", raw_data[i*2:i*2+2])[0]
-            
-            if yval == 31232:
-                # hole value
-                y = float('nan')
-            else:
-                y = ((yval - yreference) * yincrement) + yorigin
-            
-            data.append((x, y))
+        data = np.frombuffer(raw_data, '>i2', points)
         
-        return data
+        return scope.Waveform(data, xincrement, xorigin, xreference,
+                yincrement, yorigin, yreference, hole=31232)
     
     def _measurement_read_waveform(self, index, maximum_time):
         return self._measurement_fetch_waveform(index)
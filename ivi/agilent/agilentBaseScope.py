@@ -27,6 +27,8 @@ THE SOFTWARE.
 import time
 import struct
 
+import numpy as np
+
 from .. import ivi
 from .. import scope
 from .. import scpi
@@ -197,6 +199,49 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
         self._horizontal_divisions = 10
         self._vertical_divisions = 8
         
+        self._write_batch_supported = True
+        self._cache_dependencies.update({
+            'acquisition_time_per_record': ['acquisition_start_time', 'timebase_range', 'timebase_scale'],
+            'acquisition_start_time': ['timebase_position'],
+            'timebase_range': ['acquisition_time_per_record', 'acquisition_start_time'],
+            'timebase_scale': ['acquisition_time_per_record', 'acquisition_start_time'],
+            'timebase_position': ['acquisition_start_time'],
+            'channel_probe_attenuation': ['channel_range', 'channel_scale', 'channel_offset']
+        })
+        # settings replaced by a recalled or loaded setup
+        self._cache_invalidation.update({
+            'memory_recall': ['acquisition_', 'channel_', 'display_', 'timebase_', 'trigger_'],
+            'system_load_setup': ['acquisition_', 'channel_', 'display_', 'timebase_', 'trigger_']
+        })
+        self._reset_defaults.update({
+            'acquisition_type': 'normal',
+            'channel_bw_limit': False,
+            'channel_coupling': 'dc',
+            'channel_input_impedance': 1000000,
+            'channel_invert': False,
+            'channel_offset': 0.0,
+            'timebase_mode': 'main',
+            'timebase_position': 0.0,
+            'timebase_range': 1e-3,
+            'timebase_reference': 'center',
+            'timebase_scale': 100e-6,
+            'acquisition_time_per_record': 1e-3,
+            'trigger_coupling': 'dc',
+            'trigger_edge_slope': 'positive',
+            'trigger_level': 0.0,
+            'trigger_type': 'edge'
+        })
+        self._state_dependencies = {
+            'channels.range': ['channels.probe_attenuation', 'channels.input_impedance'],
+            'channels.scale': ['channels.probe_attenuation', 'channels.input_impedance'],
+            'channels.offset': ['channels.range', 'channels.scale'],
+            'timebase.position': ['timebase.range', 'timebase.scale', 'timebase.reference'],
+            'timebase.window.position': ['timebase.window.range', 'timebase.window.scale'],
+            'trigger.level': ['trigger.source', 'trigger.type', 'channels.range', 'channels.offset'],
+            'trigger.edge.slope': ['trigger.type'],
+            'acquisition.number_of_averages': ['acquisition.type']
+        }
+        
         self._acquisition_segmented_count = 2
         self._acquisition_segmented_index = 1
         self._timebase_mode = 'main'
@@ -482,12 +527,6 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
     def _utility_disable(self):
         pass
     
-    def _utility_lock_object(self):
-        pass
-    
-    def _utility_unlock_object(self):
-        pass
-    
     def _init_channels(self):
         try:
             super(agilentBaseScope, self)._init_channels()
@@ -546,7 +585,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
         
         self._write_ieee_block(data, ':system:setup ')
         
-        self.driver_operation.invalidate_all_attributes()
+        self._invalidate_attributes('system_load_setup')
     
     def _system_display_string(self, string = None):
         if string is None:
@@ -651,6 +690,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
             self._write(":timebase:position %e" % value)
         self._timebase_position = value
         self._set_cache_valid()
+        self._invalidate_dependencies('timebase_position')
         
     def _get_timebase_range(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
@@ -667,6 +707,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
         self._timebase_range = value
         self._timebase_scale = value / self._horizontal_divisions
         self._set_cache_valid()
+        self._invalidate_dependencies('timebase_range')
         self._set_cache_valid(True, 'timebase_scale')
         
     def _get_timebase_scale(self):
@@ -684,6 +725,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
         self._timebase_scale = value
         self._timebase_range = value * self._horizontal_divisions
         self._set_cache_valid()
+        self._invalidate_dependencies('timebase_scale')
         self._set_cache_valid(True, 'timebase_range')
         
     def _get_timebase_window_position(self):
@@ -776,6 +818,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
             self._write(":timebase:position %e" % value)
         self._acquisition_start_time = value
         self._set_cache_valid()
+        self._invalidate_dependencies('acquisition_start_time')
     
     def _get_acquisition_type(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
@@ -817,7 +860,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
             self._write(":timebase:range %e" % value)
         self._acquisition_time_per_record = value
         self._set_cache_valid()
-        self._set_cache_valid(False, 'acquisition_start_time')
+        self._invalidate_dependencies('acquisition_time_per_record')
     
     def _get_channel_label(self, index):
         index = ivi.get_index(self._channel_name, index)
@@ -899,6 +942,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
             self._write(":%s:probe %e" % (self._channel_name[index], value))
         self._channel_probe_attenuation[index] = value
         self._set_cache_valid(index=index)
+        self._invalidate_dependencies('channel_probe_attenuation', index)
     
     def _get_channel_probe_skew(self, index):
         index = ivi.get_index(self._analog_channel_name, index)
@@ -1306,7 +1350,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
         index = ivi.get_index(self._channel_name, index)
         
         if self._driver_operation_simulate:
-            return list()
+            return scope.Waveform(np.zeros(0))
         
         self._write(":waveform:byteorder msbfirst")
         self._write(":waveform:unsigned 1")
@@ -1340,23 +1384,12 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
         # Read waveform data
         raw_data = raw_data = self._read_ieee_block()
         
-        # Split out points and convert to time and voltage pairs
+        # Keep raw sample codes, scaled on demand by the Waveform object
         
-        data = list()
-        for i in range(points):
-            x = ((i - xreference) * xincrement) + xorigin
-            
-            yval = struct.unpack(">H", raw_data[i*2:i*2+2])[0]
-            
-            if yval == 0:
-                # hole value
-                y = float('nan')
-            else:
-                y = ((yval - yreference) * yincrement) + yorigin
-            
-            data.append((x, y))
+        data = np.frombuffer(raw_data, '>u2', points)
         
-        return data
+        return scope.Waveform(data, xincrement, xorigin, xreference,
+                yincrement, yorigin, yreference, hole=0)
     
     def _measurement_read_waveform(self, index, maximum_time):
         return self._measurement_fetch_waveform(index)
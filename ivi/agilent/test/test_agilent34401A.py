@@ -24,177 +24,18 @@ THE SOFTWARE.
 
 """
 
-import io
 import unittest
 
 from .. import agilent34401A
+from ...interface import middleware
+from ...test import virtual
 
-class Virtual34401A(object):
+class Virtual34401A(virtual.VirtualDmm):
     def __init__(self):
-        self.read_buffer = io.BytesIO()
-        self.tx_log = list()
-        self.rx_log = list()
-        self.cmd_log = list()
-
-        self.cmds = {
-            '*cls' : None,
-            '*idn?' : str,
-            '*rst' : None,
-            '*trg' : None,
-            '*tst?' : int,
-            'system:error?' : str,
-            'abort' : None,
-            'fetch?' : float,
-            'initiate' : None,
-            'read?' : float,
-            'sense:function' : 'qstr',
-            'sense:function?' : 'qstr',
-            'volt:dc:range' : float,
-            'volt:dc:range?' : float,
-            'volt:ac:range' : float,
-            'volt:ac:range?' : float,
-            'curr:dc:range' : float,
-            'curr:dc:range?' : float,
-            'curr:ac:range' : float,
-            'curr:ac:range?' : float,
-            'res:range' : float,
-            'res:range?' : float,
-            'fres:range' : float,
-            'fres:range?' : float,
-            'freq:range:lower' : float,
-            'freq:range:lower?' : float,
-            'per:range:lower' : float,
-            'per:range:lower?' : float,
-            'cap:range' : float,
-            'cap:range?' : float,
-            'volt:dc:range:auto' : int,
-            'volt:dc:range:auto?' : int,
-            'volt:ac:range:auto' : int,
-            'volt:ac:range:auto?' : int,
-            'curr:dc:range:auto' : int,
-            'curr:dc:range:auto?' : int,
-            'curr:ac:range:auto' : int,
-            'curr:ac:range:auto?' : int,
-            'res:range:auto' : int,
-            'res:range:auto?' : int,
-            'fres:range:auto' : int,
-            'fres:range:auto?' : int,
-            'freq:range:auto' : int,
-            'freq:range:auto?' : int,
-            'per:range:auto' : int,
-            'per:range:auto?' : int,
-            'cap:range:auto' : int,
-            'cap:range:auto?' : int,
-            'volt:dc:resolution' : float,
-            'volt:dc:resolution?' : float,
-            'volt:ac:resolution' : float,
-            'volt:ac:resolution?' : float,
-            'curr:dc:resolution' : float,
-            'curr:dc:resolution?' : float,
-            'curr:ac:resolution' : float,
-            'curr:ac:resolution?' : float,
-            'res:resolution' : float,
-            'res:resolution?' : float,
-            'fres:resolution' : float,
-            'fres:resolution?' : float,
-            'trigger:delay' : float,
-            'trigger:delay?' : float,
-            'trigger:delay:auto' : int,
-            'trigger:delay:auto?' : int,
-            'trigger:source' : str,
-            'trigger:source?' : str,
-            'sample:count' : int,
-            'sample:count?' : int,
-            'trigger:count' : int,
-            'trigger:count?' : int,
-        }
-        self.vals = {
-            '*idn' : 'HEWLETT-PACKARD,34401A,0,1.7-5.0-1.0',
-            '*tst' : 0,
-            'system:error' : '+0,"No error"',
-            'fetch?' : 1.0,
-            'read?' : 1.0,
-            'sense:function' : 'dc_volts',
-            'volt:dc:range' : 1.0,
-            'volt:ac:range' : 1.0,
-            'curr:dc:range' : 1.0,
-            'curr:ac:range' : 1.0,
-            'res:range' : 1.0,
-            'fres:range' : 1.0,
-            'freq:range:lower' : 1.0,
-            'per:range:lower' : 1.0,
-            'cap:range' : 1.0,
-            'volt:dc:range:auto' : 1,
-            'volt:ac:range:auto' : 1,
-            'curr:dc:range:auto' : 1,
-            'curr:ac:range:auto' : 1,
-            'res:range:auto' : 1,
-            'fres:range:auto' : 1,
-            'freq:range:auto' : 1,
-            'per:range:auto' : 1,
-            'cap:range:auto' : 1,
-            'volt:dc:resolution' : 0.001,
-            'volt:ac:resolution' : 0.001,
-            'curr:dc:resolution' : 0.001,
-            'curr:ac:resolution' : 0.001,
-            'res:resolution' : 0.001,
-            'fres:resolution' : 0.001,
-            'trigger:delay' : 0.01,
-            'trigger:delay:auto' : 1,
-            'trigger:source' : 'imm',
-            'sample:count' : 1,
-            'trigger:count' : 1,
-        }
+        super(Virtual34401A, self).__init__('HEWLETT-PACKARD,34401A,0,1.7-5.0-1.0', strict=True)
 
         for n in range(4):
-            ch = 'output%d' % (n+1)
-            self.cmds[ch+':voltage'] = float
-            self.cmds[ch+':voltage?'] = float
-            self.vals[ch+':voltage'] = 0.0
-
-    def write_raw(self, data):
-        self.rx_log.append(data)
-        cmd = data.split(b' ')[0].decode()
-
-        print("Got command %s" % cmd)
-
-        cmd = cmd.lower().lstrip(':')
-
-        self.cmd_log.append(cmd)
-
-        t = self.cmds[cmd]
-
-        if '?' in cmd:
-            cmd = cmd.strip('?')
-
-            if t is int:
-                d = '{0:+d}'.format(self.vals[cmd]).encode()
-                self.tx_log.append(d)
-                self.read_buffer = io.BytesIO(d)
-            elif t is float:
-                d = '{0:+E}'.format(self.vals[cmd]).encode()
-                self.tx_log.append(d)
-                self.read_buffer = io.BytesIO(d)
-            elif t is str:
-                d = self.vals[cmd].encode()
-                self.tx_log.append(d)
-                self.read_buffer = io.BytesIO(d)
-            elif t == 'qstr':
-                d = '"{0}"'.format(self.vals[cmd]).encode()
-                self.tx_log.append(d)
-                self.read_buffer = io.BytesIO(d)
-        else:
-            if t is int:
-                self.vals[cmd] = int(data.split(b' ')[1].decode())
-            elif t is float:
-                self.vals[cmd] = float(data.split(b' ')[1].decode())
-            elif t is str:
-                self.vals[cmd] = data.split(b' ')[1].decode()
-            elif t == 'qstr':
-                self.vals[cmd] = data.split(b' ')[1].decode().strip("'\"")
-
-    def read_raw(self, num=-1):
-        return self.read_buffer.read(num)
+            self.add_command('OUTPut%d:VOLTage' % (n+1), float, 0.0)
 
 
 class TestAgilent34401A(unittest.TestCase):
@@ -213,6 +54,35 @@ class TestAgilent34401A(unittest.TestCase):
         self.dmm.utility.reset()
         self.assertEqual('*rst' in self.vdmm.cmd_log, True)
 
+    def test_reset_invalidation(self):
+        self.assertEqual(self.dmm.identity.instrument_model, '34401A')
+        self.dmm.trigger.delay = 0.1
+        self.dmm.utility.reset()
+        self.vdmm.cmd_log = list()
+        self.assertEqual(self.dmm.identity.instrument_model, '34401A')
+        self.assertEqual(self.dmm.measurement_function, 'dc_volts')
+        self.assertEqual(self.dmm.trigger.source, 'immediate')
+        self.assertEqual(self.vdmm.cmd_log, [])
+        self.assertEqual(self.dmm.trigger.delay, 0.01)
+        self.assertEqual(self.vdmm.cmd_log, ['trigger:delay?'])
+        self.assertEqual(self.dmm.driver_operation.cache_stats['saved'], 3)
+
+    def test_prefetch(self):
+        n = len(self.vdmm.rx_log)
+        self.dmm.driver_operation.prefetch(['trigger.delay', 'trigger.source',
+                'measurement_function', 'range'])
+        # the range query depends on the measurement function
+        self.assertEqual(len(self.vdmm.rx_log), n + 2)
+        self.vdmm.cmd_log = list()
+        self.assertEqual(self.dmm.trigger.delay, 0.01)
+        self.assertEqual(self.dmm.trigger.source, 'immediate')
+        self.assertEqual(self.dmm.measurement_function, 'dc_volts')
+        self.assertEqual(self.vdmm.cmd_log, [])
+        self.dmm.trigger.delay = 0.1
+        stats = self.dmm.driver_operation.cache_stats
+        self.assertEqual(stats['attributes']['trigger_delay']['hits'], 1)
+        self.assertEqual(stats['attributes']['trigger_delay']['misses'], 0)
+
     def test_self_test(self):
         self.dmm._self_test_delay = 0
         self.assertEqual(self.dmm.utility.self_test(), (0, 'Self test passed'))
@@ -220,7 +90,7 @@ class TestAgilent34401A(unittest.TestCase):
 
     def test_error_query(self):
         self.assertEqual(self.dmm.utility.error_query(), (0, 'No error'))
-        self.vdmm.vals['system:error'] = '-113,"Undefined header"'
+        self.vdmm.push_error(-113, "Undefined header")
         self.assertEqual(self.dmm.utility.error_query(), (-113, 'Undefined header'))
 
     def test_measurement_function(self):
@@ -438,3 +308,43 @@ class TestAgilent34401A(unittest.TestCase):
         self.dmm.send_software_trigger()
         self.assertEqual('*trg' in self.vdmm.cmd_log, True)
 
+    def test_apply_state(self):
+        self.dmm.measurement_function = 'dc_volts'
+        self.dmm.range = 1.0
+        self.dmm.trigger.delay = 0.01
+        self.vdmm.cmd_log = list()
+        self.assertEqual(self.dmm.apply_state({'trigger.delay': 0.01, 'range': 1.0}), [])
+        self.assertEqual(self.vdmm.cmd_log, [])
+        self.assertEqual(self.dmm.apply_state({'trigger.delay': 0.1, 'range': 1.0,
+                'measurement_function': 'dc_volts'}), ['trigger.delay'])
+        self.assertEqual(self.vdmm.cmd_log, ['trigger:delay'])
+        self.vdmm.cmd_log = list()
+        self.dmm.apply_state({'range': 10.0, 'measurement_function': 'ac_volts'})
+        self.assertEqual(self.vdmm.cmd_log, ['sense:function', 'volt:ac:range'])
+        self.assertEqual(self.vdmm.vals['volt:ac:range'], 10.0)
+
+    def test_apply_state_failed(self):
+        self.dmm.trigger.delay = 0.01
+        self.dmm.trigger.delay
+        stats = self.dmm.driver_operation.cache_stats['attributes']['trigger_delay']
+        # state handling does not count as cache hits
+        self.dmm.apply_state({'trigger.delay': 0.01})
+        self.dmm.capture_state(['trigger.delay'])
+        self.assertEqual(self.dmm.driver_operation.cache_stats['attributes']['trigger_delay'], stats)
+        fault = middleware.FaultInjection(error_rate=1)
+        self.dmm.add_middleware(fault)
+        with self.assertRaises(IOError):
+            self.dmm.apply_state({'trigger.delay': 0.1, 'trigger.source': 'bus'})
+        fault.error_rate = 0
+        self.vdmm.cmd_log = list()
+        self.assertEqual(self.dmm.trigger.delay, 0.01)
+        self.assertEqual(self.vdmm.cmd_log, ['trigger:delay?'])
+
+    def test_capture_state(self):
+        self.dmm.measurement_function = 'dc_volts'
+        self.dmm.trigger.source = 'bus'
+        state = self.dmm.capture_state(['measurement_function', 'trigger.source'])
+        self.assertEqual(state, {'measurement_function': 'dc_volts', 'trigger.source': 'bus'})
+        self.vdmm.cmd_log = list()
+        self.assertEqual(self.dmm.apply_state(state), [])
+        self.assertEqual(self.vdmm.cmd_log, [])
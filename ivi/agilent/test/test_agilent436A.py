@@ -0,0 +1,71 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import unittest
+
+from .. import agilent436A
+
+class Talker436A(object):
+    "Talks a fixed sequence of readings, like a 436A addressed to talk"
+
+    def __init__(self, readings):
+        self.readings = readings
+        self.index = 0
+        self.writes = list()
+        self.term_char = None
+
+    def write_raw(self, data):
+        self.writes.append(data)
+
+    def read_raw(self, num=-1):
+        data = self.readings[self.index % len(self.readings)]
+        self.index += 1
+        return data
+
+    def clear(self):
+        pass
+
+
+class TestAgilent436A(unittest.TestCase):
+
+    def test_buffered_read(self):
+        talker = Talker436A([b'PA +1234E-03\r\n', b'RA +9999E+00\r\n', b'SA -7000E-02\r\n'])
+        pm = agilent436A(talker)
+        pm.buffered.configure(1000, 'immediate')
+        t, values = pm.buffered.read()
+        self.assertEqual(len(t), 1000)
+        self.assertEqual(len(values), 1000)
+        self.assertTrue(all(t[1:] >= t[:-1]))
+        self.assertEqual(list(values[:3]), [1.234, float('inf'), float('-inf')])
+        self.assertEqual(talker.writes, [b'9+AR', b'9+AH'])
+
+        pm.buffered.configure(2, 'software')
+        talker.writes = list()
+        pm.buffered.read()
+        self.assertEqual(talker.writes, [b'9+AI', b'9+AI', b'9+AH'])
+
+if __name__ == '__main__':
+    unittest.main()
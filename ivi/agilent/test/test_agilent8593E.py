@@ -0,0 +1,57 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import unittest
+
+from .. import agilent8593E
+from ... import ivi
+from ...test import virtual
+
+class TestAgilent8593E(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_directory = ivi.get_cache_directory()
+        ivi.set_cache_directory(None)
+        self.vsa = virtual.VirtualInstrument(idn='HP8593E')
+        self.vsa.add_command('ID?', handler=lambda c, k, a, q: 'HP8593E')
+        self.vsa.add_command('CF', float, 1e9)
+        self.vsa.add_command('SAVES', int, 0)
+        self.vsa.add_command('RCLS', int, 0)
+        self.sa = agilent8593E(self.vsa)
+
+    def tearDown(self):
+        ivi.set_cache_directory(self.cache_directory)
+
+    def test_memory(self):
+        self.sa.frequency.center = 2e9
+        self.sa.memory.save(1)
+        self.assertEqual(self.vsa.vals['saves'], 2)
+        self.sa.frequency.center = 3e9
+        self.sa.memory.recall(1)
+        self.assertEqual(self.vsa.vals['rcls'], 2)
+        self.vsa.cmd_log = list()
+        self.assertEqual(self.sa.frequency.center, 2e9)
+        self.assertEqual(self.vsa.cmd_log, [])
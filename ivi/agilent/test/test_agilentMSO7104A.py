@@ -0,0 +1,131 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import shutil
+import tempfile
+import unittest
+
+from .. import agilentMSO7104A, agilentDSO90254A
+from ... import ivi
+from ...test import virtual
+
+class TestAgilentMSO7104A(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_directory = ivi.get_cache_directory()
+        ivi.set_cache_directory(None)
+        self.vscope = virtual.VirtualScope()
+        self.scope = agilentMSO7104A(self.vscope)
+
+    def tearDown(self):
+        ivi.set_cache_directory(self.cache_directory)
+
+    def test_dependencies(self):
+        self.assertEqual(self.scope.channels[0].range, 8.0)
+        self.assertEqual(self.scope.channels[1].range, 8.0)
+        self.scope.channels[0].probe_attenuation = 10
+        self.vscope.cmd_log = list()
+        self.scope.channels[0].range
+        self.scope.channels[1].range
+        self.assertEqual(self.vscope.cmd_log, ['channel1:range?'])
+
+    def test_memory_recall(self):
+        self.assertEqual(self.scope.identity.instrument_model, 'MSO7104A')
+        self.scope.timebase.scale
+        self.scope.memory.recall(1)
+        self.vscope.cmd_log = list()
+        self.scope.timebase.scale
+        self.scope.identity.instrument_model
+        self.assertEqual(self.vscope.cmd_log, ['timebase:scale?'])
+
+    def test_memory_snapshot(self):
+        self.scope.timebase.scale = 2e-3
+        self.scope.memory.save(1)
+        self.scope.timebase.scale = 5e-3
+        self.scope.memory.recall(1)
+        self.assertEqual(self.vscope.vals['timebase:scale'], 2e-3)
+        self.vscope.cmd_log = list()
+        self.assertEqual(self.scope.timebase.scale, 2e-3)
+        self.assertEqual(self.vscope.cmd_log, [])
+        # no snapshot stored for this slot
+        self.vscope.saved[2] = dict(self.vscope.vals)
+        self.scope.memory.recall(2)
+        self.vscope.cmd_log = list()
+        self.scope.timebase.scale
+        self.assertEqual(self.vscope.cmd_log, ['timebase:scale?'])
+
+    def test_memory_snapshot_persistent(self):
+        directory = tempfile.mkdtemp()
+        try:
+            ivi.set_cache_directory(directory)
+            self.scope.timebase.scale = 2e-3
+            self.scope.memory.save(1)
+            scope = agilentMSO7104A(self.vscope)
+            scope.memory.recall(1)
+            self.vscope.cmd_log = list()
+            self.assertEqual(scope.timebase.scale, 2e-3)
+            self.assertEqual(self.vscope.cmd_log, [])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_memory_verify(self):
+        self.scope.memory.verify = True
+        self.scope.timebase.scale = 2e-3
+        self.scope.memory.save(1)
+        self.scope.memory.recall(1)
+        self.vscope.cmd_log = list()
+        self.assertEqual(self.scope.timebase.scale, 2e-3)
+        self.assertEqual(self.vscope.cmd_log, [])
+        # stored state changed from the front panel
+        self.vscope.saved[1]['timebase:scale'] = 7e-3
+        self.scope.memory.recall(1)
+        self.vscope.cmd_log = list()
+        self.assertEqual(self.scope.timebase.scale, 7e-3)
+        self.assertEqual(self.vscope.cmd_log, ['timebase:scale?'])
+        self.assertNotIn(1, self.scope._memory_snapshots)
+
+    def test_reset_defaults(self):
+        self.scope.utility.reset()
+        self.vscope.cmd_log = list()
+        self.assertEqual(self.scope.channels[0].input_impedance, 1000000)
+        self.assertEqual(self.scope.timebase.scale, 100e-6)
+        self.assertEqual(self.vscope.cmd_log, [])
+
+
+class TestAgilentDSO90254A(unittest.TestCase):
+
+    def setUp(self):
+        self.vscope = virtual.VirtualScope(idn='AGILENT TECHNOLOGIES,DSO90254A,0,1.0')
+        self.scope = agilentDSO90254A(self.vscope)
+
+    def test_reset_defaults(self):
+        self.scope.utility.reset()
+        self.assertNotIn('timebase_scale', self.scope._reset_defaults)
+        self.assertEqual(self.scope._channel_input_impedance[0], 50)
+        self.assertEqual(self.scope.channels[0].input_impedance, 50)
+        self.vscope.cmd_log = list()
+        self.scope.timebase.scale
+        self.assertEqual(self.vscope.cmd_log, ['timebase:scale?'])
@@ -24,11 +24,14 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+
 from .chromaBaseDCPwr import *
+from .. import extra
 
 OCPLevels = set(["low", "high"])
 
-class chroma62000p(chromaBaseDCPwr):
+class chroma62000p(extra.dcpwr.ListMode, chromaBaseDCPwr):
     "Chroma ATE 62000P series IVI DC power supply driver"
 
     def __init__(self, *args, **kwargs):
@@ -52,6 +55,9 @@ class chroma62000p(chromaBaseDCPwr):
 
         self._memory_size = 10
 
+        # program 1 is used for list mode
+        self._output_list_max_points = 100
+
         self._identity_description = "Chroma 62000P series IVI DC power supply driver"
         self._identity_identifier = ""
         self._identity_revision = ""
@@ -254,3 +260,82 @@ class chroma62000p(chromaBaseDCPwr):
         for k in range(self._output_count):
             self._set_cache_valid(valid=False, index=k)
         self._set_cache_valid(index=index)
+
+    def _get_output_list_count(self, index):
+        """
+        This function queries the number of times the program runs.
+        """
+        index = ivi.get_index(self._output_name, index)
+        if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
+            self._write("PROG:SEL 1")
+            self._output_list_count[index] = int(float(self._ask("PROG:COUN?")))
+            self._set_cache_valid(index=index)
+        return self._output_list_count[index]
+
+    def _set_output_list_count(self, index, value):
+        """
+        This function sets the number of times the program runs, 1 to 15000.
+        """
+        index = ivi.get_index(self._output_name, index)
+        value = int(value)
+        if value < 1 or value > 15000:
+            raise ivi.OutOfRangeException()
+        if not self._driver_operation_simulate:
+            self._write("PROG:SEL 1")
+            self._write("PROG:COUN %d" % value)
+        self._output_list_count[index] = value
+        self._set_cache_valid(index=index)
+
+    def _get_output_list_enabled(self, index):
+        """
+        This function queries whether the program is running.
+        """
+        index = ivi.get_index(self._output_name, index)
+        if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
+            self._output_list_enabled[index] = self._ask("PROG:RUN?") == "ON"
+            self._set_cache_valid(index=index)
+        return self._output_list_enabled[index]
+
+    def _set_output_list_enabled(self, index, value):
+        """
+        This function starts or stops program 1.
+        """
+        index = ivi.get_index(self._output_name, index)
+        value = bool(value)
+        if not self._driver_operation_simulate:
+            if value:
+                self._write("PROG:SEL 1")
+            self._write("PROG:RUN %s" % ("ON" if value else "OFF"))
+        self._output_list_enabled[index] = value
+        self._set_cache_valid(index=index)
+
+    def _output_list_configure(self, index, voltage, current, dwell):
+        """
+        This function stores the list in the sequences of program 1. Unused
+        sequences are set to skip.
+        """
+        index = ivi.get_index(self._output_name, index)
+        voltage, current, dwell = self._get_output_list_points(index, voltage, current, dwell)
+        if not self._driver_operation_simulate:
+            n = len(voltage)
+            seq = np.char.mod("PROG:SEQ:SEL %d", np.arange(1, n+1))
+            volt = np.char.mod("PROG:SEQ:VOLT %.2f", voltage)
+            curr = np.char.mod("PROG:SEQ:CURR %.2f", current)
+            time = np.char.mod("PROG:SEQ:TIME %.3f", dwell)
+            skip = np.char.mod("PROG:SEQ:SEL %d", np.arange(n+1, self._output_list_max_points+1))
+            self._begin_write_batch()
+            try:
+                self._write("PROG:SEL 1")
+                for cmds in zip(seq, volt, curr, time):
+                    self._write(cmds[0])
+                    self._write("PROG:SEQ:TYPE AUTO")
+                    for cmd in cmds[1:]:
+                        self._write(cmd)
+                for cmd in skip:
+                    self._write(cmd)
+                    self._write("PROG:SEQ:TYPE SKIP")
+            finally:
+                self._end_write_batch()
+
+    def _output_list_fetch_measurement(self, index, type):
+        raise ivi.OperationNotSupportedException()
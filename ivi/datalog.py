@@ -0,0 +1,294 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+Measurement data logging
+
+A Logger appends timestamped scalar and array results to a directory of
+NumPy .npy chunk files, one pair of time and data columns per stream, with a
+JSON index.  Values are queued and written by a background thread, so
+logging never waits for the disk:
+
+    log = ivi.datalog.Logger('burnin')
+    log.add_stream('vout', psu)
+    log.add_stream('trace', scope, dtype='f4')
+    ...
+    log.log('vout', psu.outputs[0].measure('voltage'))
+    log.log('trace', scope.channels[0].measurement.fetch_waveform().y)
+    ...
+    log.close()
+
+    store = ivi.datalog.Store('burnin')
+    t, v = store.read('vout')
+
+add_stream records the identity and the cached configuration of the driver
+with the stream.  Each stream has a fixed value shape, taken from the first
+value.  Logger.subscriber returns a callback for ivi.poll items.  Opening a
+Logger on an existing store appends to it.
+
+"""
+
+import json
+import os
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import numpy as np
+
+IdentityNames = ['description', 'identifier', 'revision', 'vendor', 'instrument_manufacturer',
+        'instrument_model', 'instrument_firmware_revision']
+
+def get_driver_metadata(driver):
+    "Return a dict of the identity, resource and cached configuration of a driver"
+    identity = dict()
+    for name in IdentityNames:
+        try:
+            identity[name] = getattr(driver.identity, name)
+        except Exception:
+            pass
+    return dict(
+        driver=driver.__class__.__name__,
+        resource=driver._driver_operation_io_resource_descriptor,
+        identity=identity,
+        configuration=driver._get_cache_snapshot()
+    )
+
+def _write_file(filename, data):
+    # write to a temporary file first, so the file is never left half written
+    tmp = filename + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(data)
+    if hasattr(os, 'replace'):
+        os.replace(tmp, filename)
+    else:
+        if os.path.exists(filename):
+            os.remove(filename)
+        os.rename(tmp, filename)
+
+
+class Store(object):
+    "Reads a data log directory"
+
+    def __init__(self, path):
+        self.path = path
+        self.reload()
+
+    def reload(self):
+        "Read the index again, to pick up data written since"
+        filename = os.path.join(self.path, 'index.json')
+        if os.path.exists(filename):
+            with open(filename, 'r') as f:
+                self.index = json.load(f)
+        else:
+            self.index = dict(version=1, streams=dict())
+
+    @property
+    def streams(self):
+        "Names of the streams in the store"
+        return sorted(self.index['streams'])
+
+    def get_metadata(self, name):
+        "Return the metadata of a stream"
+        return self.index['streams'][name]['metadata']
+
+    def __len__(self):
+        return len(self.index['streams'])
+
+    def count(self, name):
+        "Return the number of records in a stream"
+        return sum(c['count'] for c in self.index['streams'][name]['chunks'])
+
+    def read(self, name, start=None, stop=None):
+        """Return the times and values of a stream, optionally only those with
+        start <= time < stop.  Chunks are memory mapped, so only the parts
+        that are used are read."""
+        s = self.index['streams'][name]
+        t = [np.zeros(0)]
+        v = [np.zeros((0,) + tuple(s['shape']), s['dtype'])]
+        for c in s['chunks']:
+            if start is not None and c['stop'] < start:
+                continue
+            if stop is not None and c['start'] >= stop:
+                continue
+            ct = np.load(os.path.join(self.path, c['time']), mmap_mode='r')
+            cv = np.load(os.path.join(self.path, c['data']), mmap_mode='r')
+            mask = np.ones(len(ct), bool)
+            if start is not None:
+                mask &= ct >= start
+            if stop is not None:
+                mask &= ct < stop
+            t.append(ct[mask])
+            v.append(cv[mask])
+        return np.concatenate(t), np.concatenate(v)
+
+
+class Logger(Store):
+    "Logs timestamped values to a data log directory from a background thread"
+
+    def __init__(self, path, chunk_records=65536, chunk_bytes=1<<24, flush_interval=10.0):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        super(Logger, self).__init__(path)
+        # a chunk is written when it holds chunk_records values or chunk_bytes
+        # of data, and partial chunks every flush_interval seconds
+        self.chunk_records = chunk_records
+        self.chunk_bytes = chunk_bytes
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.error = None
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def add_stream(self, name, driver=None, dtype=None, **metadata):
+        """Add a stream, recording the identity and configuration of a driver
+        and any other keyword arguments as metadata.  dtype sets the stored
+        data type, by default that of the first value."""
+        md = dict()
+        if driver is not None:
+            md.update(get_driver_metadata(driver))
+        md.update(metadata)
+        with self.lock:
+            s = self.index['streams'].get(name)
+            if s is None:
+                s = self._new_stream(name)
+            s['metadata'] = md
+            if dtype is not None:
+                s['dtype'] = np.dtype(dtype).str
+
+    def _new_stream(self, name):
+        s = dict(directory='%04d' % len(self.index['streams']), dtype=None, shape=None,
+                metadata=dict(), chunks=list())
+        self.index['streams'][name] = s
+        return s
+
+    def log(self, name, value, t=None):
+        "Queue a value, with the current time unless t is given"
+        if self.error is not None:
+            raise self.error
+        if t is None:
+            t = time.time()
+        value = np.array(value)
+        if value.dtype.hasobject:
+            raise ValueError("cannot log values of type %s" % type(value))
+        with self.lock:
+            s = self.index['streams'].get(name)
+            if s is None:
+                s = self._new_stream(name)
+            if s['shape'] is None:
+                s['shape'] = list(value.shape)
+                if s['dtype'] is None:
+                    s['dtype'] = value.dtype.str
+            elif list(value.shape) != s['shape']:
+                raise ValueError("shape %s does not match stream shape %s" %
+                        (value.shape, tuple(s['shape'])))
+        self.queue.put((name, t, value))
+
+    def subscriber(self, name):
+        "Return a callback(time, value) that logs to a stream, for ivi.poll"
+        def callback(t, value):
+            self.log(name, value, t)
+        return callback
+
+    def flush(self):
+        "Write all queued values and wait for them to be on disk"
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        "Write all queued values and stop the writer thread"
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        buffers = dict()
+        size = dict()
+        last_flush = time.time()
+        while True:
+            timeout = max(last_flush + self.flush_interval - time.time(), 0)
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+            if item is None or item is False or hasattr(item, 'set'):
+                # close, flush interval or flush
+                self._write_chunks(buffers)
+                buffers = dict()
+                size = dict()
+                last_flush = time.time()
+                if item is None:
+                    return
+                if item is not False:
+                    item.set()
+                continue
+            name, t, value = item
+            buffers.setdefault(name, list()).append((t, value))
+            size[name] = size.get(name, 0) + value.nbytes
+            if len(buffers[name]) >= self.chunk_records or size[name] >= self.chunk_bytes:
+                self._write_chunks({name: buffers.pop(name)})
+                size[name] = 0
+
+    def _write_chunks(self, buffers):
+        if self.error is not None:
+            return
+        try:
+            with self.lock:
+                streams = dict((name, self.index['streams'][name]) for name in buffers)
+            chunks = dict()
+            for name, records in buffers.items():
+                s = streams[name]
+                t = np.array([r[0] for r in records])
+                v = np.array([r[1] for r in records], s['dtype'])
+                directory = os.path.join(self.path, s['directory'])
+                if not os.path.isdir(directory):
+                    os.makedirs(directory)
+                k = len(s['chunks'])
+                c = dict(
+                    time='%s/time_%06d.npy' % (s['directory'], k),
+                    data='%s/data_%06d.npy' % (s['directory'], k),
+                    count=len(t),
+                    start=float(t.min()),
+                    stop=float(t.max())
+                )
+                np.save(os.path.join(self.path, c['time']), t)
+                np.save(os.path.join(self.path, c['data']), v)
+                chunks[name] = c
+            with self.lock:
+                for name in chunks:
+                    streams[name]['chunks'].append(chunks[name])
+                data = json.dumps(self.index, indent=1, sort_keys=True)
+            _write_file(os.path.join(self.path, 'index.json'), data)
+        except Exception as e:
+            self.error = e
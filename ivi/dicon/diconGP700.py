@@ -27,10 +27,12 @@ THE SOFTWARE.
 import time
 
 from .. import ivi
+from .. import extra
 from .. import scpi
+from .. import swtch
 
-class diconGP700(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common.Reset,
-                 scpi.common.SelfTest, scpi.common.Memory,
+class diconGP700(extra.swtch.ScanList, scpi.common.IdnCommand, scpi.common.ErrorQuery,
+                 scpi.common.Reset, scpi.common.SelfTest, scpi.common.Memory,
                  ivi.Driver):
     "DiCon Fiberoptics GP700 Programmable Fiberoptic Instrument"
     
@@ -79,6 +81,8 @@ class diconGP700(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common.Res
         self._switch_input = list()
         self._switch_output_count = list()
         self._switch_input_count = list()
+        self._switch_settling_time = list()
+        self._switch_debounce_time = 0.0
         
         self._add_property('attenuators[].level',
                         self._get_attenuator_level,
@@ -157,6 +161,14 @@ class diconGP700(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common.Res
                         ivi.Doc("""
                         Query number of inputs supported by switch.
                         """))
+        self._add_property('switches[].settling_time',
+                        self._get_switch_settling_time,
+                        self._set_switch_settling_time,
+                        None,
+                        ivi.Doc("""
+                        Specifies the time in seconds for the switch to settle after it is set.
+                        Scan lists wait for this time before making a measurement.
+                        """))
         self._add_method('switches[].get',
                         self._switch_get,
                         ivi.Doc("""
@@ -217,18 +229,12 @@ class diconGP700(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common.Res
     def _utility_disable(self):
         pass
     
-    def _utility_lock_object(self):
-        pass
-    
     def _utility_reset(self):
         if not self._driver_operation_simulate:
             self._write("*RST")
             time.sleep(0.1)
             self._clear()
-            self.driver_operation.invalidate_all_attributes()
-    
-    def _utility_unlock_object(self):
-        pass
+            self._invalidate_attributes('utility_reset')
     
     
     def _init_channels(self):
@@ -352,6 +358,8 @@ class diconGP700(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common.Res
         
         self.attenuators._set_list(self._attenuator_name)
         self.filters._set_list(self._filter_name)
+        self._switch_settling_time = [0.05] * self._switch_count
+        
         self.switches._set_list(self._switch_name)
     
     def _get_config(self):
@@ -441,31 +449,45 @@ class diconGP700(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common.Res
         index = ivi.get_index(self._switch_name, index)
         return self._switch_input_count[index]
     
+    def _get_switch_settling_time(self, index):
+        index = ivi.get_index(self._switch_name, index)
+        return self._switch_settling_time[index]
+    
+    def _set_switch_settling_time(self, index, value):
+        index = ivi.get_index(self._switch_name, index)
+        value = float(value)
+        if value < 0:
+            raise ivi.OutOfRangeException()
+        self._switch_settling_time[index] = value
+    
     def _switch_get(self, index):
         index = ivi.get_index(self._switch_name, index)
-        name = self._switch_name[index]
         
-        if name[0] == 'M':
-            if not self._driver_operation_simulate:
-                if not self._get_cache_valid('switch_output', index) or not self._get_cache_valid('switch_input', index):
-                #if True:
-                    resp = self._ask("%s?" % name)
-                    lst = resp.split(',')
-                    self._switch_output[index] = int(lst[0].strip())
-                    self._switch_input[index] = int(lst[1].strip())
-                    self._set_cache_valid(True, 'switch_output', index)
-                    self._set_cache_valid(True, 'switch_input', index)
-            return (self._switch_output[index], self._switch_input[index])
-        elif name[0] == 'P' or name[0] == 'S':
-            if not self._driver_operation_simulate:
-                if not self._get_cache_valid('switch_output', index):
-                #if True:
-                    resp = self._ask("%s?" % name)
-                    self._switch_output[index] = int(resp.strip())
-                    self._switch_input[index] = 1
-                    self._set_cache_valid(True, 'switch_output', index)
-                    self._set_cache_valid(True, 'switch_input', index)
-            return (self._switch_output[index], self._switch_input[index])
+        if not self._driver_operation_simulate:
+            if not self._get_cache_valid('switch_output', index) or not self._get_cache_valid('switch_input', index):
+                # read all switches that are not cached with one ask_many call
+                lst = [index]
+                if self._driver_operation_cache:
+                    for i in range(self._switch_count):
+                        if i != index and not (self._cache_valid.get('switch_output_%d' % i) and
+                                self._cache_valid.get('switch_input_%d' % i)):
+                            lst.append(i)
+                self._switch_update(lst)
+        return (self._switch_output[index], self._switch_input[index])
+    
+    def _switch_update(self, indices):
+        names = [self._switch_name[i] for i in indices]
+        resp = self._ask_many(["%s?" % name for name in names])
+        for index, name, r in zip(indices, names, resp):
+            if name[0] == 'M':
+                lst = r.split(',')
+                self._switch_output[index] = int(lst[0].strip())
+                self._switch_input[index] = int(lst[1].strip())
+            else:
+                self._switch_output[index] = int(r.strip())
+                self._switch_input[index] = 1
+            self._set_cache_valid(True, 'switch_output', index)
+            self._set_cache_valid(True, 'switch_input', index)
     
     def _switch_set(self, index, output, input=None):
         index = ivi.get_index(self._switch_name, index)
@@ -503,9 +525,24 @@ class diconGP700(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.common.Res
                 self._switch_input[index] = 1
                 self._set_cache_valid(True, 'switch_output', index)
                 self._set_cache_valid(True, 'switch_input', index)
+        self._switch_debounce_time = max(self._switch_debounce_time,
+                time.time() + self._switch_settling_time[index])
     
     def _get_switch_name(self, index):
         index = ivi.get_index(self._switch_name, index)
         return self._switch_name[index]
     
+    def _scan_list_resources(self, op):
+        if op[0] == 'set':
+            return set([ivi.get_index(self._switch_name, op[1])])
+        raise swtch.InvalidScanListException()
+    
+    def _scan_list_apply(self, op):
+        self._switch_set(*op[1:])
+    
+    def _scan_list_wait_for_debounce(self):
+        t = self._switch_debounce_time - time.time()
+        if t > 0:
+            time.sleep(t)
+    
     
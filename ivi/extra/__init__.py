@@ -28,7 +28,10 @@ __all__ = [
         # Common functions
         "common",
         # Extra base classes
-        "dcpwr"]
+        "counter",
+        "dcpwr",
+        "pwrmeter",
+        "swtch"]
 
 from . import *
 
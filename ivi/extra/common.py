@@ -24,6 +24,11 @@ THE SOFTWARE.
 
 """
 
+import json
+import os
+import re
+import zlib
+
 from .. import ivi
 
 class SerialNumber(ivi.IviContainer):
@@ -69,7 +74,21 @@ class Memory(ivi.IviContainer):
         super(Memory, self).__init__(*args, **kwargs)
 
         self._memory_size = 10
+        self._memory_snapshots = dict()
+        self._memory_snapshots_loaded = False
+        self._memory_verify = False
 
+        self._add_property('memory.verify',
+                        self._get_memory_verify,
+                        self._set_memory_verify,
+                        None,
+                        ivi.Doc("""
+                        If True, a checksum of the instrument setup is stored with each saved
+                        state and compared on recall.  The cached attribute values saved with
+                        the state are only restored if the checksums match, which detects
+                        changes made to the stored state from the front panel.  If False, the
+                        cached values are restored without checking the instrument.
+                        """))
         self._add_method('memory.save',
                         self._memory_save,
                         ivi.Doc("""
@@ -95,6 +114,93 @@ class Memory(ivi.IviContainer):
             raise OutOfRangeException()
         pass
 
+    def _get_memory_verify(self):
+        return self._memory_verify
+
+    def _set_memory_verify(self, value):
+        self._memory_verify = bool(value)
+
+    def _memory_get_checksum(self):
+        "Return a checksum of the current instrument setup"
+        if hasattr(self, '_system_fetch_setup'):
+            data = self._system_fetch_setup()
+        else:
+            self._write("*lrn?")
+            data = self._read_raw()
+        return zlib.crc32(data) & 0xffffffff
+
+    def _memory_get_snapshot_file(self):
+        "Return the file used to persist snapshots, or None if not available"
+        directory = ivi.get_cache_directory()
+        if directory is None or self._driver_operation_simulate:
+            return None
+        if not hasattr(self, '_get_identity_instrument_serial_number'):
+            return None
+        try:
+            model = self._get_identity_instrument_model()
+            serial = self._get_identity_instrument_serial_number()
+        except (ivi.IviException, NotImplementedError):
+            return None
+        if serial in ('', 'Cannot query from instrument', 'Not available while simulating'):
+            return None
+        name = re.sub(r'[^\w\-]', '_', "%s_%s" % (model, serial))
+        return os.path.join(directory, "memory_%s.json" % name)
+
+    def _memory_load_snapshots(self):
+        "Load persisted snapshots on first use"
+        if self._memory_snapshots_loaded:
+            return
+        self._memory_snapshots_loaded = True
+        filename = self._memory_get_snapshot_file()
+        if filename is None or not os.path.exists(filename):
+            return
+        try:
+            with open(filename, 'r') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        for key in data:
+            checksum, snapshot = data[key]
+            self._memory_snapshots.setdefault(int(key), (checksum, snapshot))
+
+    def _memory_write_snapshots(self):
+        "Persist snapshots, if a cache directory is set"
+        filename = self._memory_get_snapshot_file()
+        if filename is None:
+            return
+        data = dict((str(k), list(v)) for k, v in self._memory_snapshots.items())
+        try:
+            if not os.path.isdir(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+            with open(filename, 'w') as f:
+                json.dump(data, f)
+        except (IOError, OSError):
+            pass
+
+    def _memory_store_snapshot(self, index):
+        "Store the valid cache contents for a memory slot after saving it"
+        checksum = None
+        if self._memory_verify:
+            checksum = self._memory_get_checksum()
+        self._memory_load_snapshots()
+        self._memory_snapshots[index] = (checksum, self._get_cache_snapshot())
+        self._memory_write_snapshots()
+
+    def _memory_restore_snapshot(self, index):
+        """Invalidate the cache after recalling a memory slot and restore the
+        snapshot stored for it, if any.  Returns True if a snapshot was loaded."""
+        self._invalidate_attributes('memory_recall')
+        self._memory_load_snapshots()
+        if index not in self._memory_snapshots:
+            return False
+        checksum, snapshot = self._memory_snapshots[index]
+        if self._memory_verify and (checksum is None or checksum != self._memory_get_checksum()):
+            del self._memory_snapshots[index]
+            self._memory_write_snapshots()
+            return False
+        self._load_cache_snapshot(snapshot)
+        return True
+
 
 class Title(ivi.IviContainer):
     "Extension IVI methods for instruments that support setting a title"
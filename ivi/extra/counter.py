@@ -0,0 +1,107 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import numpy as np
+
+from .. import ivi
+
+def allan_deviation(data, tau0, m=None, data_type='frequency'):
+    """Compute the overlapping Allan deviation of a record of measurements
+
+    data is a record of frequency or period measurements (data_type
+    'frequency') taken every tau0 seconds, or of time interval measurements
+    in seconds (data_type 'phase').  Frequency and period records are
+    normalized to their mean first.  m is a list of averaging factors,
+    default octave spaced.  Returns (tau, adev) arrays."""
+    data = np.asarray(data, dtype=float)
+    if data_type == 'frequency':
+        # phase from the fractional frequency
+        y = data / np.mean(data) - 1
+        x = np.concatenate(([0.0], np.cumsum(y))) * tau0
+    elif data_type == 'phase':
+        x = data
+    else:
+        raise ivi.ValueNotSupportedException()
+    n = len(x)
+    if m is None:
+        m = 2 ** np.arange(int(np.log2(max((n - 1) // 2, 1))) + 1)
+    m = np.asarray(m, dtype=int)
+    m = m[(m >= 1) & (2 * m < n)]
+    adev = np.zeros(len(m))
+    for i, k in enumerate(m):
+        d = x[2*k:] - 2 * x[k:-k] + x[:-2*k]
+        adev[i] = np.sqrt(np.mean(d ** 2) / 2) / (k * tau0)
+    return m * tau0, adev
+
+
+class ArrayMeasurement(ivi.IviContainer):
+    "Extension IVI methods for frequency counters that can take a record of measurements"
+    
+    def __init__(self, *args, **kwargs):
+        super(ArrayMeasurement, self).__init__(*args, **kwargs)
+        
+        self._measurement_sample_count = 1
+        
+        self._add_property('measurement.sample_count',
+                        self._get_measurement_sample_count,
+                        self._set_measurement_sample_count,
+                        None,
+                        ivi.Doc("""
+                        Specifies the number of measurements taken for each trigger. The
+                        record is returned by the fetch_array and read_array functions.
+                        """))
+        self._add_method('measurement.fetch_array',
+                        self._measurement_fetch_array,
+                        ivi.Doc("""
+                        Returns the record of measurements taken by the last initiate as an
+                        array. Where the instrument supports it, the record is transferred as
+                        binary data in a single response.
+                        
+                        Use ivi.extra.counter.allan_deviation to compute the Allan deviation of
+                        a record of frequency, period or time interval measurements.
+                        """))
+        self._add_method('measurement.read_array',
+                        self._measurement_read_array,
+                        ivi.Doc("""
+                        Initiates a measurement, waits for the record to complete and returns
+                        it as an array. See fetch_array.
+                        """))
+    
+    def _get_measurement_sample_count(self):
+        return self._measurement_sample_count
+    
+    def _set_measurement_sample_count(self, value):
+        value = int(value)
+        if value < 1:
+            raise ivi.OutOfRangeException()
+        self._measurement_sample_count = value
+    
+    def _measurement_fetch_array(self, maximum_time=None):
+        return np.zeros(self._measurement_sample_count)
+    
+    def _measurement_read_array(self, maximum_time=None):
+        self._measurement_initiate()
+        return self._measurement_fetch_array(maximum_time)
@@ -24,6 +24,8 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+
 from .. import ivi
 
 class OCP(ivi.IviContainer):
@@ -114,3 +116,154 @@ class OCP(ivi.IviContainer):
     
     
 
+
+class MeasureAll(ivi.IviContainer):
+    "Extension IVI methods for power supplies that can measure all outputs at once"
+    
+    def __init__(self, *args, **kwargs):
+        super(MeasureAll, self).__init__(*args, **kwargs)
+        
+        self._add_method('measure_all',
+                        self._measure_all,
+                        ivi.Doc("""
+                        Takes a measurement on every output and returns the measured values as
+                        an array, in output order. Where the instrument supports it, all of the
+                        outputs are measured in a single round trip.
+                        
+                        Values for measurement_type:
+                        
+                        * 'voltage'
+                        * 'current'
+                        """))
+    
+    def _measure_all(self, type):
+        return np.array([self._output_measure(i, type) for i in range(self._output_count)])
+
+
+def format_list(values, fmt='%.6g'):
+    "Format an array of values as a comma separated list"
+    return ','.join(np.char.mod(fmt, np.asarray(values, dtype=float)))
+
+def format_rows(columns, fmts):
+    "Format columns of values as an array of comma separated rows"
+    rows = np.char.mod(fmts[0], columns[0])
+    for col, fmt in zip(columns[1:], fmts[1:]):
+        rows = np.char.add(np.char.add(rows, ','), np.char.mod(fmt, col))
+    return rows
+
+
+class ListMode(ivi.IviContainer):
+    "Extension IVI methods for power supplies supporting list (sequence) mode"
+    
+    def __init__(self, *args, **kwargs):
+        super(ListMode, self).__init__(*args, **kwargs)
+        
+        self._output_list_count = list()
+        self._output_list_enabled = list()
+        self._output_list_max_points = None
+        
+        self._add_property('outputs[].list.count',
+                        self._get_output_list_count,
+                        self._set_output_list_count,
+                        None,
+                        ivi.Doc("""
+                        Specifies the number of times the list is run. A value of 0 repeats the
+                        list until list mode is disabled.
+                        """))
+        self._add_property('outputs[].list.enabled',
+                        self._get_output_list_enabled,
+                        self._set_output_list_enabled,
+                        None,
+                        ivi.Doc("""
+                        Specifies whether the output runs the list. When True, the list starts
+                        on the next trigger; when False, the output returns to the voltage level
+                        and current limit attributes.
+                        """))
+        self._add_method('outputs[].list.configure',
+                        self._output_list_configure,
+                        ivi.Doc("""
+                        Uploads a list of setpoints to the output. Voltage levels are in Volts,
+                        current limits in Amps and dwell times in seconds. Each parameter can
+                        be an array or a single value that applies to every point. If the
+                        current limit is None, the present current limit is used for every
+                        point.
+                        
+                        The list is sent in as few program messages as the instrument allows,
+                        so thousands of points upload in a few round trips.
+                        """))
+        self._add_method('outputs[].list.fetch_measurement',
+                        self._output_list_fetch_measurement,
+                        ivi.Doc("""
+                        Returns the measurements taken while the list ran as an array.
+                        
+                        Values for measurement_type:
+                        
+                        * 'voltage'
+                        * 'current'
+                        """))
+        
+        self._init_outputs()
+    
+    def _init_outputs(self):
+        try:
+            super(ListMode, self)._init_outputs()
+        except AttributeError:
+            pass
+        
+        self._output_list_count = list()
+        self._output_list_enabled = list()
+        for i in range(self._output_count):
+            self._output_list_count.append(1)
+            self._output_list_enabled.append(False)
+    
+    def _get_output_list_points(self, index, voltage, current, dwell):
+        "Check list setpoints against the output spec and broadcast them to the same length"
+        if current is None:
+            current = self._get_output_current_limit(index)
+        try:
+            voltage, current, dwell = np.broadcast_arrays(
+                    np.atleast_1d(np.asarray(voltage, dtype=float)),
+                    np.atleast_1d(np.asarray(current, dtype=float)),
+                    np.atleast_1d(np.asarray(dwell, dtype=float)))
+        except ValueError:
+            raise ivi.ValueNotSupportedException()
+        if voltage.ndim != 1 or len(voltage) == 0:
+            raise ivi.ValueNotSupportedException()
+        if self._output_list_max_points is not None and len(voltage) > self._output_list_max_points:
+            raise ivi.OutOfRangeException()
+        spec = self._output_spec[index]
+        if np.any(voltage < 0) or np.any(voltage > spec['voltage_max']):
+            raise ivi.OutOfRangeException()
+        if np.any(current < 0) or np.any(current > spec['current_max']):
+            raise ivi.OutOfRangeException()
+        if np.any(dwell < 0):
+            raise ivi.OutOfRangeException()
+        return voltage, current, dwell
+    
+    def _get_output_list_count(self, index):
+        index = ivi.get_index(self._output_name, index)
+        return self._output_list_count[index]
+    
+    def _set_output_list_count(self, index, value):
+        index = ivi.get_index(self._output_name, index)
+        value = int(value)
+        if value < 0:
+            raise ivi.OutOfRangeException()
+        self._output_list_count[index] = value
+    
+    def _get_output_list_enabled(self, index):
+        index = ivi.get_index(self._output_name, index)
+        return self._output_list_enabled[index]
+    
+    def _set_output_list_enabled(self, index, value):
+        index = ivi.get_index(self._output_name, index)
+        value = bool(value)
+        self._output_list_enabled[index] = value
+    
+    def _output_list_configure(self, index, voltage, current, dwell):
+        index = ivi.get_index(self._output_name, index)
+        self._get_output_list_points(index, voltage, current, dwell)
+    
+    def _output_list_fetch_measurement(self, index, type):
+        index = ivi.get_index(self._output_name, index)
+        return np.zeros(0)
@@ -0,0 +1,161 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import time
+
+import numpy as np
+
+from .. import ivi
+
+BufferedTriggerSource = set(['immediate', 'software'])
+
+class BufferedAcquisition(ivi.IviContainer):
+    "Extension IVI methods for power meters that can stream readings at a high rate"
+    
+    def __init__(self, *args, **kwargs):
+        super(BufferedAcquisition, self).__init__(*args, **kwargs)
+        
+        self._buffered_count = 100
+        self._buffered_trigger_source = 'immediate'
+        self._buffered_interval = 0.0
+        
+        self._add_property('buffered.count',
+                        self._get_buffered_count,
+                        self._set_buffered_count,
+                        None,
+                        ivi.Doc("""
+                        Specifies the number of readings taken by a buffered acquisition.
+                        """))
+        self._add_property('buffered.trigger_source',
+                        self._get_buffered_trigger_source,
+                        self._set_buffered_trigger_source,
+                        None,
+                        ivi.Doc("""
+                        Specifies how each reading of a buffered acquisition is triggered.
+                        
+                        Values:
+                        
+                        * 'immediate': the meter runs free at its fastest rate
+                        * 'software': the driver triggers each reading
+                        """))
+        self._add_property('buffered.interval',
+                        self._get_buffered_interval,
+                        self._set_buffered_interval,
+                        None,
+                        ivi.Doc("""
+                        Specifies the time between readings in seconds. A value of 0 takes
+                        readings as fast as the meter delivers them.
+                        """))
+        self._add_method('buffered.configure',
+                        self._buffered_configure,
+                        ivi.Doc("""
+                        Configures the count, trigger source and interval of a buffered
+                        acquisition.
+                        """))
+        self._add_method('buffered.read',
+                        self._buffered_read,
+                        ivi.Doc("""
+                        Takes a buffered acquisition and returns the reading times and the
+                        readings as arrays. Times are in seconds from the start of the
+                        acquisition. Over range readings are returned as +inf and under range
+                        readings as -inf.
+                        
+                        If maximum_time (in seconds) is given, the acquisition stops when it
+                        runs out of time and returns the readings taken so far.
+                        """))
+    
+    def _get_buffered_count(self):
+        return self._buffered_count
+    
+    def _set_buffered_count(self, value):
+        value = int(value)
+        if value < 1:
+            raise ivi.OutOfRangeException()
+        self._buffered_count = value
+    
+    def _get_buffered_trigger_source(self):
+        return self._buffered_trigger_source
+    
+    def _set_buffered_trigger_source(self, value):
+        if value not in BufferedTriggerSource:
+            raise ivi.ValueNotSupportedException()
+        self._buffered_trigger_source = value
+    
+    def _get_buffered_interval(self):
+        return self._buffered_interval
+    
+    def _set_buffered_interval(self, value):
+        value = float(value)
+        if value < 0:
+            raise ivi.OutOfRangeException()
+        self._buffered_interval = value
+    
+    def _buffered_configure(self, count, trigger_source, interval=0.0):
+        self._set_buffered_count(count)
+        self._set_buffered_trigger_source(trigger_source)
+        self._set_buffered_interval(interval)
+    
+    def _buffered_initiate(self):
+        pass
+    
+    def _buffered_trigger(self):
+        pass
+    
+    def _buffered_abort(self):
+        pass
+    
+    def _buffered_parse(self, raw):
+        return np.array(raw).astype(float)
+    
+    def _buffered_read(self, maximum_time=None):
+        count = self._buffered_count
+        interval = self._buffered_interval
+        software = self._buffered_trigger_source == 'software'
+        t = np.zeros(count)
+        if self._driver_operation_simulate:
+            return t, np.zeros(count)
+        # keep the raw responses and parse them all at the end, the loop
+        # only does I/O
+        raw = [None] * count
+        n = 0
+        self._buffered_initiate()
+        start = time.time()
+        try:
+            while n < count:
+                if interval > 0:
+                    delay = start + n * interval - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                if software:
+                    self._buffered_trigger()
+                raw[n] = self._read_raw()
+                t[n] = time.time() - start
+                n += 1
+                if maximum_time is not None and t[n-1] > maximum_time:
+                    break
+        finally:
+            self._buffered_abort()
+        return t[:n], self._buffered_parse(raw[:n])
@@ -0,0 +1,126 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from .. import ivi
+from .. import swtch
+
+class ScanList(ivi.IviContainer):
+    "Extension IVI methods for switches that run lists of switch operations and measurements"
+    
+    def __init__(self, *args, **kwargs):
+        super(ScanList, self).__init__(*args, **kwargs)
+        
+        self._add_method('scan_list.run',
+                        self._scan_list_run,
+                        ivi.Doc("""
+                        Runs a list of switch operations and measurements and returns the
+                        measurement results in order.
+                        
+                        Switch operations are tuples. For IviSwtch drivers these are
+                        ('connect', channel1, channel2), ('disconnect', channel1, channel2),
+                        ('set_path', path) and ('disconnect_all',). Consecutive operations are
+                        grouped as long as they do not use the same channels; an operation that
+                        does starts a new group. On drivers that support compound messages, each
+                        group is sent as a single write.
+                        
+                        Measurements are callables that take no arguments. Before each
+                        measurement, the driver waits only for the remaining settling time of
+                        the switches that were changed. A measurement can return a callable
+                        instead of a result to defer its data transfer. The deferred call is
+                        made after the switch operations that follow have been sent, so the
+                        transfer overlaps with their settling time, and its return value is
+                        used as the result.
+                        """))
+    
+    def _scan_list_resources(self, op):
+        "Return the set of resources used by a switch operation"
+        if op[0] == 'set_path':
+            return set(op[1])
+        if op[0] == 'disconnect_all':
+            return set(self._channel_name)
+        return set(op[1:3])
+    
+    def _scan_list_apply(self, op):
+        "Send a switch operation"
+        if op[0] == 'connect':
+            self._path_connect(op[1], op[2])
+        elif op[0] == 'disconnect':
+            self._path_disconnect(op[1], op[2])
+        elif op[0] == 'set_path':
+            self._path_set_path(op[1])
+        elif op[0] == 'disconnect_all':
+            self._path_disconnect_all()
+        else:
+            raise swtch.InvalidScanListException()
+    
+    def _scan_list_wait_for_debounce(self):
+        "Wait until the switches have settled"
+        self._path_wait_for_debounce(None)
+    
+    def _scan_list_write(self, ops):
+        self._begin_write_batch()
+        try:
+            for op in ops:
+                self._scan_list_apply(op)
+        finally:
+            self._end_write_batch()
+    
+    def _scan_list_run(self, scan_list):
+        results = list()
+        pending = None
+        ops = list()
+        resources = set()
+        for step in scan_list:
+            if callable(step):
+                if ops:
+                    self._scan_list_write(ops)
+                    ops = list()
+                    resources = set()
+                # finish the previous transfer while the switches settle
+                if pending is not None:
+                    results.append(pending())
+                    pending = None
+                self._scan_list_wait_for_debounce()
+                result = step()
+                if callable(result):
+                    pending = result
+                else:
+                    results.append(result)
+            else:
+                if type(step) not in (tuple, list) or len(step) == 0:
+                    raise swtch.InvalidScanListException()
+                r = self._scan_list_resources(step)
+                if r & resources:
+                    self._scan_list_write(ops)
+                    ops = list()
+                    resources = set()
+                ops.append(step)
+                resources |= r
+        if ops:
+            self._scan_list_write(ops)
+        if pending is not None:
+            results.append(pending())
+        return results
@@ -27,6 +27,8 @@ THE SOFTWARE.
 
 from .. import ivi
 from .. import scpi
+from ..interface import middleware
+from ..interface import modbus
 
 class ics8099(scpi.common.IdnCommand, scpi.common.Reset,
               scpi.common.SelfTest,  scpi.common.ErrorQuery,
@@ -35,6 +37,9 @@ class ics8099(scpi.common.IdnCommand, scpi.common.Reset,
 
     def __init__(self, *args, **kwargs):
         self.__dict__.setdefault('_instrument_id', '8099')
+        # talking Modbus directly instead of through the 8099 text protocol,
+        # set on initialize
+        self._modbus = False
 
         super(ics8099, self).__init__(*args, **kwargs)
 
@@ -49,24 +54,43 @@ class ics8099(scpi.common.IdnCommand, scpi.common.Reset,
         self._identity_specification_minor_version = 0
         self._identity_supported_instrument_models = ['8099']
 
+        # registers per block read, and the largest gap between requested
+        # registers that is read through rather than split into two blocks
+        self._register_block_max = 125
+        self._register_block_gap = 32
+        # configuration registers that only change when written by the driver
+        self._register_nonvolatile = set()
+        self._register_value = dict()
+
         self._add_method('read_register',
                          self._read_register,
                          "Read Modbus register")
+        self._add_method('read_registers',
+                         self._read_registers,
+                         "Read a list of Modbus registers with as few block reads as possible")
         self._add_method('write_register',
                          self._write_register,
                          "Write Modbus register")
+        self._add_method('write_registers',
+                         self._write_registers,
+                         "Write consecutive Modbus registers")
 
     def _initialize(self, resource = None, id_query = False, reset = False, **keywargs):
         "Opens an I/O session to the instrument."
 
         super(ics8099, self)._initialize(resource, id_query, reset, **keywargs)
 
+        interface = self._interface
+        while isinstance(interface, middleware.Middleware):
+            interface = interface.instrument
+        self._modbus = isinstance(interface, modbus.ModbusInstrument)
+
         # interface clear
         if not self._driver_operation_simulate:
             self._clear()
 
         # check ID
-        if id_query and not self._driver_operation_simulate:
+        if id_query and not self._driver_operation_simulate and not self._modbus:
             id = self.identity.instrument_model
             id_check = self._instrument_id
             id_short = id[:len(id_check)]
@@ -81,21 +105,103 @@ class ics8099(scpi.common.IdnCommand, scpi.common.Reset,
     def _utility_disable(self):
         pass
 
-    def _utility_lock_object(self):
-        pass
+    # Modbus has no equivalent of the 8099 text commands, so over a direct
+    # Modbus connection the identity is static and the SCPI utility
+    # functions are not available.  Modbus errors are raised on I/O.
+
+    def _load_id_string(self):
+        if not self._modbus:
+            super(ics8099, self)._load_id_string()
+
+    def _utility_error_query(self):
+        if self._modbus:
+            return (0, "No error")
+        return super(ics8099, self)._utility_error_query()
+
+    def _utility_reset(self):
+        if self._modbus:
+            raise ivi.ResetNotSupportedException()
+        super(ics8099, self)._utility_reset()
+
+    def _utility_self_test(self):
+        if self._modbus:
+            raise ivi.OperationNotSupportedException()
+        return super(ics8099, self)._utility_self_test()
+
+
+    def _get_register_blocks(self, registers):
+        "Group register addresses into (start, count) block reads"
+        blocks = list()
+        for reg in sorted(set(registers)):
+            if blocks:
+                start, count = blocks[-1]
+                if (reg - start - count <= self._register_block_gap and
+                        reg - start < self._register_block_max):
+                    blocks[-1] = (start, reg - start + 1)
+                    continue
+            blocks.append((reg, 1))
+        return blocks
+
+    def _read_registers(self, registers):
+        #read 16 bit registers, non-volatile registers are cached
+        registers = [int(r) for r in registers]
+        if self._driver_operation_simulate:
+            return [0] * len(registers)
+        lst = [r for r in registers if r not in self._register_nonvolatile or
+                not self._get_cache_valid('register', r)]
+        if lst:
+            blocks = self._get_register_blocks(lst)
+            if self._modbus:
+                resp = self._modbus_read_blocks(blocks)
+            else:
+                # the 8099 text protocol takes one command per message
+                resp = [[int(v) for v in self._ask("R? %d, %d" % block).split(',')]
+                        for block in blocks]
+            for (start, count), values in zip(blocks, resp):
+                if len(values) != count:
+                    raise ivi.UnexpectedResponseException()
+                for reg, value in enumerate(values, start):
+                    self._register_value[reg] = value
+                    if reg in self._register_nonvolatile:
+                        self._set_cache_valid(True, 'register', reg)
+        return [self._register_value[r] for r in registers]
+
+    def _modbus_read_blocks(self, blocks):
+        # send all requests before reading the responses, so they are
+        # pipelined on Modbus TCP
+        for start, count in blocks:
+            self._write_raw(modbus.read_registers_request(start, count))
+        return [modbus.parse_read_registers_response(self._read_raw(), count)
+                for start, count in blocks]
 
-    def _utility_unlock_object(self):
-        pass
-    
-    
     def _read_register(self, register):
-        #read 16 bit registers
-        if not self._driver_operation_simulate and not self._get_cache_valid():
-            return int(self._ask("R? %d, %d" % (register, 1)).strip())
-        return 0
+        #read 16 bit register
+        return self._read_registers([register])[0]
 
     def _write_register(self, register, value):
         #write 16 bit registers
-        if not self._driver_operation_simulate and not self._get_cache_valid():
-            self._write("W %d, %d" % (register, value))
-
+        register = int(register)
+        value = int(value)
+        if not self._driver_operation_simulate:
+            if self._modbus:
+                self._ask_raw(modbus.write_register_request(register, value))
+            else:
+                self._write("W %d, %d" % (register, value))
+        if register in self._register_nonvolatile:
+            self._register_value[register] = value
+            self._set_cache_valid(True, 'register', register)
+
+    def _write_registers(self, start, values):
+        #write consecutive 16 bit registers
+        start = int(start)
+        values = [int(v) for v in values]
+        if not self._driver_operation_simulate:
+            if self._modbus:
+                self._ask_raw(modbus.write_registers_request(start, values))
+            else:
+                for reg, value in enumerate(values, start):
+                    self._write("W %d, %d" % (reg, value))
+        for reg, value in enumerate(values, start):
+            if reg in self._register_nonvolatile:
+                self._register_value[reg] = value
+                self._set_cache_valid(True, 'register', reg)
@@ -27,6 +27,9 @@ THE SOFTWARE.
 import Gpib
 import re
 
+# ibsta bit set when the last read was terminated by EOI or EOS
+IBSTA_END = 0x2000
+
 def parse_visa_resource_string(resource_string):
     # valid resource strings:
     # GPIB::10::INSTR
@@ -65,6 +68,11 @@ class LinuxGpibInstrument:
 
         self.gpib = Gpib.Gpib(name, pad, sad, timeout, send_eoi, eos_mode)
 
+        # chunk sizes for reads of unknown length; each chunk is twice the
+        # size of the previous one, up to the maximum
+        self.chunk_size = 512
+        self.max_chunk_size = 1024*1024
+
     def write_raw(self, data):
         "Write binary data to instrument"
         
@@ -73,10 +81,44 @@ class LinuxGpibInstrument:
     def read_raw(self, num=-1):
         "Read binary data from instrument"
         
-        if num < 0:
-            num = 512
+        if num >= 0:
+            # read exactly num bytes, unless END comes first
+            buf = bytearray(num)
+            n = self.read_into(buf)
+            del buf[n:]
+            return bytes(buf)
+        
+        # read until END, growing the buffer geometrically
+        buf = bytearray(self.chunk_size)
+        n = 0
+        chunk_size = self.chunk_size
+        while True:
+            data = self.gpib.read(chunk_size)
+            if n + len(data) > len(buf):
+                buf.extend(bytearray(max(len(buf), n + len(data) - len(buf))))
+            buf[n:n+len(data)] = data
+            n += len(data)
+            if self.gpib.ibsta() & IBSTA_END:
+                break
+            chunk_size = min(chunk_size*2, self.max_chunk_size)
+        
+        del buf[n:]
+        return bytes(buf)
+    
+    def read_into(self, buf):
+        "Read binary data from instrument into a bytearray, returns number of bytes read"
+        
+        n = 0
+        chunk_size = self.chunk_size
+        while n < len(buf):
+            data = self.gpib.read(min(chunk_size, len(buf) - n))
+            buf[n:n+len(data)] = data
+            n += len(data)
+            if self.gpib.ibsta() & IBSTA_END:
+                break
+            chunk_size = min(chunk_size*2, self.max_chunk_size)
         
-        return self.gpib.read(num)
+        return n
     
     def ask_raw(self, data, num=-1):
         "Write then read binary data"
@@ -111,7 +153,8 @@ class LinuxGpibInstrument:
     
     def read_stb(self):
         "Read status byte"
-        raise NotImplementedError()
+        
+        return self.gpib.serial_poll()
     
     def trigger(self):
         "Send trigger command"
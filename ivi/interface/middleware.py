@@ -0,0 +1,306 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+Interface middleware
+
+Middleware objects sit between a driver and its interface and see all of the
+raw traffic.  Add them with Driver.add_middleware; they are kept across calls
+to initialize.  Other attributes of the interface, such as lock and unlock,
+are passed through:
+
+    prof = ivi.interface.middleware.Profiler()
+    scope.add_middleware(prof)
+    ...
+    print(prof.report())
+
+"""
+
+import json
+import random
+import time
+from collections import deque
+
+import numpy as np
+
+
+class Middleware(object):
+    "Base middleware, forwards all calls to the wrapped interface"
+
+    def __init__(self):
+        self.instrument = None
+
+    def write_raw(self, data):
+        "Write binary data to instrument"
+        self.instrument.write_raw(data)
+
+    def read_raw(self, num=-1):
+        "Read binary data from instrument"
+        return self.instrument.read_raw(num)
+
+    def ask_raw(self, data, num=-1):
+        "Write then read binary data"
+        return self.instrument.ask_raw(data, num)
+
+    def read_stb(self):
+        "Read status byte"
+        return self.instrument.read_stb()
+
+    def trigger(self):
+        "Send trigger command"
+        self.instrument.trigger()
+
+    def clear(self):
+        "Send clear command"
+        self.instrument.clear()
+
+    def remote(self):
+        "Send remote command"
+        self.instrument.remote()
+
+    def local(self):
+        "Send local command"
+        self.instrument.local()
+
+    def close(self):
+        "Close connection"
+        self.instrument.close()
+
+    def __getattr__(self, name):
+        # only called for attributes not defined by the middleware.  String
+        # I/O is hidden so that the driver falls back to the raw methods,
+        # which pass through the middleware.
+        if name in ('instrument', 'write', 'read', 'ask'):
+            raise AttributeError(name)
+        return getattr(self.instrument, name)
+
+    def __setattr__(self, name, value):
+        # settings of the wrapped interface, such as term_char
+        instrument = self.__dict__.get('instrument')
+        if (name not in self.__dict__ and not hasattr(type(self), name) and
+                instrument is not None and hasattr(instrument, name)):
+            setattr(instrument, name, value)
+        else:
+            object.__setattr__(self, name, value)
+
+
+def get_header(data):
+    "Return the command headers of a message, such as ':wav:data?'"
+    if type(data) is bytes:
+        data = data[:256].decode('utf-8', 'replace')
+    headers = list()
+    for cmd in data.split(';'):
+        cmd = cmd.strip()
+        if cmd:
+            headers.append(cmd.split(' ', 1)[0].lower())
+    return ';'.join(headers)
+
+
+class Trace(Middleware):
+    "Keeps a log of traffic in a ring buffer"
+
+    def __init__(self, size=1000, callback=None):
+        super(Trace, self).__init__()
+        self.log = deque(maxlen=size)
+        self.callback = callback
+
+    def _trace(self, op, data):
+        entry = (time.time(), op, data)
+        self.log.append(entry)
+        if self.callback is not None:
+            self.callback(*entry)
+
+    def write_raw(self, data):
+        "Write binary data to instrument"
+        self._trace('write', data)
+        self.instrument.write_raw(data)
+
+    def read_raw(self, num=-1):
+        "Read binary data from instrument"
+        data = self.instrument.read_raw(num)
+        self._trace('read', data)
+        return data
+
+    def ask_raw(self, data, num=-1):
+        "Write then read binary data"
+        ask_raw = self.instrument.ask_raw
+        self._trace('write', data)
+        data = ask_raw(data, num)
+        self._trace('read', data)
+        return data
+
+
+class FaultInjection(Middleware):
+    "Adds latency and random I/O errors for testing error handling"
+
+    def __init__(self, latency=0, error_rate=0, seed=None):
+        super(FaultInjection, self).__init__()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+    def _inject(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if self.error_rate > 0 and self.random.random() < self.error_rate:
+            raise IOError("Injected fault")
+
+    def write_raw(self, data):
+        "Write binary data to instrument"
+        self._inject()
+        self.instrument.write_raw(data)
+
+    def read_raw(self, num=-1):
+        "Read binary data from instrument"
+        self._inject()
+        return self.instrument.read_raw(num)
+
+    def ask_raw(self, data, num=-1):
+        "Write then read binary data"
+        ask_raw = self.instrument.ask_raw
+        self._inject()
+        return ask_raw(data, num)
+
+
+class Profiler(Middleware):
+    """Collects per command header call counts, latencies and byte counts
+
+    Latency is measured from the start of a write to the end of the last read
+    of its response, so queries are timed by round trip.  Time outside of
+    interface calls while profiling is reported as driver time."""
+
+    def __init__(self):
+        super(Profiler, self).__init__()
+        self.reset()
+
+    def reset(self):
+        "Clear all collected statistics"
+        self.stats = dict()
+        self.io_time = 0.0
+        self.start_time = None
+        self.last_time = None
+        self.pending = None
+
+    def _get_stats(self, header):
+        try:
+            return self.stats[header]
+        except KeyError:
+            s = dict(count=0, bytes_out=0, bytes_in=0, latency=list())
+            self.stats[header] = s
+            return s
+
+    def _begin(self):
+        t = time.time()
+        if self.start_time is None:
+            self.start_time = t
+        return t
+
+    def _end(self, t):
+        self.last_time = time.time()
+        self.io_time += self.last_time - t
+
+    def write_raw(self, data):
+        "Write binary data to instrument"
+        t = self._begin()
+        self.instrument.write_raw(data)
+        self._end(t)
+        s = self._get_stats(get_header(data))
+        s['count'] += 1
+        s['bytes_out'] += len(data)
+        s['latency'].append(self.last_time - t)
+        self.pending = (s, t)
+
+    def read_raw(self, num=-1):
+        "Read binary data from instrument"
+        t = self._begin()
+        data = self.instrument.read_raw(num)
+        self._end(t)
+        if self.pending is not None:
+            s, start = self.pending
+            s['latency'][-1] = self.last_time - start
+        else:
+            s = self._get_stats('(read)')
+            s['count'] += 1
+            s['latency'].append(self.last_time - t)
+            self.pending = (s, t)
+        s['bytes_in'] += len(data)
+        return data
+
+    def ask_raw(self, data, num=-1):
+        "Write then read binary data"
+        ask_raw = self.instrument.ask_raw
+        t = self._begin()
+        resp = ask_raw(data, num)
+        self._end(t)
+        s = self._get_stats(get_header(data))
+        s['count'] += 1
+        s['bytes_out'] += len(data)
+        s['bytes_in'] += len(resp)
+        s['latency'].append(self.last_time - t)
+        self.pending = (s, t)
+        return resp
+
+    def get_summary(self):
+        "Return a dict of statistics per command header"
+        summary = dict()
+        for header, s in self.stats.items():
+            lat = np.array(s['latency'])
+            summary[header] = dict(
+                count=s['count'],
+                bytes_out=s['bytes_out'],
+                bytes_in=s['bytes_in'],
+                total=float(lat.sum()),
+                mean=float(lat.mean()),
+                p50=float(np.percentile(lat, 50)),
+                p90=float(np.percentile(lat, 90)),
+                p99=float(np.percentile(lat, 99)),
+                max=float(lat.max())
+            )
+        return summary
+
+    def get_times(self):
+        "Return the total, I/O and driver time in seconds"
+        if self.start_time is None:
+            return (0.0, 0.0, 0.0)
+        total = self.last_time - self.start_time
+        return (total, self.io_time, max(total - self.io_time, 0.0))
+
+    def to_json(self, **kwargs):
+        "Return the statistics as a JSON string"
+        total, io, driver = self.get_times()
+        return json.dumps(dict(total_time=total, io_time=io, driver_time=driver,
+                commands=self.get_summary()), **kwargs)
+
+    def report(self, sort='total'):
+        "Return the statistics as a text table, sorted by total time"
+        summary = self.get_summary()
+        lines = ["%-32s %8s %10s %10s %10s %10s %10s %10s" % ('header', 'count',
+                'total ms', 'p50 ms', 'p90 ms', 'p99 ms', 'bytes out', 'bytes in')]
+        for header in sorted(summary, key=lambda h: summary[h][sort], reverse=True):
+            s = summary[header]
+            lines.append("%-32s %8d %10.3f %10.3f %10.3f %10.3f %10d %10d" % (header[:32],
+                    s['count'], s['total']*1e3, s['p50']*1e3, s['p90']*1e3, s['p99']*1e3,
+                    s['bytes_out'], s['bytes_in']))
+        total, io, driver = self.get_times()
+        lines.append("total %.3f s, I/O %.3f s, driver %.3f s" % (total, io, driver))
+        return '\n'.join(lines)
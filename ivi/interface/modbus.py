@@ -0,0 +1,274 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+Modbus interface
+
+Speaks Modbus RTU over a serial port with pySerial, or Modbus TCP over a
+socket.  Both take a request PDU (function code and data) in write_raw and
+return the response PDU from read_raw, adding and checking the framing:
+
+    chamber = ivi.testequity.testequity140(ivi.interface.modbus.ModbusTcpInstrument('10.0.0.20'))
+
+Exception responses raise ModbusException from read_raw.  On TCP, several
+requests can be written before the responses are read; each one gets its
+own transaction identifier and the responses are matched up as they
+arrive.  RTU is half duplex, so writing a request first reads any
+outstanding response.
+
+"""
+
+import socket
+import struct
+import time
+from collections import deque
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+exception_messages = {
+    1: "Illegal function",
+    2: "Illegal data address",
+    3: "Illegal data value",
+    4: "Slave device failure",
+    5: "Acknowledge",
+    6: "Slave device busy",
+    8: "Memory parity error",
+    10: "Gateway path unavailable",
+    11: "Gateway target device failed to respond",
+}
+
+class ModbusException(IOError):
+    "Modbus exception response"
+
+    def __init__(self, function, code):
+        super(ModbusException, self).__init__("Modbus exception %d (%s) for function %d" %
+                (code, exception_messages.get(code, "Unknown"), function))
+        self.function = function
+        self.code = code
+
+
+def _make_crc_table():
+    table = list()
+    for i in range(256):
+        crc = i
+        for k in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+        table.append(crc)
+    return table
+
+_crc_table = _make_crc_table()
+
+def crc16(data):
+    "Return the Modbus RTU CRC of data"
+    crc = 0xFFFF
+    for b in bytearray(data):
+        crc = (crc >> 8) ^ _crc_table[(crc ^ b) & 0xFF]
+    return crc
+
+
+def read_registers_request(start, count):
+    "Return the PDU for reading holding registers (function 3)"
+    return struct.pack('>BHH', 3, start, count)
+
+def write_register_request(register, value):
+    "Return the PDU for writing a single register (function 6)"
+    return struct.pack('>BHH', 6, register, value & 0xFFFF)
+
+def write_registers_request(start, values):
+    "Return the PDU for writing multiple registers (function 16)"
+    values = [v & 0xFFFF for v in values]
+    return struct.pack('>BHHB%dH' % len(values), 16, start, len(values), 2*len(values), *values)
+
+def parse_read_registers_response(pdu, count):
+    "Return the register values from a function 3 response as signed integers"
+    if len(pdu) != 2 + 2*count or bytearray(pdu[0:2]) != bytearray([3, 2*count]):
+        raise IOError("Unexpected Modbus response")
+    return list(struct.unpack('>%dh' % count, pdu[2:]))
+
+def check_response(pdu):
+    "Raise ModbusException for exception responses, otherwise return the PDU"
+    b = bytearray(pdu[0:2])
+    if b[0] & 0x80:
+        raise ModbusException(b[0] & 0x7F, b[1])
+    return pdu
+
+
+class ModbusInstrument(object):
+    "Base class for Modbus interfaces"
+
+    def ask_raw(self, data, num=-1):
+        "Write then read binary data"
+        self.write_raw(data)
+        return self.read_raw(num)
+
+    def read_registers(self, start, count):
+        "Read holding registers"
+        return parse_read_registers_response(self.ask_raw(read_registers_request(start, count)), count)
+
+    def write_register(self, register, value):
+        "Write a single register"
+        self.ask_raw(write_register_request(register, value))
+
+    def write_registers(self, start, values):
+        "Write multiple registers"
+        self.ask_raw(write_registers_request(start, values))
+
+
+class ModbusRtuInstrument(ModbusInstrument):
+    "Modbus RTU interface client"
+
+    def __init__(self, port, unit=1, baudrate=9600, bytesize=8, parity='N', stopbits=1, timeout=1.0):
+        if hasattr(port, 'read') and hasattr(port, 'write'):
+            # already open serial port
+            self.serial = port
+        elif serial is None:
+            raise IOError("pySerial is required for Modbus RTU")
+        elif '://' in str(port):
+            self.serial = serial.serial_for_url(port, baudrate=baudrate, bytesize=bytesize,
+                    parity=parity, stopbits=stopbits, timeout=timeout)
+        else:
+            self.serial = serial.Serial(port, baudrate=baudrate, bytesize=bytesize,
+                    parity=parity, stopbits=stopbits, timeout=timeout)
+
+        self.unit = unit
+        # frames are separated by 3.5 character times, fixed above 19200 baud
+        if baudrate > 19200:
+            self.frame_delay = 1.75e-3
+        else:
+            self.frame_delay = 3.5 * 11 / baudrate
+        self.last_time = 0
+        self.pending = 0
+        self.responses = deque()
+
+    def _read(self, num):
+        data = self.serial.read(num)
+        if len(data) < num:
+            raise IOError("Read timeout")
+        return data
+
+    def _read_frame(self):
+        head = self._read(3)
+        unit, function, n = bytearray(head)
+        if function & 0x80:
+            n = 0
+        elif function not in (1, 2, 3, 4):
+            # echo of address and quantity or value
+            n = 3
+        frame = head + self._read(n + 2)
+        self.pending -= 1
+        self.last_time = time.time()
+        if crc16(frame[:-2]) != struct.unpack('<H', frame[-2:])[0]:
+            raise IOError("Modbus CRC error")
+        if unit != self.unit:
+            raise IOError("Unexpected Modbus unit %d" % unit)
+        return frame[1:-2]
+
+    def write_raw(self, data):
+        "Write request PDU to instrument"
+        # half duplex, so collect responses to earlier requests first
+        while self.pending > 0:
+            self.responses.append(self._read_frame())
+        t = self.frame_delay - (time.time() - self.last_time)
+        if t > 0:
+            time.sleep(t)
+        frame = struct.pack('B', self.unit) + data
+        self.serial.write(frame + struct.pack('<H', crc16(frame)))
+        self.last_time = time.time()
+        if self.unit != 0:
+            # no response to broadcasts
+            self.pending += 1
+
+    def read_raw(self, num=-1):
+        "Read response PDU from instrument"
+        if self.responses:
+            return check_response(self.responses.popleft())
+        if self.pending <= 0:
+            raise IOError("No Modbus request pending")
+        return check_response(self._read_frame())
+
+    def clear(self):
+        "Discard pending responses"
+        self.pending = 0
+        self.responses.clear()
+        if hasattr(self.serial, 'reset_input_buffer'):
+            self.serial.reset_input_buffer()
+
+    def close(self):
+        "Close connection"
+        self.serial.close()
+
+
+class ModbusTcpInstrument(ModbusInstrument):
+    "Modbus TCP interface client"
+
+    def __init__(self, host, port=502, unit=1, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.unit = unit
+        self.transaction = 0
+        self.pending = deque()
+        self.responses = dict()
+        self.buffer = b''
+
+    def _read(self, num):
+        while len(self.buffer) < num:
+            data = self.sock.recv(4096)
+            if not data:
+                raise IOError("Connection closed")
+            self.buffer += data
+        data = self.buffer[:num]
+        self.buffer = self.buffer[num:]
+        return data
+
+    def write_raw(self, data):
+        "Write request PDU to instrument"
+        self.transaction = (self.transaction + 1) & 0xFFFF
+        self.sock.sendall(struct.pack('>HHHB', self.transaction, 0, len(data) + 1, self.unit) + data)
+        self.pending.append(self.transaction)
+
+    def read_raw(self, num=-1):
+        "Read response PDU from instrument"
+        if not self.pending:
+            raise IOError("No Modbus request pending")
+        transaction = self.pending.popleft()
+        # responses can arrive in any order
+        while transaction not in self.responses:
+            t, protocol, length, unit = struct.unpack('>HHHB', self._read(7))
+            self.responses[t] = self._read(length - 1)
+        return check_response(self.responses.pop(transaction))
+
+    def clear(self):
+        "Discard pending responses"
+        self.pending.clear()
+        self.responses = dict()
+
+    def close(self):
+        "Close connection"
+        self.sock.close()
@@ -72,7 +72,11 @@ class SerialInstrument:
                 if len(t) > 1:
                     baudrate = int(t[1])
 
-        self.serial = serial.Serial(port)
+        if '://' in str(port):
+            # pySerial URL, such as loop:// or socket://host:port
+            self.serial = serial.serial_for_url(port)
+        else:
+            self.serial = serial.Serial(port)
 
         self.term_char = '\n'
 
@@ -37,6 +37,11 @@ try:
     except AttributeError:
         # Old style PyVISA
         visa_instrument_opener = visa.instrument
+    try:
+        from pyvisa import constants as visa_constants
+    except ImportError:
+        # Old style PyVISA, no chunked read support
+        visa_constants = None
 except ImportError:
     # PyVISA not installed, pass it up
     raise ImportError
@@ -59,19 +64,54 @@ class PyVisaInstrument:
             self.instrument = resource
         self.buffer = io.BytesIO()
 
+        # size of individual transfers for chunked reads
+        self.chunk_size = 20*1024
+
+        # new style PyVISA supports chunked reads of partial responses
+        self.chunked = visa_constants is not None and hasattr(self.instrument, 'read_bytes')
+
     def write_raw(self, data):
         "Write binary data to instrument"
         self.instrument.write_raw(data)
 
     def read_raw(self, num=-1):
         "Read binary data from instrument"
-        # PyVISA only supports reading entire buffer
-        #return self.instrument.read_raw()
-        data = self.buffer.read(num)
-        if len(data) == 0:
-            self.buffer = io.BytesIO(self.instrument.read_raw())
+        if not self.chunked:
+            # Old style PyVISA only supports reading entire buffer
             data = self.buffer.read(num)
-        return data
+            if len(data) == 0:
+                self.buffer = io.BytesIO(self.instrument.read_raw())
+                data = self.buffer.read(num)
+            return data
+
+        if num < 0:
+            # read until END
+            return self.instrument.read_raw(self.chunk_size)
+
+        # read up to num bytes; break_on_termchar also stops on END
+        return self.instrument.read_bytes(num, self.chunk_size, break_on_termchar=True)
+
+    def read_into(self, buf):
+        "Read binary data from instrument into a bytearray, returns number of bytes read"
+        if not self.chunked:
+            data = self.read_raw(len(buf))
+            buf[:len(data)] = data
+            return len(data)
+
+        lib = self.instrument.visalib
+        session = self.instrument.session
+        more = visa_constants.StatusCode.success_max_count_read
+
+        n = 0
+        while n < len(buf):
+            data, status = lib.read(session, min(self.chunk_size, len(buf) - n))
+            buf[n:n+len(data)] = data
+            n += len(data)
+            if status != more:
+                # END received
+                break
+
+        return n
 
     def ask_raw(self, data, num=-1):
         "Write then read binary data"
@@ -104,7 +144,9 @@ class PyVisaInstrument:
 
     def read_stb(self):
         "Read status byte"
-        raise NotImplementedError()
+        if not hasattr(self.instrument, 'read_stb'):
+            raise NotImplementedError()
+        return self.instrument.read_stb()
 
     def trigger(self):
         "Send trigger command"
@@ -112,20 +154,31 @@ class PyVisaInstrument:
 
     def clear(self):
         "Send clear command"
-        raise NotImplementedError()
+        if not hasattr(self.instrument, 'clear'):
+            raise NotImplementedError()
+        self.buffer = io.BytesIO()
+        self.instrument.clear()
 
     def remote(self):
         "Send remote command"
-        raise NotImplementedError()
+        if not hasattr(self.instrument, 'control_ren'):
+            raise NotImplementedError()
+        self.instrument.control_ren(visa_constants.VI_GPIB_REN_ASSERT_ADDRESS)
 
     def local(self):
         "Send local command"
-        raise NotImplementedError()
+        if not hasattr(self.instrument, 'control_ren'):
+            raise NotImplementedError()
+        self.instrument.control_ren(visa_constants.VI_GPIB_REN_DEASSERT_GTL)
 
     def lock(self):
         "Send lock command"
-        raise NotImplementedError()
+        if not hasattr(self.instrument, 'lock_excl'):
+            raise NotImplementedError()
+        self.instrument.lock_excl()
 
     def unlock(self):
         "Send unlock command"
-        raise NotImplementedError()
+        if not hasattr(self.instrument, 'unlock'):
+            raise NotImplementedError()
+        self.instrument.unlock()
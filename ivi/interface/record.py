@@ -0,0 +1,245 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+Session record and replay interfaces
+
+RecordingInstrument wraps another interface object and logs all traffic to a
+file.  ReplayInstrument serves a recorded session back to a driver without
+the instrument attached:
+
+    dmm = ivi.agilent.agilent34401A()
+    dmm.initialize(RecordingInstrument(vxi11.Instrument("192.168.1.104"), "dmm.ivirec"))
+    ...
+    dmm.initialize(ReplayInstrument("dmm.ivirec"))
+
+Log format: a 6 byte header (magic, version, flags) followed by frames of
+frame type (1 byte), time since start of session (double) and payload length
+(uint32), all big endian, and then the payload.  If the compress flag is set,
+everything after the header is a zlib stream.
+
+"""
+
+import struct
+import time
+import zlib
+
+MAGIC = b'IVIR'
+VERSION = 1
+
+FLAG_COMPRESS = 0x01
+
+FRAME_WRITE = b'W'
+FRAME_READ = b'R'
+FRAME_STB = b'S'
+FRAME_TRIGGER = b'T'
+FRAME_CLEAR = b'C'
+FRAME_REMOTE = b'M'
+FRAME_LOCAL = b'L'
+
+_header = struct.Struct('>4sBB')
+_frame = struct.Struct('>cdI')
+
+
+class RecordingInstrument(object):
+    "Interface wrapper that records a session to a file"
+
+    def __init__(self, instrument, f, compress=False):
+        self.instrument = instrument
+        if isinstance(f, str):
+            f = open(f, 'wb')
+        self.file = f
+        self.compressor = None
+        self.start = time.time()
+
+        flags = 0
+        if compress:
+            flags |= FLAG_COMPRESS
+            self.compressor = zlib.compressobj()
+        self.file.write(_header.pack(MAGIC, VERSION, flags))
+
+    def _record(self, frame_type, data=b''):
+        if self.file is None:
+            return
+        data = _frame.pack(frame_type, time.time() - self.start, len(data)) + data
+        if self.compressor is not None:
+            data = self.compressor.compress(data)
+        self.file.write(data)
+
+    def write_raw(self, data):
+        "Write binary data to instrument"
+        self._record(FRAME_WRITE, data)
+        self.instrument.write_raw(data)
+
+    def read_raw(self, num=-1):
+        "Read binary data from instrument"
+        data = self.instrument.read_raw(num)
+        self._record(FRAME_READ, data)
+        return data
+
+    def ask_raw(self, data, num=-1):
+        "Write then read binary data"
+        self.write_raw(data)
+        return self.read_raw(num)
+
+    def read_stb(self):
+        "Read status byte"
+        stb = self.instrument.read_stb()
+        self._record(FRAME_STB, struct.pack('>B', stb))
+        return stb
+
+    def trigger(self):
+        "Send trigger command"
+        self.instrument.trigger()
+        self._record(FRAME_TRIGGER)
+
+    def clear(self):
+        "Send clear command"
+        self.instrument.clear()
+        self._record(FRAME_CLEAR)
+
+    def remote(self):
+        "Send remote command"
+        self.instrument.remote()
+        self._record(FRAME_REMOTE)
+
+    def local(self):
+        "Send local command"
+        self.instrument.local()
+        self._record(FRAME_LOCAL)
+
+    def close(self):
+        "Close connection and log file"
+        if self.file is not None:
+            if self.compressor is not None:
+                self.file.write(self.compressor.flush())
+            self.file.close()
+            self.file = None
+        self.instrument.close()
+
+
+def read_log(f):
+    "Read a session log and return a list of (frame type, time, data) tuples"
+    if isinstance(f, str):
+        with open(f, 'rb') as fp:
+            data = fp.read()
+    else:
+        data = f.read()
+
+    magic, version, flags = _header.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise IOError("Invalid session log")
+
+    data = data[_header.size:]
+    if flags & FLAG_COMPRESS:
+        data = zlib.decompress(data)
+
+    frames = list()
+    ind = 0
+    while ind < len(data):
+        frame_type, t, length = _frame.unpack_from(data, ind)
+        ind += _frame.size
+        frames.append((frame_type, t, data[ind:ind+length]))
+        ind += length
+    return frames
+
+
+class ReplayInstrument(object):
+    "Interface that plays back a recorded session"
+
+    def __init__(self, f, timing=False, strict=True):
+        self.frames = read_log(f)
+        self.timing = timing
+        self.strict = strict
+        self.index = 0
+        self.start = None
+
+    def _next(self, frame_type):
+        if self.index >= len(self.frames):
+            raise IOError("End of recorded session")
+        ft, t, data = self.frames[self.index]
+        if ft != frame_type:
+            raise IOError("Session mismatch at frame %d: expected %s, got %s" %
+                    (self.index, ft.decode(), frame_type.decode()))
+        self.index += 1
+        if self.timing:
+            if self.start is None:
+                self.start = time.time() - t
+            delay = t - (time.time() - self.start)
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    def _check(self, frame_type):
+        # the recorded interface did not support this operation and the
+        # driver fell back to sending a command
+        if self.index < len(self.frames) and self.frames[self.index][0] != frame_type:
+            raise NotImplementedError()
+
+    def write_raw(self, data):
+        "Write binary data to instrument"
+        rec = self._next(FRAME_WRITE)
+        if self.strict and rec != data:
+            raise IOError("Session mismatch at frame %d: expected %r, got %r" %
+                    (self.index-1, rec, data))
+
+    def read_raw(self, num=-1):
+        "Read binary data from instrument"
+        return self._next(FRAME_READ)
+
+    def ask_raw(self, data, num=-1):
+        "Write then read binary data"
+        self.write_raw(data)
+        return self.read_raw(num)
+
+    def read_stb(self):
+        "Read status byte"
+        self._check(FRAME_STB)
+        return struct.unpack('>B', self._next(FRAME_STB))[0]
+
+    def trigger(self):
+        "Send trigger command"
+        self._check(FRAME_TRIGGER)
+        self._next(FRAME_TRIGGER)
+
+    def clear(self):
+        "Send clear command"
+        self._check(FRAME_CLEAR)
+        self._next(FRAME_CLEAR)
+
+    def remote(self):
+        "Send remote command"
+        self._next(FRAME_REMOTE)
+
+    def local(self):
+        "Send local command"
+        self._next(FRAME_LOCAL)
+
+    def close(self):
+        "Close connection"
+        pass
+
+    def rewind(self):
+        "Restart playback from the beginning of the session"
+        self.index = 0
+        self.start = None
@@ -0,0 +1,308 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+Simulated instrument interface
+
+Unlike the simulate driver option, which skips all instrument I/O, a driver
+connected to a SimInstrument runs its normal code paths against an in-process
+response model.  Use a resource string such as SIM::dmm::INSTR, or pass a
+SimInstrument object in place of a resource:
+
+    dmm = ivi.agilent.agilent34401A(ivi.interface.sim.SimInstrument('dmm', model='34401A'))
+
+Set commands are stored and echoed back to the matching query, so get/set
+round trips work for any driver.  Model classes add responses for queries
+that need generated data, such as readings and waveforms.  All traffic is
+kept in a ring buffer (SimInstrument.log) instead of being printed.
+
+SimInstrument is meant for trying out drivers and scripts without hardware,
+so it accepts any command and needs no setup.  The driver tests use the
+stricter virtual instruments in ivi.test.virtual instead.  Those declare the
+command tree of the instrument, report undefined headers and out of range
+values through the error queue, and model transport timing.
+
+"""
+
+import random
+import re
+from collections import deque
+
+import numpy as np
+
+def parse_visa_resource_string(resource_string):
+    # valid resource strings:
+    # SIM::INSTR
+    # SIM::dmm::INSTR
+    # SIM0::scope::INSTR
+    m = re.match(r'^(?P<prefix>(?P<type>SIM)\d*)(::(?P<arg1>[^\s:]+))?(::(?P<suffix>INSTR))$',
+            resource_string, re.I)
+
+    if m is not None:
+        return dict(
+                type = m.group('type').upper(),
+                prefix = m.group('prefix'),
+                arg1 = m.group('arg1'),
+                suffix = m.group('suffix'),
+        )
+
+
+class SimModel(object):
+    "Response model that stores settings and echoes them back to queries"
+
+    def __init__(self, seed=None):
+        self.state = dict()
+        self.responses = list()
+        self.default_response = '0'
+        self.random = random.Random(seed)
+
+    def add_response(self, pattern, response):
+        """Add a response for commands matching a regular expression.  The
+        response can be a string, bytes, None for no response, or a function
+        that takes the match object and returns one of these.  Responses added
+        later take precedence."""
+        regex = re.compile('^:?' + pattern + '$', re.I)
+        self.responses.insert(0, (regex, response))
+
+    def handle(self, cmd):
+        "Process a single command and return the response, if any"
+        for regex, response in self.responses:
+            m = regex.match(cmd)
+            if m is not None:
+                if callable(response):
+                    return response(m)
+                return response
+
+        header, sep, args = cmd.partition(' ')
+        header = header.lower().lstrip(':')
+        if header.endswith('?'):
+            return self.state.get(header[:-1], self.default_response)
+        self.state[header] = args.strip()
+        return None
+
+    def reading(self, value, noise):
+        "Return a reading with gaussian noise"
+        return "%e" % self.random.gauss(value, noise)
+
+
+class ScpiModel(SimModel):
+    "Response model for IEEE 488.2 and SCPI common commands"
+
+    def __init__(self, manufacturer='Simulated', model='SIM', serial='0',
+                firmware='1.0', options='', seed=None):
+        super(ScpiModel, self).__init__(seed)
+
+        self.manufacturer = manufacturer
+        self.model = model
+        self.serial = serial
+        self.firmware = firmware
+        self.options = options
+        self.slots = dict()
+
+        self.add_response(r'\*idn\?', lambda m: ','.join((self.manufacturer,
+                self.model, self.serial, self.firmware)))
+        self.add_response(r'\*opt\?', lambda m: self.options or '0')
+        self.add_response(r'\*(stb|esr|tst)\?', '0')
+        self.add_response(r'\*opc\?', '1')
+        self.add_response(r'\*(cls|trg|wai|opc)', None)
+        self.add_response(r'\*rst', self._reset)
+        self.add_response(r'\*sav\s+(.+)', self._save)
+        self.add_response(r'\*rcl\s+(.+)', self._recall)
+        self.add_response(r'syst(em)?:err(or)?(:next)?\?', '+0,"No error"')
+
+    def _reset(self, m):
+        self.state = dict()
+
+    def _save(self, m):
+        self.slots[m.group(1)] = dict(self.state)
+
+    def _recall(self, m):
+        self.state = dict(self.slots.get(m.group(1), dict()))
+
+
+class DmmModel(ScpiModel):
+    "Response model for digital multimeters"
+
+    def __init__(self, value=1.0, noise=1e-3, **kwargs):
+        super(DmmModel, self).__init__(**kwargs)
+
+        self.value = value
+        self.noise = noise
+
+        self.add_response(r'(read|fetch|meas(ure)?(:\S+)?)\?.*',
+                lambda m: self.reading(self.value, self.noise))
+
+
+class ScopeModel(ScpiModel):
+    "Response model for oscilloscopes, returning sine wave records"
+
+    def __init__(self, points=1000, frequency=1e3, amplitude=1.0, noise=1e-3,
+                sample_rate=1e6, **kwargs):
+        super(ScopeModel, self).__init__(**kwargs)
+
+        self.points = points
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.noise = noise
+        self.sample_rate = sample_rate
+        self.yincrement = 1e-4
+        self.yreference = 32768
+        self.np_random = np.random.RandomState(kwargs.get('seed'))
+
+        self.add_response(r'wav(eform)?:pre(amble)?\?', self._preamble)
+        self.add_response(r'wav(eform)?:data\?', self._data)
+        self.add_response(r'meas(ure)?:\S+\?.*',
+                lambda m: self.reading(self.amplitude, self.noise))
+
+    def _preamble(self, m):
+        # format word, type normal, points, count, x increment, x origin,
+        # x reference, y increment, y origin, y reference
+        return "1,0,%d,1,%e,%e,0,%e,%e,%d" % (self.points, 1.0/self.sample_rate,
+                -self.points/self.sample_rate/2, self.yincrement, 0.0, self.yreference)
+
+    def _data(self, m):
+        t = (np.arange(self.points) - self.points/2) / self.sample_rate
+        y = self.amplitude * np.sin(2*np.pi*self.frequency*t)
+        y += self.np_random.normal(0, self.noise, self.points)
+        # 0 is the hole value
+        counts = np.clip(np.round(y / self.yincrement) + self.yreference, 1, 65535)
+        data = counts.astype('>u2').tobytes()
+        return str('#8%08d' % len(data)).encode('utf-8') + data
+
+
+models = {
+    'scpi': ScpiModel,
+    'dmm': DmmModel,
+    'scope': ScopeModel,
+}
+
+
+class SimInstrument(object):
+    "Simulated instrument interface"
+
+    def __init__(self, family='scpi', log_size=1000, **kwargs):
+        if type(family) is str:
+            if '::' in family:
+                res = parse_visa_resource_string(family)
+
+                if res is None:
+                    raise IOError("Invalid resource string")
+
+                family = res['arg1'] or 'scpi'
+            if family.lower() not in models:
+                raise IOError("Unknown simulation model %s" % family)
+            family = models[family.lower()](**kwargs)
+
+        self.model = family
+        self.log = deque(maxlen=log_size)
+        self.read_queue = deque()
+        self.status_byte = 0
+
+    def _process(self, cmds):
+        # responses to the queries in one program message are sent as a
+        # single response message
+        resp = list()
+        for cmd in cmds:
+            self.log.append(('write', cmd))
+            r = self.model.handle(cmd)
+            if r is not None:
+                resp.append(r if type(r) is bytes else str(r).encode('utf-8'))
+        if resp:
+            self.read_queue.append(b';'.join(resp) + b'\n')
+
+    def write_raw(self, data):
+        "Write binary data to instrument"
+        if b'#' in data:
+            # binary block data, may contain separators
+            self._process([data.decode('utf-8', 'replace').rstrip('\r\n')])
+            return
+        self.write(data.decode('utf-8'))
+
+    def read_raw(self, num=-1):
+        "Read binary data from instrument"
+        if not self.read_queue:
+            self.log.append(('timeout', None))
+            raise IOError("Read timeout")
+        data = self.read_queue.popleft()
+        if num >= 0 and num < len(data):
+            self.read_queue.appendleft(data[num:])
+            data = data[:num]
+        self.log.append(('read', data))
+        return data
+
+    def ask_raw(self, data, num=-1):
+        "Write then read binary data"
+        self.write_raw(data)
+        return self.read_raw(num)
+
+    def write(self, message, encoding = 'utf-8'):
+        "Write string to instrument"
+        if type(message) is tuple or type(message) is list:
+            # recursive call for a list of commands
+            for message_i in message:
+                self.write(message_i, encoding)
+            return
+
+        cmds = [cmd.strip() for cmd in str(message).split(';')]
+        self._process([cmd for cmd in cmds if cmd])
+
+    def read(self, num=-1, encoding = 'utf-8'):
+        "Read string from instrument"
+        return self.read_raw(num).decode(encoding).rstrip('\r\n')
+
+    def ask(self, message, num=-1, encoding = 'utf-8'):
+        "Write then read string"
+        if type(message) is tuple or type(message) is list:
+            # recursive call for a list of commands
+            val = list()
+            for message_i in message:
+                val.append(self.ask(message_i, num, encoding))
+            return val
+
+        self.write(message, encoding)
+        return self.read(num, encoding)
+
+    def read_stb(self):
+        "Read status byte"
+        return self.status_byte
+
+    def trigger(self):
+        "Send trigger command"
+        self.log.append(('trigger', None))
+
+    def clear(self):
+        "Send clear command"
+        self.log.append(('clear', None))
+        self.read_queue.clear()
+
+    def remote(self):
+        "Send remote command"
+        self.log.append(('remote', None))
+
+    def local(self):
+        "Send local command"
+        self.log.append(('local', None))
+
+    def close(self):
+        "Close connection"
+        pass
@@ -25,10 +25,14 @@ THE SOFTWARE.
 """
 
 # import libraries
-import inspect
+import json
 import numpy as np
+import os
 import re
-from functools import partial
+import sys
+import threading
+from collections import deque
+from functools import partial, wraps
 
 # try importing drivers
 # python-vxi11 for LAN instruments
@@ -62,6 +66,9 @@ try:
 except ImportError:
     pass
 
+# simulated instruments
+from .interface import sim
+
 # set to True to try loading PyVISA first before
 # other interface libraries
 _prefer_pyvisa = False
@@ -74,6 +81,18 @@ def set_prefer_pyvisa(value=True):
     global _prefer_pyvisa
     _prefer_pyvisa = bool(value)
 
+# directory for persistent cache files, such as
+# memory slot snapshots; None disables persistence
+_cache_directory = os.environ.get('PYTHON_IVI_CACHE_DIR')
+
+def get_cache_directory():
+    global _cache_directory
+    return _cache_directory
+
+def set_cache_directory(path=None):
+    global _cache_directory
+    _cache_directory = path
+
 # version information
 from .version import __version__
 version = __version__
@@ -366,6 +385,11 @@ class IviContainer(PropertyCollection):
         if type(doc) == Doc:
             doc.name = name
 
+        if type(attr) == tuple:
+            attr = tuple(self._io_locked(f) for f in attr)
+        else:
+            attr = self._io_locked(attr)
+
         if cur_obj == self:
             if type(attr) == tuple:
                 fget, fset, fdel = attr
@@ -379,6 +403,19 @@ class IviContainer(PropertyCollection):
             else:
                 cur_obj._add_method(base, attr, doc)
 
+    def _io_locked(self, f):
+        "Wrap a property or method function to hold the driver I/O lock while it runs"
+        if f is None:
+            return None
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            lock = self.__dict__.get('_io_lock')
+            if lock is None:
+                return f(*args, **kwargs)
+            with lock:
+                return f(*args, **kwargs)
+        return wrapper
+
     def _add_method(self, name, f, doc = None):
         self._add_attribute(name, f, doc)
 
@@ -462,6 +499,44 @@ def decode_ieee_block(data):
         return data[ind:]
 
 
+def _convert_int(s):
+    try:
+        return int(s)
+    except ValueError:
+        return int(float(s))
+
+
+def _convert_bool(s):
+    s = s.strip().upper()
+    if s in ('ON', 'TRUE'):
+        return True
+    if s in ('OFF', 'FALSE'):
+        return False
+    return float(s) != 0
+
+
+def _convert_str(s):
+    s = s.strip()
+    if len(s) >= 2 and s[0] == s[-1] and s[0] in '"\'':
+        s = s[1:-1].replace(s[0]*2, s[0])
+    return s
+
+
+def _convert_array(s):
+    return np.array([float(x) for x in s.split(',')])
+
+
+# response converters for Driver._ask_many
+_converters = {
+    None: None,
+    float: float,
+    int: _convert_int,
+    bool: _convert_bool,
+    str: _convert_str,
+    list: _convert_array
+}
+
+
 def get_sig(sig):
     "Parse various signal inputs into x and y components"
     if type(sig) == tuple and len(sig) == 2:
@@ -727,6 +802,26 @@ class DriverOperation(IviContainer):
                         override both the default value and the value that the user specifies in
                         the IVI configuration store.
                         """)
+        self._add_property('driver_operation.cache_stats',
+                        self._get_driver_operation_cache_stats,
+                        None,
+                        None,
+                        """
+                        Returns a dict of cache statistics for the session:
+                        
+                        * invalidated: number of cached attributes invalidated by setters and
+                          operations such as reset, recall and setup loads
+                        * preserved: number of cached attributes left valid by those operations
+                          because they are not affected by them
+                        * saved: number of instrument queries avoided by reading preserved
+                          attributes or known defaults after a reset from the cache
+                        * hits: number of attribute reads served from the cache
+                        * misses: number of attribute reads that queried the instrument; reads
+                          made by driver_operation.prefetch are not counted
+                        * attributes: dict of hits, misses and invalidated counts for each
+                          cached attribute; indexed attributes are listed per index, for
+                          example 'channel_offset_0'
+                        """)
         self._add_property('driver_operation.driver_setup',
                         self._get_driver_operation_driver_setup,
                         None,
@@ -971,6 +1066,27 @@ class DriverOperation(IviContainer):
                         This function invalidates the cached values of all attributes for the
                         session.
                         """)
+        self._add_method('driver_operation.prefetch',
+                        self._driver_operation_prefetch,
+                        """
+                        Reads a list of attributes into the cache, for example::
+                        
+                            scope.driver_operation.prefetch(['channels[0].offset',
+                                                             'channels[0].range',
+                                                             'timebase.scale'])
+                        
+                        Where the instrument accepts compound SCPI queries, the queries for all
+                        of the attributes that are not already cached are sent as a single
+                        program message and the responses are split up and stored in the
+                        cache, so subsequent reads of the attributes do not access the
+                        instrument. Attributes whose query depends on other attributes, such as
+                        a range that depends on the measurement function, take an additional
+                        compound query. Attributes that need to send commands to be read are
+                        read individually.
+                        
+                        Attribute names are the same as those used by capture_state. If no list
+                        is given, all readable and writable attributes are prefetched.
+                        """)
         self._add_method('driver_operation.reset_interchange_check',
                         self._driver_operation_reset_interchange_check,
                         """
@@ -1018,6 +1134,17 @@ class DriverOperation(IviContainer):
     def _set_driver_operation_cache(self, value):
         self._driver_operation_cache = bool(value)
     
+    def _get_driver_operation_cache_stats(self):
+        stats = dict(self._cache_stats)
+        stats['attributes'] = dict()
+        stats['hits'] = 0
+        stats['misses'] = 0
+        for tag, s in self._cache_attribute_stats.items():
+            stats['attributes'][tag] = dict(hits=s[0], misses=s[1], invalidated=s[2])
+            stats['hits'] += s[0]
+            stats['misses'] += s[1]
+        return stats
+    
     def _get_driver_operation_driver_setup(self):
         return self._driver_operation_driver_setup
     
@@ -1076,6 +1203,9 @@ class DriverOperation(IviContainer):
     def _driver_operation_invalidate_all_attributes(self):
         pass
 
+    def _driver_operation_prefetch(self, attributes=None):
+        pass
+
     def _driver_operation_reset_interchange_check(self):
         pass
 
@@ -1470,7 +1600,9 @@ class DriverUtility(IviContainer):
         return (error_code, error_message)
     
     def _utility_lock_object(self):
-        pass
+        self._io_lock.acquire()
+        self._io_lock_owner = threading.current_thread()
+        self._io_lock_count += 1
     
     def _utility_reset(self):
         pass
@@ -1484,7 +1616,40 @@ class DriverUtility(IviContainer):
         return (code, message)
     
     def _utility_unlock_object(self):
-        pass
+        # unlocks without a matching lock_object call from this thread are
+        # ignored, so they cannot release locks held by I/O in progress
+        if self._io_lock_count == 0 or self._io_lock_owner is not threading.current_thread():
+            return
+        self._io_lock_count -= 1
+        if self._io_lock_count == 0:
+            self._io_lock_owner = None
+        self._io_lock.release()
+
+
+class _PrefetchQuery(Exception): pass
+
+
+class _PrefetchInterface(object):
+    """Interface stand-in used by prefetch.  Serves responses to matching
+    queries and aborts the attribute getter on any other I/O, recording the
+    query that it needed."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.query = None
+
+    def ask(self, data, num=-1, encoding='utf-8'):
+        if type(data) is str:
+            if data in self.responses:
+                return self.responses.pop(data)
+            self.query = data
+        raise _PrefetchQuery()
+
+    def _abort(self, *args, **kwargs):
+        raise _PrefetchQuery()
+
+    write = read = write_raw = read_raw = ask_raw = _abort
+    read_stb = trigger = clear = remote = local = close = _abort
 
 
 class Driver(DriverOperation, DriverIdentity, DriverUtility):
@@ -1500,8 +1665,28 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
         
         self._interface = None
         self._initialized = False
+        # guards instrument I/O, held by utility.lock_object
+        self._io_lock = threading.RLock()
+        self._io_lock_owner = None
+        self._io_lock_count = 0
         self.__dict__.setdefault('_instrument_id', '')
         self._cache_valid = dict()
+        self._cache_dependencies = dict()
+        self._cache_invalidation = dict()
+        self._cache_persistent = ['identity_']
+        self._cache_volatile = list()
+        self._cache_preserved = set()
+        self._cache_stats = dict(invalidated=0, preserved=0, saved=0)
+        self._cache_attribute_stats = dict()
+        self._reset_defaults = dict()
+        self._identity_cache = dict()
+        self._identity_cache_check = None
+        self._state_dependencies = dict()
+        self._write_batch = None
+        self._write_batch_supported = False
+        self._write_batch_max_length = 1024
+        self._simulate_log = deque(maxlen=1000)
+        self._middleware = list()
         
         super(Driver, self).__init__(*args, **kwargs)
         
@@ -1686,6 +1871,72 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
                           again.
                         * May deallocate internal resources used by the IVI session.
                         """)
+        self._add_method('apply_state',
+                        self._apply_state,
+                        """
+                        Configures the instrument from a dict that maps attribute names to
+                        values, for example::
+                        
+                            scope.apply_state({'channels[0].range': 4.0,
+                                               'channels[0].offset': 0.5,
+                                               'timebase.scale': 1e-3})
+                        
+                        Attributes whose cached value is valid and already equal to the
+                        requested value are skipped, so only the settings that actually changed
+                        are sent to the instrument. Changed attributes are set in an order that
+                        respects the dependencies declared by the specific driver (for example,
+                        range before offset) and, where the instrument supports it, the
+                        resulting commands are sent as a single program message.
+                        
+                        Returns a list of the names of the attributes that were set.
+                        """)
+        self._add_method('capture_state',
+                        self._capture_state,
+                        """
+                        Returns a dict that maps the names of all readable and writable
+                        attributes of the driver to their current values. Cached values are
+                        used where valid; the instrument is queried for the rest. The returned
+                        dict can be passed to apply_state to restore the configuration.
+                        
+                        An optional list of attribute names restricts the snapshot to those
+                        attributes.
+                        """)
+        self._add_method('ask_many',
+                        self._ask_many,
+                        """
+                        Sends a list of queries to the instrument and returns a list of the
+                        responses. Where the instrument accepts compound SCPI queries, the
+                        queries are sent as a single program message and the response is split
+                        on semicolons, so the whole list takes one round trip; otherwise the
+                        queries are sent one at a time.
+                        
+                        The optional types argument is a type or a list with one type per query
+                        used to convert the responses: float, int, bool (1, 0, ON or OFF), str
+                        (quotes are removed) or list (a comma separated list of numbers,
+                        returned as an array). Any other callable is applied to the response
+                        string. By default the response strings are returned unchanged.
+                        
+                        Commands that are not queries, such as a channel selection, may be
+                        included in the list; they are sent in order and return no response.
+                        For example::
+                        
+                            v, i, on = psu.ask_many(['meas:volt?', 'meas:curr?', 'outp?'],
+                                                    [float, float, bool])
+                        """)
+        self._add_method('add_middleware',
+                        self._add_middleware,
+                        """
+                        Inserts a middleware object between the driver and the instrument
+                        interface. Middleware sees all raw instrument traffic and can be used for
+                        profiling, tracing or fault injection; see ivi.interface.middleware. The
+                        most recently added middleware is closest to the driver. Middleware is
+                        kept when the driver is initialized again.
+                        """)
+        self._add_method('remove_middleware',
+                        self._remove_middleware,
+                        """
+                        Removes a middleware object that was added with add_middleware.
+                        """)
 
         # inherit prefer_pyvisa from global setting
         self._prefer_pyvisa = _prefer_pyvisa
@@ -1723,7 +1974,7 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
 
         # process resource
         if self._driver_operation_simulate:
-            print("Simulating; ignoring resource")
+            self._simulate_log.append("Simulating; ignoring resource")
         elif resource is None:
             raise IOException('No resource specified!')
         elif type(resource) == str:
@@ -1746,7 +1997,8 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
             # ASRL::COM1,9600,8n1::INSTR
             # ASRL::/dev/ttyUSB0,9600::INSTR
             # ASRL::/dev/ttyUSB0,9600,8n1::INSTR
-            m = re.match('^(?P<prefix>(?P<type>TCPIP|USB|GPIB|ASRL)\d*)(::(?P<arg1>[^\s:]+))?(::(?P<arg2>[^\s:]+(\[.+\])?))?(::(?P<arg3>[^\s:]+))?(::(?P<arg4>[^\s:]+))?(::(?P<suffix>INSTR))$', resource, re.I)
+            # SIM::dmm::INSTR
+            m = re.match(r'^(?P<prefix>(?P<type>TCPIP|USB|GPIB|ASRL|SIM)\d*)(::(?P<arg1>[^\s:]+))?(::(?P<arg2>[^\s:]+(\[.+\])?))?(::(?P<arg3>[^\s:]+))?(::(?P<arg4>[^\s:]+))?(::(?P<suffix>INSTR))$', resource, re.I)
             if m is None:
                 if 'pyvisa' in globals():
                     # connect with PyVISA
@@ -1813,6 +2065,9 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
                         self._interface = pyvisa.PyVisaInstrument(resource)
                     else:
                         raise IOException('Cannot use resource type %s' % res_type)
+                elif res_type == 'SIM':
+                    # simulated instrument
+                    self._interface = sim.SimInstrument(resource)
 
                 elif 'pyvisa' in globals():
                     # connect with PyVISA
@@ -1828,13 +2083,18 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
         elif 'usbtmc' in globals() and resource.__class__ == usbtmc.Instrument:
             # Got a usbtmc instrument, can use it as is
             self._interface = resource
-        elif set(['read_raw', 'write_raw']).issubset(set(resource.__class__.__dict__)):
+        elif hasattr(resource, 'read_raw') and hasattr(resource, 'write_raw'):
             # has read_raw and write_raw, so should be a usable interface
             self._interface = resource
         else:
             # don't have a usable resource
             raise IOException('Invalid resource')
 
+        if self._interface is not None:
+            for mw in self._middleware:
+                mw.instrument = self._interface
+                self._interface = mw
+
         self.driver_operation.invalidate_all_attributes()
 
         self._initialized = True
@@ -1858,11 +2118,10 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
     
     def _get_cache_tag(self, tag=None, skip=1):
         if tag is None:
-            stack = inspect.stack()
-            start = 0 + skip
-            if len(stack) < start + 1:
+            try:
+                tag = sys._getframe(skip).f_code.co_name
+            except ValueError:
                 return ''
-            tag = stack[start][3] 
         
         if tag[0:4] == "_get": tag = tag[4:]
         if tag[0:4] == "_set": tag = tag[4:]
@@ -1877,103 +2136,654 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
         if index >= 0:
             tag = tag + '_%d' % index
         try:
-            return self._cache_valid[tag]
+            valid = self._cache_valid[tag]
         except KeyError:
             self._cache_valid[tag] = False
-            return False
+            valid = False
+        try:
+            stats = self._cache_attribute_stats[tag]
+        except KeyError:
+            stats = self._cache_attribute_stats[tag] = [0, 0, 0]
+        if valid:
+            stats[0] += 1
+            if tag in self._cache_preserved:
+                # would have been a query without targeted invalidation
+                self._cache_preserved.discard(tag)
+                self._cache_stats['saved'] += 1
+        else:
+            stats[1] += 1
+        return valid
 
     def _set_cache_valid(self, valid=True, tag=None, index=-1):
         tag = self._get_cache_tag(tag, 2)
         if index >= 0:
             tag = tag + '_%d' % index
+        if not valid and self._cache_valid.get(tag, False):
+            self._count_cache_invalidation(tag)
         self._cache_valid[tag] = valid
+        self._cache_preserved.discard(tag)
+
+    def _invalidate_dependencies(self, tag, index=-1):
+        "Invalidate the cached attributes listed in _cache_dependencies for a changed attribute"
+        for dep in self._cache_dependencies.get(tag, []):
+            if index >= 0:
+                dep = dep + '_%d' % index
+            if self._cache_valid.get(dep, False):
+                self._cache_valid[dep] = False
+                self._count_cache_invalidation(dep)
+            self._cache_preserved.discard(dep)
+
+    def _count_cache_invalidation(self, tag):
+        self._cache_stats['invalidated'] += 1
+        try:
+            self._cache_attribute_stats[tag][2] += 1
+        except KeyError:
+            self._cache_attribute_stats[tag] = [0, 0, 1]
+
+    def _invalidate_attributes(self, operation=None):
+        "Invalidate the cached attributes affected by an operation"
+        # attributes matching the prefixes listed for the operation are
+        # invalidated, by default everything that is not persistent
+        prefixes = self._cache_invalidation.get(operation)
+        if prefixes is None:
+            persistent = tuple(self._cache_persistent)
+        for tag in self._cache_valid:
+            if not self._cache_valid[tag]:
+                continue
+            if prefixes is None:
+                affected = not tag.startswith(persistent)
+            else:
+                affected = tag.startswith(tuple(prefixes))
+            if affected:
+                self._cache_valid[tag] = False
+                self._cache_preserved.discard(tag)
+                self._count_cache_invalidation(tag)
+            elif tag not in self._cache_preserved:
+                self._cache_preserved.add(tag)
+                self._cache_stats['preserved'] += 1
+
+    def _get_cache_value(self, tag):
+        "Return the stored value for a cache tag"
+        try:
+            return self.__dict__['_' + tag]
+        except KeyError:
+            pass
+        m = re.match(r'^(.+)_(\d+)$', tag)
+        if m is not None:
+            lst = self.__dict__.get('_' + m.group(1))
+            if type(lst) is list:
+                return lst[int(m.group(2))]
+        raise KeyError(tag)
+
+    def _set_cache_value(self, tag, value):
+        "Store the value for a cache tag"
+        if '_' + tag in self.__dict__:
+            self.__dict__['_' + tag] = value
+            return
+        m = re.match(r'^(.+)_(\d+)$', tag)
+        if m is not None:
+            lst = self.__dict__.get('_' + m.group(1))
+            if type(lst) is list:
+                lst[int(m.group(2))] = value
+                return
+        raise KeyError(tag)
+
+    def _get_cache_snapshot(self):
+        "Return a dict of the valid cached values that are not persistent or volatile"
+        snapshot = dict()
+        skip = tuple(self._cache_persistent + self._cache_volatile)
+        for tag in self._cache_valid:
+            if not self._cache_valid[tag] or tag.startswith(skip):
+                continue
+            try:
+                value = self._get_cache_value(tag)
+            except (KeyError, IndexError):
+                continue
+            if type(value) in (bool, int, float, str):
+                snapshot[tag] = value
+        return snapshot
+
+    def _load_cache_snapshot(self, snapshot):
+        "Load values from a snapshot into the cache and mark them valid"
+        for tag in snapshot:
+            try:
+                self._set_cache_value(tag, snapshot[tag])
+            except (KeyError, IndexError):
+                continue
+            self._cache_valid[tag] = True
+            self._cache_preserved.add(tag)
+
+    def _load_reset_defaults(self):
+        "Load the documented instrument state after a reset into the cache"
+        # values for indexed attributes apply to all indicies
+        for tag in self._reset_defaults:
+            value = self._reset_defaults[tag]
+            try:
+                cur = self.__dict__['_' + tag]
+            except KeyError:
+                continue
+            if type(cur) is list:
+                for i in range(len(cur)):
+                    cur[i] = value
+                    self._set_cache_valid(True, tag, i)
+                    self._cache_preserved.add(tag + '_%d' % i)
+            else:
+                self.__dict__['_' + tag] = value
+                self._set_cache_valid(True, tag)
+                self._cache_preserved.add(tag)
+
+    def _get_identity_cache_file(self):
+        "Return the persistent identity cache file, or None if not available"
+        directory = get_cache_directory()
+        if directory is None or self._driver_operation_simulate:
+            return None
+        if not self._driver_operation_io_resource_descriptor:
+            return None
+        return os.path.join(directory, 'identity.json')
+
+    def _read_identity_cache_file(self, filename):
+        try:
+            with open(filename, 'r') as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return dict()
+
+    def _check_identity_cache(self, check):
+        """Validate the persistent identity cache entry for the current resource
+        against a cheap identity query response.  Returns True if the cached
+        values can be used; otherwise the entry is started over.  Without a
+        cache directory, the values are only kept for the session."""
+        if check == self._identity_cache_check:
+            return True
+        self._identity_cache = dict()
+        self._identity_cache_check = check
+        filename = self._get_identity_cache_file()
+        if filename is None:
+            return False
+        data = self._read_identity_cache_file(filename)
+        entry = data.get(self._driver_operation_io_resource_descriptor)
+        if (entry is None or entry.get('check') != check or
+                entry.get('driver') != self.__class__.__name__):
+            return False
+        self._identity_cache = entry.get('values', dict())
+        return True
+
+    def _write_identity_cache(self):
+        filename = self._get_identity_cache_file()
+        if filename is None or self._identity_cache_check is None:
+            return
+        data = self._read_identity_cache_file(filename)
+        data[self._driver_operation_io_resource_descriptor] = dict(
+                check=self._identity_cache_check,
+                driver=self.__class__.__name__,
+                values=self._identity_cache)
+        try:
+            if not os.path.isdir(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+            with open(filename, 'w') as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+        except (IOError, OSError):
+            pass
+
+    def _ask_static(self, msg):
+        """Query a value that does not change for a given instrument, such as
+        installed options.  The response is kept in the identity cache, which
+        is only written to disk once the entry has been validated with
+        _check_identity_cache."""
+        try:
+            return self._identity_cache[msg]
+        except KeyError:
+            pass
+        value = self._ask(msg)
+        self._identity_cache[msg] = value
+        self._write_identity_cache()
+        return value
+
+    def _add_middleware(self, middleware):
+        self._middleware.append(middleware)
+        if self._interface is not None:
+            middleware.instrument = self._interface
+            self._interface = middleware
+
+    def _remove_middleware(self, middleware):
+        self._middleware.remove(middleware)
+        if self._interface is middleware:
+            self._interface = middleware.instrument
+            return
+        obj = self._interface
+        while obj is not None and obj in self._middleware:
+            if obj.instrument is middleware:
+                obj.instrument = middleware.instrument
+                return
+            obj = obj.instrument
 
     def _driver_operation_invalidate_all_attributes(self):
         self._cache_valid = dict()
+        self._cache_preserved = set()
 
-    def _write_raw(self, data):
-        "Write binary data to instrument"
-        if self._driver_operation_simulate:
-            print("[simulating] Call to write_raw")
+    def _driver_operation_prefetch(self, attributes=None):
+        if self._driver_operation_simulate or not self._driver_operation_cache:
             return
         if not self._initialized or self._interface is None:
             raise NotInitializedException()
-        self._interface.write_raw(data)
-    
-    def _read_raw(self, num=-1):
-        "Read binary data from instrument"
+        if attributes is None:
+            attributes = self._get_state_names()
+        self._call_pipelined([self._get_state_property(name)[0] for name in attributes])
+
+    def _call_pipelined(self, funcs):
+        """Call functions that query the instrument, such as property getters,
+        sending their queries together as compound queries.  Returns the list
+        of results, with None for functions not supported by the instrument."""
+        results = [None] * len(funcs)
         if self._driver_operation_simulate:
-            print("[simulating] Call to read_raw")
-            return b''
+            for i, f in enumerate(funcs):
+                try:
+                    results[i] = f()
+                except (IviException, NotImplementedError):
+                    pass
+            return results
         if not self._initialized or self._interface is None:
             raise NotInitializedException()
-        return self._interface.read_raw(num)
+
+        # run the functions against a stand-in interface that serves collected
+        # responses and aborts the function on any other I/O, recording the
+        # query it needed.  The recorded queries are sent as compound queries
+        # and the aborted functions run again until no new queries come up, so
+        # getters that depend on other attributes take several rounds.
+        with self._io_lock:
+            self._flush_write_batch()
+            interface = self._interface
+            cache_stats = dict(self._cache_stats)
+            attribute_stats = dict((k, list(v)) for k, v in self._cache_attribute_stats.items())
+            pending = list(range(len(funcs)))
+            responses = dict()
+            try:
+                while pending:
+                    prefetch = _PrefetchInterface(dict(responses))
+                    self._interface = prefetch
+                    remaining = list()
+                    queries = list()
+                    try:
+                        for i in pending:
+                            prefetch.query = None
+                            try:
+                                results[i] = funcs[i]()
+                            except _PrefetchQuery:
+                                remaining.append(i)
+                                query = prefetch.query
+                                if query is not None and query not in responses and query not in queries:
+                                    queries.append(query)
+                            except (IviException, NotImplementedError):
+                                # not supported by this instrument
+                                pass
+                    finally:
+                        self._interface = interface
+                    pending = remaining
+                    resp = self._prefetch_queries(queries)
+                    if not resp:
+                        break
+                    responses.update(resp)
+            finally:
+                self._cache_stats = cache_stats
+                self._cache_attribute_stats = attribute_stats
+
+            # call whatever is left individually
+            for i in pending:
+                try:
+                    results[i] = funcs[i]()
+                except (IviException, NotImplementedError):
+                    pass
+        return results
+
+    def _prefetch_queries(self, queries):
+        "Send queries as compound queries and return a dict of the responses"
+        responses = dict()
+        if not self._write_batch_supported:
+            return responses
+        for chunk in self._get_compound_chunks(queries):
+            try:
+                responses.update(zip(chunk, self._ask_compound(chunk)))
+            except Exception:
+                # fall back on individual queries
+                pass
+        return responses
+
+    def _split_compound_response(self, data):
+        "Split the response to a compound query into the response to each query"
+        l = list()
+        start = 0
+        quote = None
+        for i, c in enumerate(data):
+            if quote is not None:
+                if c == quote:
+                    quote = None
+            elif c in '"\'':
+                quote = c
+            elif c == ';':
+                l.append(data[start:i].strip())
+                start = i + 1
+        l.append(data[start:].strip())
+        return l
+
+    def _get_state_property(self, name):
+        "Look up property get and set functions from a name such as 'channels[0].offset'"
+        obj = self
+        l = name.split('.')
+        for n in l[:-1]:
+            k = n.find('[')
+            if k > 0:
+                key = n[k+1:-1]
+                if key.isdigit():
+                    key = int(key)
+                obj = getattr(obj, n[:k])[key]
+            else:
+                obj = getattr(obj, n)
+        try:
+            fget, fset, fdel = obj._props[l[-1]]
+        except (KeyError, ValueError):
+            raise AttributeError("no such property: %s" % name)
+        return fget, fset
+
+    def _get_state_tag(self, fset):
+        "Return cache tag and index for a property set function"
+        index = -1
+        if type(fset) is partial:
+            index = fset.args[0]
+            fset = fset.func
+        return self._get_cache_tag(fset.__name__), index
+
+    def _get_state_cache(self, fset):
+        "Return cache valid flag and cached value for a property set function"
+        # the flags are read directly so that state handling does not show
+        # up in the cache statistics
+        tag, index = self._get_state_tag(fset)
+        valid_tag = tag if index < 0 else tag + '_%d' % index
+        if not self._driver_operation_cache or not self._cache_valid.get(valid_tag, False):
+            return False, None
+        try:
+            value = self.__dict__['_' + tag]
+            if index >= 0:
+                value = value[index]
+        except (KeyError, IndexError, TypeError):
+            return False, None
+        return True, value
+
+    def _get_state_order(self, name, seen=None):
+        "Return the position of an attribute in the dependency order"
+        # strip indicies, 'channels[0].offset' -> 'channels.offset'
+        name = re.sub(r'\[[^\]]*\]', '', name)
+        if seen is None:
+            seen = set()
+        if name in seen:
+            return 0
+        seen.add(name)
+        order = 0
+        for dep in self._state_dependencies.get(name, []):
+            order = max(order, self._get_state_order(dep, seen) + 1)
+        seen.discard(name)
+        return order
+
+    def _apply_state(self, state):
+        names = sorted(state, key=self._get_state_order)
+        applied = list()
+        # cached values set by the setters are only known to be on the
+        # instrument once the batch is sent; later setters in the batch may
+        # still rely on them
+        pending = list()
+        self._begin_write_batch()
+        try:
+            for name in names:
+                value = state[name]
+                fget, fset = self._get_state_property(name)
+                if fset is None:
+                    raise AttributeError("can't set attribute: %s" % name)
+                valid, cached = self._get_state_cache(fset)
+                if valid and cached == value:
+                    continue
+                fset(value)
+                applied.append(name)
+                tag, index = self._get_state_tag(fset)
+                if index >= 0:
+                    tag = tag + '_%d' % index
+                pending.append(tag)
+            self._end_write_batch()
+        except:
+            try:
+                self._end_write_batch()
+            finally:
+                for tag in pending:
+                    self._cache_valid[tag] = False
+            raise
+        return applied
+
+    def _get_state_names(self, obj=None, prefix=''):
+        "List names of all readable and writable properties"
+        if obj is None:
+            obj = self
+        names = list()
+        d = obj.__dict__
+        for n in sorted(d.get('_props', {})):
+            fget, fset, fdel = d['_props'][n]
+            if fget is not None and fset is not None:
+                names.append(prefix + n)
+        for n in sorted(d):
+            o = d[n]
+            if n[0] == '_' or n == 'driver_operation':
+                continue
+            if type(o) == PropertyCollection:
+                names.extend(self._get_state_names(o, prefix + n + '.'))
+            elif type(o) == IndexedPropertyCollection:
+                for i in range(len(o)):
+                    names.extend(self._get_state_names(o[i], prefix + '%s[%d].' % (n, i)))
+        return names
+
+    def _capture_state(self, names=None):
+        if names is None:
+            names = self._get_state_names()
+        state = dict()
+        for name in names:
+            fget, fset = self._get_state_property(name)
+            valid, cached = self._get_state_cache(fset)
+            if valid:
+                state[name] = cached
+                continue
+            try:
+                state[name] = fget()
+            except (IviException, NotImplementedError):
+                # not supported by this instrument
+                pass
+        return state
+
+    def _begin_write_batch(self):
+        "Start collecting writes to send as a single program message"
+        if self._write_batch_supported and self._write_batch is None:
+            self._write_batch = list()
+
+    def _flush_write_batch(self):
+        "Send collected writes"
+        if self._write_batch:
+            batch = self._write_batch
+            self._write_batch = None
+            try:
+                self._write(self._join_write_batch(batch))
+            finally:
+                self._write_batch = list()
+
+    def _end_write_batch(self):
+        "Send collected writes and stop collecting"
+        try:
+            self._flush_write_batch()
+        finally:
+            self._write_batch = None
+
+    def _join_write_batch(self, batch):
+        "Join SCPI commands into a single program message"
+        # commands after a semicolon are relative to the previous header,
+        # so make everything absolute except for common commands
+        l = [batch[0]]
+        for cmd in batch[1:]:
+            if cmd[0] not in ':*':
+                cmd = ':' + cmd
+            l.append(cmd)
+        return ';'.join(l)
+
+    def _write_raw(self, data):
+        "Write binary data to instrument"
+        with self._io_lock:
+            if self._driver_operation_simulate:
+                self._simulate_log.append("[simulating] Call to write_raw")
+                return
+            if not self._initialized or self._interface is None:
+                raise NotInitializedException()
+            self._flush_write_batch()
+            self._interface.write_raw(data)
+    
+    def _read_raw(self, num=-1):
+        "Read binary data from instrument"
+        with self._io_lock:
+            if self._driver_operation_simulate:
+                self._simulate_log.append("[simulating] Call to read_raw")
+                return b''
+            if not self._initialized or self._interface is None:
+                raise NotInitializedException()
+            self._flush_write_batch()
+            return self._interface.read_raw(num)
     
     def _ask_raw(self, data, num=-1):
         "Write then read binary data"
-        if self._driver_operation_simulate:
-            print("[simulating] Call to ask_raw")
-            return b''
-        if not self._initialized or self._interface is None:
-            raise NotInitializedException()
-        try:
-            return self._interface.ask_raw(data, num)
-        except AttributeError:
-            # if interface does not implement ask_raw, emulate it
-            self._write_raw(data)
-            return self._read_raw(num)
+        with self._io_lock:
+            if self._driver_operation_simulate:
+                self._simulate_log.append("[simulating] Call to ask_raw")
+                return b''
+            if not self._initialized or self._interface is None:
+                raise NotInitializedException()
+            self._flush_write_batch()
+            try:
+                return self._interface.ask_raw(data, num)
+            except AttributeError:
+                # if interface does not implement ask_raw, emulate it
+                self._write_raw(data)
+                return self._read_raw(num)
     
     def _write(self, data, encoding = 'utf-8'):
         "Write string to instrument"
-        if self._driver_operation_simulate:
-            print("[simulating] Write (%s) '%s'" % (encoding, data))
-            return
-        if not self._initialized or self._interface is None:
-            raise NotInitializedException()
-        try:
-            self._interface.write(data, encoding)
-        except AttributeError:
-            if type(data) is tuple or type(data) is list:
-                # recursive call for a list of commands
+        with self._io_lock:
+            if self._driver_operation_simulate:
+                self._simulate_log.append("[simulating] Write (%s) '%s'" % (encoding, data))
+                return
+            if not self._initialized or self._interface is None:
+                raise NotInitializedException()
+            if self._write_batch is not None:
+                if type(data) is not tuple and type(data) is not list:
+                    data = [data]
                 for data_i in data:
-                    self._write(data_i, encoding)
+                    data_i = str(data_i)
+                    length = sum(len(cmd) + 2 for cmd in self._write_batch)
+                    if length + len(data_i) > self._write_batch_max_length:
+                        self._flush_write_batch()
+                    self._write_batch.append(data_i)
                 return
+            try:
+                self._interface.write(data, encoding)
+            except AttributeError:
+                if type(data) is tuple or type(data) is list:
+                    # recursive call for a list of commands
+                    for data_i in data:
+                        self._write(data_i, encoding)
+                    return
 
-            self._write_raw(str(data).encode(encoding))
+                self._write_raw(str(data).encode(encoding))
     
     def _read(self, num=-1, encoding = 'utf-8'):
         "Read string from instrument"
-        if self._driver_operation_simulate:
-            print("[simulating] Read (%s)" % encoding)
-            return ''
-        if not self._initialized or self._interface is None:
-            raise NotInitializedException()
-        try:
-            return self._interface.read(num, encoding)
-        except AttributeError:
-            return self._read_raw(num).decode(encoding).rstrip('\r\n')
+        with self._io_lock:
+            if self._driver_operation_simulate:
+                self._simulate_log.append("[simulating] Read (%s)" % encoding)
+                return ''
+            if not self._initialized or self._interface is None:
+                raise NotInitializedException()
+            self._flush_write_batch()
+            try:
+                return self._interface.read(num, encoding)
+            except AttributeError:
+                return self._read_raw(num).decode(encoding).rstrip('\r\n')
     
     def _ask(self, data, num=-1, encoding = 'utf-8'):
         "Write then read string"
+        with self._io_lock:
+            if self._driver_operation_simulate:
+                self._simulate_log.append("[simulating] Ask (%s) '%s'" % (encoding, data))
+                return ''
+            if not self._initialized or self._interface is None:
+                raise NotInitializedException()
+            self._flush_write_batch()
+            try:
+                return self._interface.ask(data, num, encoding)
+            except AttributeError:
+                # if interface does not implement ask, emulate it
+                if type(data) is tuple or type(data) is list:
+                #    # recursive call for a list of commands
+                    val = list()
+                    for data_i in data:
+                        val.append(self._ask(data_i, num, encoding))
+                    return val
+
+                self._write(data, encoding)
+                return self._read(num, encoding)
+    
+    def _get_compound_chunks(self, cmds):
+        "Split commands into groups that fit in a single program message"
+        chunk = list()
+        length = 0
+        for cmd in cmds:
+            if chunk and length + len(cmd) > self._write_batch_max_length:
+                yield chunk
+                chunk = list()
+                length = 0
+            chunk.append(cmd)
+            length += len(cmd) + 2
+        if chunk:
+            yield chunk
+
+    def _is_query(self, cmd):
+        return cmd.split(' ', 1)[0].endswith('?')
+
+    def _ask_compound(self, cmds):
+        "Send commands as one program message and return the list of responses to the queries"
+        count = len([cmd for cmd in cmds if self._is_query(cmd)])
+        if count == 0:
+            self._write(self._join_write_batch(cmds))
+            return list()
+        resp = self._split_compound_response(self._ask(self._join_write_batch(cmds)))
+        if len(resp) != count:
+            raise UnexpectedResponseException()
+        return resp
+
+    def _ask_many(self, queries, types=None):
+        "Send several queries in one round trip and return the converted responses"
+        count = len([q for q in queries if self._is_query(q)])
+        if type(types) is list or type(types) is tuple:
+            if len(types) != count:
+                raise ValueError("Number of types does not match number of queries")
+            conv = [_converters.get(t, t) for t in types]
+        else:
+            conv = [_converters.get(types, types)] * count
         if self._driver_operation_simulate:
-            print("[simulating] Ask (%s) '%s'" % (encoding, data))
-            return ''
-        if not self._initialized or self._interface is None:
-            raise NotInitializedException()
-        try:
-            return self._interface.ask(data, num, encoding)
-        except AttributeError:
-            # if interface does not implement ask, emulate it
-            if type(data) is tuple or type(data) is list:
-            #    # recursive call for a list of commands
-                val = list()
-                for data_i in data:
-                    val.append(self._ask(data_i, num, encoding))
-                return val
+            self._simulate_log.append("[simulating] Ask many '%s'" % ';'.join(queries))
+            return [None] * count
+        if self._write_batch_supported:
+            resp = list()
+            for chunk in self._get_compound_chunks(queries):
+                resp.extend(self._ask_compound(chunk))
+        else:
+            resp = list()
+            for q in queries:
+                if self._is_query(q):
+                    resp.append(self._ask(q))
+                else:
+                    self._write(q)
+        return [r if c is None else c(r) for r, c in zip(resp, conv)]
 
-            self._write(data, encoding)
-            return self._read(num, encoding)
-    
     def _ask_for_values(self, msg, delim=',', converter=float, array=True):
         '''
         write then read a list or array of data
@@ -1992,7 +2802,7 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
         '''
         s = self._ask(msg)
         s_split = s.split(delim)
-        out = map(converter, s_split)
+        out = [converter(x) for x in s_split]
         if array:
             out = np.array(out)
         return out
@@ -2000,52 +2810,64 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
     def _read_stb(self):
         "Read status byte"
         if self._driver_operation_simulate:
-            print("[simulating] Read status")
+            self._simulate_log.append("[simulating] Read status")
             return 0
         if not self._initialized or self._interface is None:
             raise NotInitializedException()
-        try:
-            return self._interface.read_stb()
-        except (AttributeError, NotImplementedError):
-            return int(self._ask("*STB?"))
+        with self._io_lock:
+            self._flush_write_batch()
+            try:
+                return self._interface.read_stb()
+            except (AttributeError, NotImplementedError):
+                return int(self._ask("*STB?"))
     
     def _trigger(self):
         "Device trigger"
         if self._driver_operation_simulate:
-            print("[simulating] Trigger")
+            self._simulate_log.append("[simulating] Trigger")
+            return
         if not self._initialized or self._interface is None:
             raise NotInitializedException()
-        try:
-            self._interface.trigger()
-        except (AttributeError, NotImplementedError):
-            self._write("*TRG")
+        with self._io_lock:
+            self._flush_write_batch()
+            try:
+                self._interface.trigger()
+            except (AttributeError, NotImplementedError):
+                self._write("*TRG")
     
     def _clear(self):
         "Device clear"
         if self._driver_operation_simulate:
-            print("[simulating] Clear")
+            self._simulate_log.append("[simulating] Clear")
+            return
         if not self._initialized or self._interface is None:
             raise NotInitializedException()
-        try:
-            return self._interface.clear()
-        except (AttributeError, NotImplementedError):
-            self._write("*CLS")
+        with self._io_lock:
+            self._flush_write_batch()
+            try:
+                return self._interface.clear()
+            except (AttributeError, NotImplementedError):
+                self._write("*CLS")
     
     def _remote(self):
         "Device set remote"
         if self._driver_operation_simulate:
-            print("[simulating] Remote")
+            self._simulate_log.append("[simulating] Remote")
+            return
         if not self._initialized or self._interface is None:
             raise NotInitializedException()
-        return self._interface.remote()
+        with self._io_lock:
+            return self._interface.remote()
     
     def _local(self):
         "Device set local"
         if self._driver_operation_simulate:
-            print("[simulating] Local")
+            self._simulate_log.append("[simulating] Local")
+            return
         if not self._initialized or self._interface is None:
             raise NotInitializedException()
-        return self._interface.local()
+        with self._io_lock:
+            return self._interface.local()
     
     def _read_ieee_block(self):
         "Read IEEE block"
@@ -27,6 +27,8 @@ THE SOFTWARE.
 import time
 import struct
 
+import numpy as np
+
 from .. import ivi
 from .. import scope
 from .. import scpi
@@ -180,6 +182,12 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
 
         self._memory_size = 5
 
+        # settings replaced by a recalled or loaded setup
+        self._cache_invalidation.update({
+            'memory_recall': ['acquisition_', 'channel_', 'display_', 'grid_', 'timebase_', 'trigger_'],
+            'system_load_setup': ['acquisition_', 'channel_', 'display_', 'grid_', 'timebase_', 'trigger_']
+        })
+
         self._analog_channel_name = list()
         self._analog_channel_count = 4
         self._digital_channel_name = list()
@@ -474,7 +482,9 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
             self._identity_instrument_model = "Not available while simulating"
             self._identity_instrument_firmware_revision = "Not available while simulating"
         else:
-            lst = self._ask("*IDN?").split(",")
+            idn = self._ask("*IDN?")
+            self._check_identity_cache(idn)
+            lst = idn.split(",")
             self._identity_instrument_manufacturer = lst[0]
             self._identity_instrument_model = lst[1]
             self._identity_instrument_firmware_revision = lst[3]
@@ -513,14 +523,11 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
             error_message = error_message.strip(' "')
         return (error_code, error_message)
 
-    def _utility_lock_object(self):
-        pass
-
     # TODO: test utility reset
     def _utility_reset(self):
         if not self._driver_operation_simulate:
             self._write("*RST")
-            self.driver_operation.invalidate_all_attributes()
+            self._invalidate_attributes('utility_reset')
 
     def _utility_reset_with_defaults(self):
         self._utility_reset()
@@ -538,9 +545,6 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
                 message = "Self test failed"
         return (code, message)
 
-    def _utility_unlock_object(self):
-        pass
-
     def _init_channels(self):
         try:
             super(lecroyBaseScope, self)._init_channels()
@@ -612,7 +616,7 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
 
         self._write_ieee_block(data, ':system:setup ')
 
-        self.driver_operation.invalidate_all_attributes()
+        self._invalidate_attributes('system_load_setup')
 
     # TODO: test display_string
     def _system_display_string(self, string=None):
@@ -1410,7 +1414,7 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
         index = ivi.get_index(self._channel_name, index)
 
         if self._driver_operation_simulate:
-            return list()
+            return scope.Waveform(np.zeros(0))
 
         # Send the MSB first
         # old - self._write(":waveform:byteorder msbfirst")
@@ -1453,25 +1457,11 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
         self._write("%s:WAVEFORM? DAT1" % self._channel_name[index])
         raw_data = raw_data = self._read_ieee_block()
 
-        # Split out points and convert to time and voltage pairs
-        data = list()
-        for i in range(points):
-            x = (i * xincrement) + xorigin
-
-            yval = struct.unpack(">H", raw_data[i * 2:i * 2 + 2])[0]
-
-            if yval > 32767:
-                yval = yval - (2 ** 16)
+        # Keep raw sample codes, scaled on demand by the Waveform object
+        data = np.frombuffer(raw_data, '>i2', points)
 
-            if yval == 0:
-                # hole value
-                y = float('nan')
-            else:
-                y = (yincrement * yval) - yorigin
-
-            data.append((x, y))
-
-        return data
+        return scope.Waveform(data, xincrement, xorigin, 0,
+                yincrement, -yorigin, 0, hole=0)
 
     def _measurement_read_waveform(self, index, maximum_time):
         return self._measurement_fetch_waveform(index)
@@ -1620,6 +1610,7 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
             raise OutOfRangeException()
         if not self._driver_operation_simulate:
             self._write("*sav %d" % index)
+            self._memory_store_snapshot(index)
 
     # WORKING ON WR104XI-A
     def _memory_recall(self, index):
@@ -1628,7 +1619,7 @@ class lecroyBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.commo
             raise OutOfRangeException()
         if not self._driver_operation_simulate:
             self._write("*rcl %d" % index)
-            self.driver_operation.invalidate_all_attributes()
+            self._memory_restore_snapshot(index)
     
     
     
@@ -0,0 +1,238 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+Background polling
+
+A Scheduler reads driver attributes and calls driver methods periodically
+in background threads, one per driver, and keeps the results in ring
+buffers:
+
+    sched = ivi.poll.Scheduler()
+    v = sched.add(psu, 'outputs[0].measure', 1.0, args=('voltage',))
+    t = sched.add(chamber, 'chamber_temperature', 10.0, size=8640)
+    t.subscribe(lambda time, value: print(time, value))
+    sched.start()
+    ...
+    sched.stop()
+    times, values = v.buffer.get()
+
+Items of the same driver that are due at the same time are read in one
+transaction, with their queries sent as compound queries where the driver
+supports it.  The driver I/O lock is held for the whole transaction.  Single
+property reads and method calls from other threads are safe as they take
+the same lock; wrap longer sequences in utility.lock_object and
+utility.unlock_object so polls do not run in between.
+
+"""
+
+import threading
+import time
+from functools import partial
+
+import numpy as np
+
+
+class RingBuffer(object):
+    "Fixed size buffer of timestamped values, overwriting the oldest"
+
+    def __init__(self, size, dtype=float):
+        self.time = np.zeros(size)
+        self.data = np.zeros(size, dtype)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, len(self.time))
+
+    def append(self, t, value):
+        "Add a value"
+        with self.lock:
+            i = self.count % len(self.time)
+            self.time[i] = t
+            self.data[i] = value
+            self.count += 1
+
+    def get(self):
+        "Return copies of the times and values, oldest first"
+        with self.lock:
+            n = len(self.time)
+            if self.count <= n:
+                return self.time[:self.count].copy(), self.data[:self.count].copy()
+            i = self.count % n
+            return np.roll(self.time, -i), np.roll(self.data, -i)
+
+    def last(self):
+        "Return the latest time and value"
+        with self.lock:
+            if self.count == 0:
+                raise IndexError("buffer is empty")
+            i = (self.count - 1) % len(self.time)
+            return self.time[i], self.data[i]
+
+
+class PollItem(object):
+    "Attribute or method polled by a Scheduler"
+
+    def __init__(self, driver, name, period, args=(), size=1000, dtype=float):
+        self.driver = driver
+        self.name = name
+        self.period = float(period)
+        self.buffer = RingBuffer(size, dtype)
+        self.callbacks = list()
+        self.next_time = time.time()
+        self.error = None
+        self.func, self.cache_tag = self._resolve(driver, name, args)
+
+    def _resolve(self, driver, name, args):
+        # walk names such as 'outputs[0].measure' to a property getter or a method
+        obj = driver
+        l = name.split('.')
+        for n in l[:-1]:
+            k = n.find('[')
+            if k > 0:
+                key = n[k+1:-1]
+                if key.isdigit():
+                    key = int(key)
+                obj = getattr(obj, n[:k])[key]
+            else:
+                obj = getattr(obj, n)
+        props = obj.__dict__.get('_props', {})
+        if l[-1] in props:
+            fget = props[l[-1]][0]
+            if fget is None:
+                raise AttributeError("unreadable attribute: %s" % name)
+            # cache tag and index, so the value is read from the instrument
+            f = fget
+            index = -1
+            if type(f) is partial:
+                index = f.args[0]
+                f = f.func
+            return fget, (driver._get_cache_tag(f.__name__), index)
+        return partial(getattr(obj, l[-1]), *args), None
+
+    def subscribe(self, callback):
+        "Call callback(time, value) for each new value"
+        self.callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        "Remove a callback"
+        self.callbacks.remove(callback)
+
+
+class Scheduler(object):
+    "Polls driver attributes and methods in background threads"
+
+    def __init__(self, window=0.01):
+        # items due within window seconds of each other are read together
+        self.window = window
+        self.items = dict()
+        self.threads = dict()
+        self.condition = threading.Condition()
+        self.running = False
+
+    def add(self, driver, name, period, args=(), size=1000, dtype=float):
+        """Poll an attribute or method of a driver every period seconds, keeping
+        the last size values.  Use dtype=object for values that are not numbers."""
+        item = PollItem(driver, name, period, args, size, dtype)
+        with self.condition:
+            self.items.setdefault(driver, list()).append(item)
+            if self.running and driver not in self.threads:
+                self._start_thread(driver)
+            self.condition.notify_all()
+        return item
+
+    def remove(self, item):
+        "Stop polling an item"
+        with self.condition:
+            self.items[item.driver].remove(item)
+
+    def start(self):
+        "Start polling"
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+            for driver in self.items:
+                self._start_thread(driver)
+
+    def stop(self):
+        "Stop polling and wait for the threads to finish"
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+            threads = list(self.threads.values())
+            self.threads = dict()
+        for thread in threads:
+            thread.join()
+
+    def _start_thread(self, driver):
+        thread = threading.Thread(target=self._run, args=(driver,))
+        thread.daemon = True
+        self.threads[driver] = thread
+        thread.start()
+
+    def _run(self, driver):
+        while True:
+            with self.condition:
+                while True:
+                    if not self.running:
+                        return
+                    items = self.items[driver]
+                    now = time.time()
+                    if items:
+                        t = min(item.next_time for item in items) - now
+                        if t <= 0:
+                            due = [item for item in items if item.next_time <= now + self.window]
+                            break
+                    else:
+                        t = None
+                    self.condition.wait(t)
+                for item in due:
+                    item.next_time += item.period
+                    if item.next_time < now:
+                        # fell behind, skip the missed polls
+                        item.next_time = now + item.period
+            try:
+                self.poll(driver, due)
+            except Exception as e:
+                # keep polling, the error is kept with the items
+                for item in due:
+                    item.error = e
+
+    def poll(self, driver, items):
+        "Read a list of items of one driver in one transaction"
+        with driver._io_lock:
+            for item in items:
+                if item.cache_tag is not None:
+                    driver._set_cache_valid(False, *item.cache_tag)
+            values = driver._call_pipelined([item.func for item in items])
+        now = time.time()
+        for item, value in zip(items, values):
+            item.error = None
+            if value is None:
+                continue
+            item.buffer.append(now, value)
+            for callback in item.callbacks:
+                callback(now, value)
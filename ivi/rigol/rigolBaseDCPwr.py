@@ -34,7 +34,7 @@ TriggerSourceMapping = {
         'bus': 'bus'}
 
 class rigolBaseDCPwr(scpi.dcpwr.Base, scpi.dcpwr.Trigger, scpi.dcpwr.SoftwareTrigger,
-                scpi.dcpwr.Measurement):
+                scpi.dcpwr.Measurement, scpi.common.Memory):
     "Rigol generic IVI DC power supply driver"
     
     def __init__(self, *args, **kwargs):
@@ -108,6 +108,7 @@ class rigolBaseDCPwr(scpi.dcpwr.Base, scpi.dcpwr.Trigger, scpi.dcpwr.SoftwareTri
             raise OutOfRangeException()
         if not self._driver_operation_simulate:
             self._write("*sav %d" % index)
+            self._memory_store_snapshot(index)
     
     def _memory_recall(self, index):
         index = int(index)
@@ -115,6 +116,7 @@ class rigolBaseDCPwr(scpi.dcpwr.Base, scpi.dcpwr.Trigger, scpi.dcpwr.SoftwareTri
             raise OutOfRangeException()
         if not self._driver_operation_simulate:
             self._write("*rcl %d" % index)
+            self._memory_restore_snapshot(index)
 
     def _utility_self_test(self):
         code = 0
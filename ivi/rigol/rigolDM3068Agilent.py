@@ -155,9 +155,7 @@ class rigolDM3068Agilent(
             self._write(":meas:%s?" % MeasurementFunctionMapping[value])
         self._measurement_function = value
         self._set_cache_valid()
-        self._set_cache_valid(False, 'range')
-        self._set_cache_valid(False, 'auto_range')
-        self._set_cache_valid(False, 'resolution')
+        self._invalidate_dependencies('measurement_function')
     
     def _get_range(self):
         if not self._driver_operation_simulate:
@@ -24,9 +24,12 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+
 from .rigolBaseDCPwr import *
+from .. import extra
 
-class rigolDP800(rigolBaseDCPwr):
+class rigolDP800(extra.dcpwr.ListMode, rigolBaseDCPwr):
     "Rigol DP800 series IVI DC power supply driver"
     
     def __init__(self, *args, **kwargs):
@@ -68,6 +71,8 @@ class rigolDP800(rigolBaseDCPwr):
         
         self._memory_size = 10
         
+        self._output_list_max_points = 2048
+        
         self._identity_description = "Rigol DP800 series IVI DC power supply driver"
         self._identity_identifier = ""
         self._identity_revision = ""
@@ -83,3 +88,80 @@ class rigolDP800(rigolBaseDCPwr):
         
     
     
+    
+    def _output_measure(self, index, type):
+        index = ivi.get_index(self._output_name, index)
+        if type not in dcpwr.MeasurementType:
+            raise ivi.ValueNotSupportedException()
+        if not self._driver_operation_simulate:
+            # measure queries take the output as a parameter
+            return float(self._ask("%s ch%d" % (scpi.dcpwr.MeasurementTypeMapping[type], index+1)))
+        return 0
+    
+    def _measure_all(self, type):
+        if type not in dcpwr.MeasurementType:
+            raise ivi.ValueNotSupportedException()
+        if self._driver_operation_simulate:
+            return np.zeros(self._output_count)
+        cmd = scpi.dcpwr.MeasurementTypeMapping[type]
+        return np.array(self._ask_many(["%s ch%d" % (cmd, i+1) for i in range(self._output_count)], float))
+    
+    def _get_output_list_count(self, index):
+        index = ivi.get_index(self._output_name, index)
+        if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
+            self._select_output(index)
+            # response is N,<count> or I for infinite
+            value = self._ask("timer:cycles?").split(',')
+            self._output_list_count[index] = int(value[1]) if value[0].upper() == 'N' else 0
+            self._set_cache_valid(index=index)
+        return self._output_list_count[index]
+    
+    def _set_output_list_count(self, index, value):
+        index = ivi.get_index(self._output_name, index)
+        value = int(value)
+        if value < 0 or value > 99999:
+            raise ivi.OutOfRangeException()
+        if not self._driver_operation_simulate:
+            self._select_output(index)
+            self._write("timer:cycles %s" % ('I' if value == 0 else 'N,%d' % value))
+        self._output_list_count[index] = value
+        self._set_cache_valid(index=index)
+    
+    def _get_output_list_enabled(self, index):
+        index = ivi.get_index(self._output_name, index)
+        if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
+            self._select_output(index)
+            self._output_list_enabled[index] = self._ask("timer:state?").upper() == 'ON'
+            self._set_cache_valid(index=index)
+        return self._output_list_enabled[index]
+    
+    def _set_output_list_enabled(self, index, value):
+        index = ivi.get_index(self._output_name, index)
+        value = bool(value)
+        if not self._driver_operation_simulate:
+            self._select_output(index)
+            self._write("timer:state %s" % ('on' if value else 'off'))
+        self._output_list_enabled[index] = value
+        self._set_cache_valid(index=index)
+    
+    def _output_list_configure(self, index, voltage, current, dwell):
+        index = ivi.get_index(self._output_name, index)
+        voltage, current, dwell = self._get_output_list_points(index, voltage, current, dwell)
+        if np.any(dwell < 1):
+            raise ivi.OutOfRangeException()
+        if not self._driver_operation_simulate:
+            # one timer:parameter command per group, batched into as few
+            # program messages as possible
+            rows = extra.dcpwr.format_rows((np.arange(len(voltage)), voltage, current, dwell),
+                    ('%d', '%.3f', '%.3f', '%d'))
+            self._select_output(index)
+            self._begin_write_batch()
+            try:
+                self._write("timer:groups %d" % len(voltage))
+                for row in rows:
+                    self._write("timer:parameter %s" % row)
+            finally:
+                self._end_write_batch()
+    
+    def _output_list_fetch_measurement(self, index, type):
+        raise ivi.OperationNotSupportedException()
@@ -24,6 +24,8 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+
 from . import ivi
 
 # Exceptions
@@ -54,6 +56,101 @@ MeasurementFunction = set(['rise_time', 'fall_time', 'frequency', 'period',
         'overshoot', 'preshoot'])
 AcquisitionStatus = set(['complete', 'in_progress', 'unknown'])
 
+
+class Waveform(object):
+    """Waveform record returned by fetch_waveform and read_waveform
+
+    Holds the sample values in a single NumPy array, either as scaled
+    voltages or as the raw integer codes read from the instrument along with
+    the vertical scaling.  The time axis is not stored; x values are computed
+    on demand from the horizontal origin, increment and reference:
+
+        x = (i - xreference) * xincrement + xorigin
+        y = (raw - yreference) * yincrement + yorigin
+
+    Raw codes equal to hole are returned as NaN.  For compatibility with the
+    older list of (x, y) tuples, indexing returns an (x, y) tuple, iterating
+    yields (x, y) tuples and numpy.asarray returns an N by 2 array.  Slicing
+    returns a Waveform that shares the sample array."""
+
+    __slots__ = ('data', 'xincrement', 'xorigin', 'xreference',
+            'yincrement', 'yorigin', 'yreference', 'hole')
+
+    def __init__(self, data, xincrement=1.0, xorigin=0.0, xreference=0,
+                yincrement=None, yorigin=0.0, yreference=0, hole=None):
+        self.data = np.asarray(data)
+        self.xincrement = xincrement
+        self.xorigin = xorigin
+        self.xreference = xreference
+        # yincrement of None indicates that data holds scaled values
+        self.yincrement = yincrement
+        self.yorigin = yorigin
+        self.yreference = yreference
+        self.hole = hole
+
+    def _get_x(self):
+        return (np.arange(len(self.data)) - self.xreference) * self.xincrement + self.xorigin
+
+    def _get_y(self):
+        return self.astype(np.float64).data
+
+    x = property(_get_x, doc="Sample times, computed from the horizontal scaling")
+    y = property(_get_y, doc="Sample values as float64, with holes set to NaN")
+
+    def astype(self, dtype):
+        "Return a scaled Waveform with samples of the given floating point type"
+        if self.yincrement is None:
+            return Waveform(self.data.astype(dtype, copy=False), self.xincrement,
+                    self.xorigin, self.xreference)
+        dtype = np.dtype(dtype)
+        y = (self.data - dtype.type(self.yreference)) * dtype.type(self.yincrement)
+        y = (y + dtype.type(self.yorigin)).astype(dtype, copy=False)
+        if self.hole is not None:
+            y[self.data == self.hole] = np.nan
+        return Waveform(y, self.xincrement, self.xorigin, self.xreference)
+
+    def to_float32(self):
+        "Return a scaled Waveform with float32 samples"
+        return self.astype(np.float32)
+
+    def to_float64(self):
+        "Return a scaled Waveform with float64 samples"
+        return self.astype(np.float64)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self.data))
+            return Waveform(self.data[key], self.xincrement * step,
+                    (start - self.xreference) * self.xincrement + self.xorigin, 0,
+                    self.yincrement, self.yorigin, self.yreference, self.hole)
+        n = len(self.data)
+        if key < 0:
+            key += n
+        if key < 0 or key >= n:
+            raise IndexError("waveform index out of range")
+        y = self.data[key:key+1]
+        if self.yincrement is not None:
+            y = Waveform(y, yincrement=self.yincrement, yorigin=self.yorigin,
+                    yreference=self.yreference, hole=self.hole).y
+        return ((key - self.xreference) * self.xincrement + self.xorigin, float(y[0]))
+
+    def __iter__(self):
+        return zip(self.x.tolist(), self.y.tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        a = np.column_stack((self.x, self.y))
+        if dtype is not None:
+            a = a.astype(dtype, copy=False)
+        return a
+
+    def __repr__(self):
+        return "Waveform(%d points, xincrement=%g, xorigin=%g)" % (len(self.data),
+                self.xincrement, self.xorigin - self.xreference * self.xincrement)
+
+
 class Base(ivi.IviContainer):
     "Base IVI methods for all oscilloscopes"
     
@@ -300,9 +397,11 @@ class Base(ivi.IviContainer):
                         the waveform for the specified channel. You call this function to obtain
                         the waveforms for each of the remaining channels.
                         
-                        The return value is a list of (x, y) tuples that represent the time and
-                        voltage of each data point.  The y point may be NaN in the case that the
-                        oscilloscope could not sample the voltage.
+                        The return value is a Waveform object.  The y attribute is an array of the
+                        voltage of each data point and the x attribute is the corresponding array
+                        of times.  Indexing or iterating over the Waveform returns (x, y) tuples.
+                        The y point may be NaN in the case that the oscilloscope could not sample
+                        the voltage.
                         
                         The end-user configures the interpolation method the oscilloscope uses
                         with the Acquisition.Interpolation property. If interpolation is disabled,
@@ -350,7 +449,7 @@ class Base(ivi.IviContainer):
                         (Not a Number) value. Check for this value with math.isnan() or
                         numpy.isnan(). Check an entire array with
                         
-                        any(any(math.isnan(b) for b in a) for a in waveform)
+                        numpy.isnan(waveform.y).any()
                         """, cls, grp, '4.3.16'))
         self._add_property('measurement.status',
                         self._get_measurement_status,
@@ -748,8 +847,7 @@ class Base(ivi.IviContainer):
     
     def _measurement_fetch_waveform(self, index):
         index = ivi.get_index(self._channel_name, index)
-        data = list()
-        return data
+        return Waveform(np.zeros(0))
     
     def _measurement_read_waveform(self, index, maximum_time):
         return self._measurement_fetch_waveform(index)
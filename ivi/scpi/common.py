@@ -33,6 +33,19 @@ from .. import extra
 class IdnCommand(extra.common.SerialNumber):
     "Implementation of standard SCPI instrument identity query"
 
+    def __init__(self, *args, **kwargs):
+        super(IdnCommand, self).__init__(*args, **kwargs)
+
+        self._add_property('identity.instrument_options',
+                        self._get_identity_instrument_options,
+                        None,
+                        None,
+                        """
+                        Returns a list of the options installed in the instrument, as
+                        reported by *OPT?.  The response is kept in the identity cache, so it
+                        is only queried again when the response to *IDN? changes.
+                        """)
+
     def _load_id_string(self):
         if self._driver_operation_simulate:
             self._identity_instrument_manufacturer = "Not available while simulating"
@@ -40,7 +53,9 @@ class IdnCommand(extra.common.SerialNumber):
             self._identity_instrument_serial = "Not available while simulating"
             self._identity_instrument_firmware_revision = "Not available while simulating"
         else:
-            lst = self._ask("*IDN?").split(",")
+            idn = self._ask("*IDN?")
+            self._check_identity_cache(idn)
+            lst = idn.split(",")
             self._identity_instrument_manufacturer = lst[0].strip()
             self._identity_instrument_model = lst[1].strip()
             self._identity_instrument_serial_number = lst[2].strip()
@@ -65,6 +80,16 @@ class IdnCommand(extra.common.SerialNumber):
             self._load_id_string()
         return self._identity_instrument_serial_number
 
+    def _get_identity_instrument_options(self):
+        "Returns a list of the installed instrument options from *OPT?"
+        if self._driver_operation_simulate:
+            return list()
+        if self._identity_cache_check is None:
+            # validate the identity cache with *IDN?
+            self._load_id_string()
+        opt = self._ask_static("*OPT?").strip(' "')
+        return [s.strip(' "') for s in opt.split(',') if s.strip(' "') not in ('', '0')]
+
     def _get_identity_instrument_firmware_revision(self):
         if not self._get_cache_valid():
             self._load_id_string()
@@ -91,7 +116,8 @@ class Reset(object):
         if not self._driver_operation_simulate:
             self._write("*RST")
             self._clear()
-            self.driver_operation.invalidate_all_attributes()
+            self._invalidate_attributes('utility_reset')
+            self._load_reset_defaults()
 
     def _utility_reset_with_defaults(self):
         self._utility_reset()
@@ -133,6 +159,7 @@ class Memory(extra.common.Memory):
             raise OutOfRangeException()
         if not self._driver_operation_simulate:
             self._write("*sav %d" % (index + self._memory_offset))
+            self._memory_store_snapshot(index)
     
     def _memory_recall(self, index):
         index = int(index)
@@ -140,7 +167,7 @@ class Memory(extra.common.Memory):
             raise OutOfRangeException()
         if not self._driver_operation_simulate:
             self._write("*rcl %d" % (index + self._memory_offset))
-            self.driver_operation.invalidate_all_attributes()
+            self._memory_restore_snapshot(index)
 
 
 class SystemSetup(extra.common.SystemSetup):
@@ -160,4 +187,4 @@ class SystemSetup(extra.common.SystemSetup):
         
         self._write_raw(data)
         
-        self.driver_operation.invalidate_all_attributes()
+        self._invalidate_attributes('system_load_setup')
@@ -0,0 +1,462 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2012-2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import numpy as np
+
+from .. import ivi
+from .. import counter
+from .. import extra
+from . import common
+
+MeasurementFunctionMapping = {
+        'frequency': 'freq',
+        'frequency_with_aperture': 'freq',
+        'period': 'per',
+        'period_with_aperture': 'per',
+        'pulse_width': 'pwid',
+        'duty_cycle': 'dcyc',
+        'edge_time': 'rtim',
+        'frequency_ratio': 'freq:rat',
+        'time_interval': 'tint',
+        'phase': 'phas',
+        'totalize_continuous': 'tot:cont',
+        'totalize_gated': 'tot:gat',
+        'totalize_timed': 'tot:tim'}
+
+ArmTypeMapping = {
+        'immediate': 'imm',
+        'external': 'ext'}
+
+SlopeMapping = {
+        'positive': 'pos',
+        'negative': 'neg'}
+
+class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
+           ivi.Driver,
+           counter.Base):
+    "Generic SCPI IVI frequency counter driver"
+    
+    def __init__(self, *args, **kwargs):
+        self.__dict__.setdefault('_instrument_id', '')
+        
+        # early define of _do_scpi_init
+        self.__dict__.setdefault('_do_scpi_init', True)
+        
+        super(Base, self).__init__(*args, **kwargs)
+        
+        self._channel_count = 2
+        
+        self._write_batch_supported = True
+        self._reset_defaults.update({
+            'measurement_function': 'frequency',
+            'arm_start_type': 'immediate'
+        })
+        
+        self._identity_description = "Generic SCPI IVI frequency counter driver"
+        self._identity_identifier = ""
+        self._identity_revision = ""
+        self._identity_vendor = ""
+        self._identity_instrument_manufacturer = ""
+        self._identity_instrument_model = ""
+        self._identity_instrument_firmware_revision = ""
+        self._identity_specification_major_version = 4
+        self._identity_specification_minor_version = 1
+        self._identity_supported_instrument_models = ['COUNTER']
+        
+        self._init_channels()
+    
+    def _initialize(self, resource = None, id_query = False, reset = False, **keywargs):
+        "Opens an I/O session to the instrument."
+        
+        super(Base, self)._initialize(resource, id_query, reset, **keywargs)
+        
+        # interface clear
+        if not self._driver_operation_simulate:
+            self._clear()
+        
+        # check ID
+        if id_query and not self._driver_operation_simulate:
+            id = self.identity.instrument_model
+            id_check = self._instrument_id
+            id_short = id[:len(id_check)]
+            if id_short != id_check:
+                raise Exception("Instrument ID mismatch, expecting %s, got %s", id_check, id_short)
+        
+        # reset
+        if reset:
+            self.utility.reset()
+        
+    
+    def _utility_disable(self):
+        pass
+    
+    def _get_channel_list(self, *channels):
+        "Return a SCPI channel list parameter, such as (@1),(@2)"
+        return ','.join("(@%d)" % (ivi.get_index(self._channel_name, ch)+1) for ch in channels)
+    
+    def _get_measurement_function_channels(self, func):
+        if func in ('frequency', 'frequency_with_aperture'):
+            return (self._frequency_channel,)
+        if func in ('period', 'period_with_aperture'):
+            return (self._period_channel,)
+        if func == 'pulse_width':
+            return (self._pulse_width_channel,)
+        if func == 'duty_cycle':
+            return (self._duty_cycle_channel,)
+        if func == 'edge_time':
+            return (self._edge_time_channel,)
+        if func == 'frequency_ratio':
+            return (self._frequency_ratio_numerator_channel, self._frequency_ratio_denominator_channel)
+        if func == 'time_interval':
+            return (self._time_interval_start_channel, self._time_interval_stop_channel)
+        if func == 'phase':
+            return (self._phase_input_channel, self._phase_reference_channel)
+        if func == 'totalize_continuous':
+            return (self._totalize_continuous_channel,)
+        if func == 'totalize_gated':
+            return (self._totalize_gated_channel,)
+        return (self._totalize_timed_channel,)
+    
+    def _get_measurement_function(self):
+        if not self._driver_operation_simulate and not self._get_cache_valid():
+            value = self._ask(":sense:function?").lower().strip('"').split(' ')[0]
+            value = [k for k,v in MeasurementFunctionMapping.items() if v==value][0]
+            self._measurement_function = value
+            self._set_cache_valid()
+        return self._measurement_function
+    
+    def _set_measurement_function(self, value):
+        if value not in MeasurementFunctionMapping:
+            raise ivi.ValueNotSupportedException()
+        if not self._driver_operation_simulate:
+            self._write(":sense:function \"%s %s\"" % (MeasurementFunctionMapping[value],
+                    self._get_channel_list(*self._get_measurement_function_channels(value))))
+        self._measurement_function = value
+        self._set_cache_valid()
+    
+    def _configure(self, func, *params):
+        "Configure a measurement with the configure subsystem, DEF for parameters that are None"
+        params = ["def" if p is None else "%g" % p for p in params]
+        params.append(self._get_channel_list(*self._get_measurement_function_channels(func)))
+        if not self._driver_operation_simulate:
+            self._write(":configure:%s %s" % (MeasurementFunctionMapping[func], ','.join(params)))
+        self._measurement_function = func
+        self._set_cache_valid(True, 'measurement_function')
+    
+    def _get_channel_impedance(self, index):
+        index = ivi.get_index(self._channel_name, index)
+        if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
+            self._channel_impedance[index] = float(self._ask(":input%d:impedance?" % (index+1)))
+            self._set_cache_valid(index=index)
+        return self._channel_impedance[index]
+    
+    def _set_channel_impedance(self, index, value):
+        index = ivi.get_index(self._channel_name, index)
+        value = float(value)
+        if not self._driver_operation_simulate:
+            self._write(":input%d:impedance %g" % (index+1, value))
+        self._channel_impedance[index] = value
+        self._set_cache_valid(index=index)
+    
+    def _get_channel_coupling(self, index):
+        index = ivi.get_index(self._channel_name, index)
+        if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
+            self._channel_coupling[index] = self._ask(":input%d:coupling?" % (index+1)).lower()
+            self._set_cache_valid(index=index)
+        return self._channel_coupling[index]
+    
+    def _set_channel_coupling(self, index, value):
+        index = ivi.get_index(self._channel_name, index)
+        if value not in counter.Coupling:
+            raise ivi.ValueNotSupportedException()
+        if not self._driver_operation_simulate:
+            self._write(":input%d:coupling %s" % (index+1, value))
+        self._channel_coupling[index] = value
+        self._set_cache_valid(index=index)
+    
+    def _get_channel_attenuation(self, index):
+        index = ivi.get_index(self._channel_name, index)
+        if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
+            self._channel_attenuation[index] = float(self._ask(":input%d:attenuation?" % (index+1)))
+            self._set_cache_valid(index=index)
+        return self._channel_attenuation[index]
+    
+    def _set_channel_attenuation(self, index, value):
+        index = ivi.get_index(self._channel_name, index)
+        value = float(value)
+        if not self._driver_operation_simulate:
+            self._write(":input%d:attenuation %g" % (index+1, value))
+        self._channel_attenuation[index] = value
+        self._set_cache_valid(index=index)
+    
+    def _get_channel_level(self, index):
+        index = ivi.get_index(self._channel_name, index)
+        if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
+            self._channel_level[index] = float(self._ask(":input%d:level?" % (index+1)))
+            self._set_cache_valid(index=index)
+        return self._channel_level[index]
+    
+    def _set_channel_level(self, index, value):
+        index = ivi.get_index(self._channel_name, index)
+        value = float(value)
+        if not self._driver_operation_simulate:
+            self._write(":input%d:level %g" % (index+1, value))
+        self._channel_level[index] = value
+        self._set_cache_valid(index=index)
+    
+    def _get_channel_slope(self, index):
+        index = ivi.get_index(self._channel_name, index)
+        if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
+            value = self._ask(":input%d:slope?" % (index+1)).lower()
+            self._channel_slope[index] = [k for k,v in SlopeMapping.items() if v==value[:3]][0]
+            self._set_cache_valid(index=index)
+        return self._channel_slope[index]
+    
+    def _set_channel_slope(self, index, value):
+        index = ivi.get_index(self._channel_name, index)
+        if value not in SlopeMapping:
+            raise ivi.ValueNotSupportedException()
+        if not self._driver_operation_simulate:
+            self._write(":input%d:slope %s" % (index+1, SlopeMapping[value]))
+        self._channel_slope[index] = value
+        self._set_cache_valid(index=index)
+    
+    def _get_channel_filter_enabled(self, index):
+        index = ivi.get_index(self._channel_name, index)
+        if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
+            self._channel_filter_enabled[index] = bool(int(self._ask(":input%d:filter:lpass:state?" % (index+1))))
+            self._set_cache_valid(index=index)
+        return self._channel_filter_enabled[index]
+    
+    def _set_channel_filter_enabled(self, index, value):
+        index = ivi.get_index(self._channel_name, index)
+        value = bool(value)
+        if not self._driver_operation_simulate:
+            self._write(":input%d:filter:lpass:state %d" % (index+1, int(value)))
+        self._channel_filter_enabled[index] = value
+        self._set_cache_valid(index=index)
+    
+    def _get_arm_start_type(self):
+        if not self._driver_operation_simulate and not self._get_cache_valid():
+            value = self._ask(":trigger:source?").lower()
+            self._arm_start_type = [k for k,v in ArmTypeMapping.items() if v==value[:3]][0]
+            self._set_cache_valid()
+        return self._arm_start_type
+    
+    def _set_arm_start_type(self, value):
+        if value not in ArmTypeMapping:
+            raise ivi.ValueNotSupportedException()
+        if not self._driver_operation_simulate:
+            self._write(":trigger:source %s" % ArmTypeMapping[value])
+        self._arm_start_type = value
+        self._set_cache_valid()
+    
+    def _get_arm_start_external_slope(self):
+        if not self._driver_operation_simulate and not self._get_cache_valid():
+            value = self._ask(":trigger:slope?").lower()
+            self._arm_start_external_slope = [k for k,v in SlopeMapping.items() if v==value[:3]][0]
+            self._set_cache_valid()
+        return self._arm_start_external_slope
+    
+    def _set_arm_start_external_slope(self, value):
+        if value not in SlopeMapping:
+            raise ivi.ValueNotSupportedException()
+        if not self._driver_operation_simulate:
+            self._write(":trigger:slope %s" % SlopeMapping[value])
+        self._arm_start_external_slope = value
+        self._set_cache_valid()
+    
+    def _get_arm_start_external_delay(self):
+        if not self._driver_operation_simulate and not self._get_cache_valid():
+            self._arm_start_external_delay = float(self._ask(":trigger:delay?"))
+            self._set_cache_valid()
+        return self._arm_start_external_delay
+    
+    def _set_arm_start_external_delay(self, value):
+        value = float(value)
+        if not self._driver_operation_simulate:
+            self._write(":trigger:delay %g" % value)
+        self._arm_start_external_delay = value
+        self._set_cache_valid()
+    
+    def _frequency_configure(self, channel, estimate = None, resolution = None):
+        self._set_frequency_channel(channel)
+        self._set_frequency_estimate_auto(estimate is None)
+        self._set_frequency_resolution_auto(estimate is None or resolution is None)
+        if estimate is not None:
+            self._set_frequency_estimate(estimate)
+            if resolution is not None:
+                self._set_frequency_resolution(resolution)
+            self._configure('frequency', estimate, resolution)
+        else:
+            self._configure('frequency')
+    
+    def _frequency_configure_with_aperture(self, channel, aperture_time):
+        self._set_frequency_channel(channel)
+        self._set_frequency_aperture_time(aperture_time)
+        self._configure('frequency_with_aperture')
+        if not self._driver_operation_simulate:
+            self._write(":sense:frequency:gate:time %g" % self._frequency_aperture_time)
+    
+    def _period_configure(self, channel, estimate, resolution):
+        self._set_period_channel(channel)
+        self._set_period_estimate(estimate)
+        self._set_period_resolution(resolution)
+        self._configure('period', estimate, resolution)
+    
+    def _period_configure_with_aperture(self, channel, aperture_time):
+        self._set_period_channel(channel)
+        self._set_period_aperture_time(aperture_time)
+        self._configure('period_with_aperture')
+        if not self._driver_operation_simulate:
+            self._write(":sense:frequency:gate:time %g" % self._period_aperture_time)
+    
+    def _pulse_width_configure(self, channel, estimate, resolution):
+        self._set_pulse_width_channel(channel)
+        self._set_pulse_width_estimate(estimate)
+        self._set_pulse_width_resolution(resolution)
+        self._configure('pulse_width')
+    
+    def _duty_cycle_configure(self, channel, frequency_estimate, resolution):
+        self._set_duty_cycle_channel(channel)
+        self._set_duty_cycle_frequency_estimate(frequency_estimate)
+        self._set_duty_cycle_resolution(resolution)
+        self._configure('duty_cycle')
+    
+    def _edge_time_configure(self, channel, estimate, resolution):
+        self._set_edge_time_channel(channel)
+        self._set_edge_time_estimate(estimate)
+        self._set_edge_time_resolution(resolution)
+        self._configure('edge_time')
+    
+    def _frequency_ratio_configure(self, numerator_channel, denominator_channel, numerator_frequency_estimate, estimate, resolution):
+        self._set_frequency_ratio_numerator_channel(numerator_channel)
+        self._set_frequency_ratio_denominator_channel(denominator_channel)
+        self._set_frequency_ratio_numerator_frequency_estimate(numerator_frequency_estimate)
+        self._set_frequency_ratio_estimate(estimate)
+        self._set_frequency_ratio_resolution(resolution)
+        self._configure('frequency_ratio', estimate, resolution)
+    
+    def _time_interval_configure(self, start_channel, stop_channel, estimate, resolution):
+        self._set_time_interval_start_channel(start_channel)
+        self._set_time_interval_stop_channel(stop_channel)
+        self._set_time_interval_estimate(estimate)
+        self._set_time_interval_resolution(resolution)
+        self._configure('time_interval')
+    
+    def _phase_configure(self, input_channel, reference_channel, frequency_estimate, resolution):
+        self._set_phase_input_channel(input_channel)
+        self._set_phase_reference_channel(reference_channel)
+        self._set_phase_frequency_estimate(frequency_estimate)
+        self._set_phase_resolution(resolution)
+        self._configure('phase')
+    
+    def _totalize_continuous_configure(self, channel):
+        self._set_totalize_continuous_channel(channel)
+        self._configure('totalize_continuous')
+    
+    def _totalize_continuous_start(self):
+        self._measurement_initiate()
+    
+    def _totalize_continuous_stop(self):
+        self._measurement_abort()
+    
+    def _totalize_continuous_fetch_count(self):
+        if not self._driver_operation_simulate:
+            return int(float(self._ask(":fetch?")))
+        return 0
+    
+    def _totalize_gated_configure(self, channel, gate_source, gate_slope):
+        self._set_totalize_gated_channel(channel)
+        self._set_totalize_gated_gate_source(gate_source)
+        self._set_totalize_gated_gate_slope(gate_slope)
+        self._configure('totalize_gated')
+        if not self._driver_operation_simulate:
+            self._write(":sense:totalize:gate:polarity %s" % SlopeMapping[self._totalize_gated_gate_slope])
+    
+    def _totalize_timed_configure(self, channel, gate_time):
+        self._set_totalize_timed_channel(channel)
+        self._set_totalize_timed_gate_time(gate_time)
+        self._configure('totalize_timed', self._totalize_timed_gate_time)
+    
+    def _measurement_abort(self):
+        if not self._driver_operation_simulate:
+            self._write(":abort")
+    
+    def _measurement_is_measurement_complete(self):
+        if not self._driver_operation_simulate:
+            # bit 4 of the operation status register is set while measuring
+            return int(self._ask(":status:operation:condition?")) & 16 == 0
+        return True
+    
+    def _measurement_fetch(self):
+        if not self._driver_operation_simulate:
+            return float(self._ask(":fetch?"))
+        return 0.0
+    
+    def _measurement_initiate(self):
+        if not self._driver_operation_simulate:
+            self._write(":initiate")
+    
+    def _measurement_read(self, maximum_time):
+        if not self._driver_operation_simulate:
+            return float(self._ask(":read?"))
+        return 0.0
+    
+    
+class ArrayMeasurement(extra.counter.ArrayMeasurement):
+    "Extension IVI methods for counters that can take a record of measurements"
+    
+    def _get_measurement_sample_count(self):
+        if not self._driver_operation_simulate and not self._get_cache_valid():
+            self._measurement_sample_count = int(float(self._ask(":sample:count?")))
+            self._set_cache_valid()
+        return self._measurement_sample_count
+    
+    def _set_measurement_sample_count(self, value):
+        value = int(value)
+        if value < 1:
+            raise ivi.OutOfRangeException()
+        if not self._driver_operation_simulate:
+            self._write(":sample:count %d" % value)
+        self._measurement_sample_count = value
+        self._set_cache_valid()
+    
+    def _ask_array(self, query):
+        # switch to binary for this response only, so that scalar fetch and
+        # read keep working
+        raw = self._ask_raw((":format:border norm;:format:data real,64;%s;:format:data ascii" % query).encode('utf-8'))
+        return np.frombuffer(ivi.decode_ieee_block(raw), '>f8').astype(float)
+    
+    def _measurement_fetch_array(self, maximum_time=None):
+        if not self._driver_operation_simulate:
+            return self._ask_array(":fetch?")
+        return np.zeros(self._measurement_sample_count)
+    
+    def _measurement_read_array(self, maximum_time=None):
+        if not self._driver_operation_simulate:
+            return self._ask_array(":read?")
+        return np.zeros(self._measurement_sample_count)
@@ -24,6 +24,8 @@ THE SOFTWARE.
 
 """
 
+import numpy as np
+
 from .. import ivi
 from .. import dcpwr
 from .. import extra
@@ -33,6 +35,9 @@ TrackingType = set(['floating'])
 TriggerSourceMapping = {
         'immediate': 'imm',
         'bus': 'bus'}
+MeasurementTypeMapping = {
+        'voltage': 'measure:voltage?',
+        'current': 'measure:current?'}
 
 class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
            dcpwr.Base,
@@ -50,6 +55,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
         self._self_test_delay = 5
 
         self._output_count = 1
+        self._output_selected = 0
 
         self._output_spec = [
             {
@@ -63,6 +69,19 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
             }
         ]
 
+        self._write_batch_supported = True
+        self._cache_volatile.append('output_selected')
+        self._state_dependencies = {
+            'outputs.current_limit': ['outputs.current_limit_behavior'],
+            'outputs.voltage_level': ['outputs.ovp_limit', 'outputs.ovp_enabled'],
+            'outputs.enabled': ['outputs.voltage_level', 'outputs.current_limit',
+                    'outputs.ovp_limit', 'outputs.ovp_enabled']
+        }
+        self._reset_defaults.update({
+            'output_enabled': False,
+            'output_voltage_level': 0.0
+        })
+
         self._identity_description = "Generic SCPI DC power supply driver"
         self._identity_identifier = ""
         self._identity_revision = ""
@@ -112,11 +131,13 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
     def _utility_disable(self):
         pass
 
-    def _utility_lock_object(self):
-        pass
-
-    def _utility_unlock_object(self):
-        pass
+    def _select_output(self, index):
+        "Select an output with instrument:nselect, unless it is already selected"
+        if self._output_count > 1 and (self._output_selected != index or
+                not self._get_cache_valid('output_selected')):
+            self._write("instrument:nselect %d" % (index+1))
+            self._output_selected = index
+            self._set_cache_valid(True, 'output_selected')
 
     def _init_outputs(self):
         try:
@@ -145,8 +166,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
     def _get_output_current_limit(self, index):
         index = ivi.get_index(self._output_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._output_current_limit[index] = float(self._ask("source:current:level?"))
             self._set_cache_valid(index=index)
         return self._output_current_limit[index]
@@ -157,8 +177,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
         if value < 0 or value > self._output_spec[index]['current_max']:
             raise ivi.OutOfRangeException()
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("source:current:level %.6f" % value)
         self._output_current_limit[index] = value
         self._set_cache_valid(index=index)
@@ -166,8 +185,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
     def _get_output_current_limit_behavior(self, index):
         index = ivi.get_index(self._output_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             value = self._ask("source:current:protection:state?") == self._get_bool_str(True)
             if value:
                 self._output_current_limit_behavior[index] = 'trip'
@@ -181,8 +199,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
         if value not in dcpwr.CurrentLimitBehavior:
             raise ivi.ValueNotSupportedException()
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("source:current:protection:state %s" % self._get_bool_str(value == 'trip'))
         self._output_current_limit_behavior[index] = value
         for k in range(self._output_count):
@@ -192,8 +209,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
     def _get_output_enabled(self, index):
         index = ivi.get_index(self._output_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._output_enabled[index] = self._ask("output?") == self._get_bool_str(True)
             self._set_cache_valid(index=index)
         return self._output_enabled[index]
@@ -202,8 +218,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
         index = ivi.get_index(self._output_name, index)
         value = bool(value)
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("output %s" % self._get_bool_str(value))
         self._output_enabled[index] = value
         for k in range(self._output_count):
@@ -213,8 +228,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
     def _get_output_ovp_enabled(self, index):
         index = ivi.get_index(self._output_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._output_ovp_enabled[index] = self._ask("source:voltage:protection:state?") == self._get_bool_str(True)
             self._set_cache_valid(index=index)
         return self._output_ovp_enabled[index]
@@ -223,8 +237,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
         index = ivi.get_index(self._output_name, index)
         value = bool(value)
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("source:voltage:protection:state %s" % self._get_bool_str(value))
         self._output_ovp_enabled[index] = value
         self._set_cache_valid(index=index)
@@ -232,8 +245,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
     def _get_output_ovp_limit(self, index):
         index = ivi.get_index(self._output_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._output_ovp_limit[index] = float(self._ask("source:voltage:protection:level?"))
             self._set_cache_valid(index=index)
         return self._output_ovp_limit[index]
@@ -244,8 +256,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
         if value < 0 or value > self._output_spec[index]['ovp_max']:
             raise ivi.OutOfRangeException()
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("source:voltage:protection:level %.6f" % value)
         self._output_ovp_limit[index] = value
         self._set_cache_valid(index=index)
@@ -253,8 +264,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
     def _get_output_voltage_level(self, index):
         index = ivi.get_index(self._output_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._output_voltage_level[index] = float(self._ask("source:voltage:level?"))
             self._set_cache_valid(index=index)
         return self._output_voltage_level[index]
@@ -265,8 +275,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
         if value < 0 or value > self._output_spec[index]['voltage_max']:
             raise ivi.OutOfRangeException()
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("source:voltage:level %.6f" % value)
         self._output_voltage_level[index] = value
         self._set_cache_valid(index=index)
@@ -288,8 +297,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
         self._output_spec[index]['voltage_max'] = self._output_spec[index]['range'][k][0]
         self._output_spec[index]['current_max'] = self._output_spec[index]['range'][k][1]
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("source:voltage:range %s" % k)
     
     def _output_query_current_limit_max(self, index, voltage_level):
@@ -325,8 +333,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
     
     def _output_reset_output_protection(self, index):
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("source:voltage:protection:clear")
 
 class OCP(extra.dcpwr.OCP):
@@ -343,8 +350,7 @@ class OCP(extra.dcpwr.OCP):
     def _get_output_ocp_enabled(self, index):
         index = ivi.get_index(self._output_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._output_ocp_enabled[index] = self._ask("source:current:protection:state?") == self._get_bool_str(True)
             self._set_cache_valid(index=index)
         return self._output_ocp_enabled[index]
@@ -353,8 +359,7 @@ class OCP(extra.dcpwr.OCP):
         index = ivi.get_index(self._output_name, index)
         value = bool(value)
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("source:current:protection:state %s" % self._get_bool_str(value))
         self._output_ocp_enabled[index] = value
         self._set_cache_valid(index=index)
@@ -362,8 +367,7 @@ class OCP(extra.dcpwr.OCP):
     def _get_output_ocp_limit(self, index):
         index = ivi.get_index(self._output_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._output_ocp_limit[index] = float(self._ask("source:current:protection:level?"))
             self._set_cache_valid(index=index)
         return self._output_ocp_limit[index]
@@ -374,25 +378,90 @@ class OCP(extra.dcpwr.OCP):
         if value < 0 or value > self._output_spec[index]['ocp_max']:
             raise ivi.OutOfRangeException()
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("source:current:protection:level %.6f" % value)
         self._output_ocp_limit[index] = value
         self._set_cache_valid(index=index)
     
     def _output_reset_output_protection(self, index):
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("source:voltage:protection:clear")
             self._write("source:current:protection:clear")
 
+class ListMode(extra.dcpwr.ListMode):
+    """List mode for supplies with the SCPI LIST subsystem.  The E36xx and
+    603x supplies in this package have no list mode, so no driver here mixes
+    this in yet.  Points are sent as ASCII; LIST commands take no block data."""
+
+    def _get_output_list_count(self, index):
+        index = ivi.get_index(self._output_name, index)
+        if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
+            self._select_output(index)
+            value = float(self._ask("list:count?"))
+            # infinity is returned as 9.9e37
+            self._output_list_count[index] = 0 if value >= 9.9e37 else int(value)
+            self._set_cache_valid(index=index)
+        return self._output_list_count[index]
+
+    def _set_output_list_count(self, index, value):
+        index = ivi.get_index(self._output_name, index)
+        value = int(value)
+        if value < 0:
+            raise ivi.OutOfRangeException()
+        if not self._driver_operation_simulate:
+            self._select_output(index)
+            self._write("list:count %s" % ('inf' if value == 0 else '%d' % value))
+        self._output_list_count[index] = value
+        self._set_cache_valid(index=index)
+
+    def _get_output_list_enabled(self, index):
+        index = ivi.get_index(self._output_name, index)
+        if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
+            self._select_output(index)
+            self._output_list_enabled[index] = self._ask("source:voltage:mode?").lower().startswith('list')
+            self._set_cache_valid(index=index)
+        return self._output_list_enabled[index]
+
+    def _set_output_list_enabled(self, index, value):
+        index = ivi.get_index(self._output_name, index)
+        value = bool(value)
+        if not self._driver_operation_simulate:
+            mode = 'list' if value else 'fixed'
+            self._select_output(index)
+            self._write("source:voltage:mode %s" % mode)
+            self._write("source:current:mode %s" % mode)
+        self._output_list_enabled[index] = value
+        self._set_cache_valid(index=index)
+
+    def _output_list_configure(self, index, voltage, current, dwell):
+        index = ivi.get_index(self._output_name, index)
+        voltage, current, dwell = self._get_output_list_points(index, voltage, current, dwell)
+        if not self._driver_operation_simulate:
+            self._select_output(index)
+            # each list is one command, long lists are sent as their own message
+            self._begin_write_batch()
+            try:
+                self._write("list:voltage %s" % extra.dcpwr.format_list(voltage))
+                self._write("list:current %s" % extra.dcpwr.format_list(current))
+                self._write("list:dwell %s" % extra.dcpwr.format_list(dwell))
+            finally:
+                self._end_write_batch()
+
+    def _output_list_fetch_measurement(self, index, type):
+        index = ivi.get_index(self._output_name, index)
+        if type not in dcpwr.MeasurementType:
+            raise ivi.ValueNotSupportedException()
+        if not self._driver_operation_simulate:
+            self._select_output(index)
+            return self._ask_for_values("fetch:array:%s?" % type)
+        return np.zeros(0)
+
 class Trigger(dcpwr.Trigger):
     def _get_output_trigger_source(self, index):
         index = ivi.get_index(self._output_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid():
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             value = self._ask("trigger:source?").lower()
             self._output_trigger_source[index] = [k for k,v in TriggerSourceMapping.items() if v==value][0]
         return self._output_trigger_source[index]
@@ -403,8 +472,7 @@ class Trigger(dcpwr.Trigger):
         if value not in TriggerSourceMapping:
             raise ivi.ValueNotSupportedException()
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("trigger:source %s" % TriggerSourceMapping[value])
         self._output_trigger_source[index] = value
         self._set_cache_valid(index=index)
@@ -412,8 +480,7 @@ class Trigger(dcpwr.Trigger):
     def _get_output_triggered_current_limit(self, index):
         index = ivi.get_index(self._output_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._output_triggered_current_limit[index] = float(self._ask("source:current:level:triggered?"))
             self._set_cache_valid(index=index)
         return self._output_triggered_current_limit[index]
@@ -424,8 +491,7 @@ class Trigger(dcpwr.Trigger):
         if value < 0 or value > self._output_spec[index]['current_max']:
             raise ivi.OutOfRangeException()
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("source:current:level:triggered %.6f" % value)
         self._output_triggered_current_limit[index] = value
         self._set_cache_valid(index=index)
@@ -433,8 +499,7 @@ class Trigger(dcpwr.Trigger):
     def _get_output_triggered_voltage_level(self, index):
         index = ivi.get_index(self._output_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._output_triggered_voltage_level[index] = float(self._ask("source:voltage:level:triggered?"))
             self._set_cache_valid(index=index)
         return self._output_triggered_voltage_level[index]
@@ -445,8 +510,7 @@ class Trigger(dcpwr.Trigger):
         if value < 0 or value > self._output_spec[index]['voltage_max']:
             raise ivi.OutOfRangeException()
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("source:voltage:level:triggered %.6f" % value)
         self._output_triggered_voltage_level[index] = value
         self._set_cache_valid(index=index)
@@ -454,8 +518,7 @@ class Trigger(dcpwr.Trigger):
     def _get_output_trigger_delay(self, index):
         index = ivi.get_index(self._output_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._output_trigger_delay[index] = float(self._ask("trigger:delay?"))
             self._set_cache_valid(index=index)
         return self._output_trigger_delay[index]
@@ -466,8 +529,7 @@ class Trigger(dcpwr.Trigger):
         if value < 0:
             raise ivi.OutOfRangeException()
         if not self._driver_operation_simulate:
-            if self._output_count > 1:
-                self._write("instrument:nselect %d" % (index+1))
+            self._select_output(index)
             self._write("trigger:delay %.6f" % value)
         self._output_trigger_delay[index] = value
         self._set_cache_valid(index=index)
@@ -484,19 +546,31 @@ class SoftwareTrigger(dcpwr.SoftwareTrigger):
         if not self._driver_operation_simulate:
             self._write("*trg")
 
-class Measurement(dcpwr.Measurement):
+class Measurement(dcpwr.Measurement, extra.dcpwr.MeasureAll):
     def _output_measure(self, index, type):
         index = ivi.get_index(self._output_name, index)
         if type not in dcpwr.MeasurementType:
             raise ivi.ValueNotSupportedException()
-        if type == 'voltage':
-            if not self._driver_operation_simulate:
-                if self._output_count > 1:
-                    self._write("instrument:nselect %d" % (index+1))
-                return float(self._ask("measure:voltage?"))
-        elif type == 'current':
-            if not self._driver_operation_simulate:
-                if self._output_count > 1:
-                    self._write("instrument:nselect %d" % (index+1))
-                return float(self._ask("measure:current?"))
+        if not self._driver_operation_simulate:
+            self._select_output(index)
+            return float(self._ask(MeasurementTypeMapping[type]))
         return 0
+
+    def _measure_all(self, type):
+        if type not in dcpwr.MeasurementType:
+            raise ivi.ValueNotSupportedException()
+        if self._output_count == 1:
+            return np.array([self._output_measure(0, type)])
+        if self._driver_operation_simulate:
+            return np.zeros(self._output_count)
+        # select each output in turn and query it, all in one program message
+        cmds = list()
+        for i in range(self._output_count):
+            if i > 0 or self._output_selected != 0 or not self._get_cache_valid('output_selected'):
+                cmds.append("instrument:nselect %d" % (i+1))
+            cmds.append(MeasurementTypeMapping[type])
+        self._set_cache_valid(False, 'output_selected')
+        values = self._ask_many(cmds, float)
+        self._output_selected = self._output_count - 1
+        self._set_cache_valid(True, 'output_selected')
+        return np.array(values)
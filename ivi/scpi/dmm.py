@@ -92,6 +92,25 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
 
         self._self_test_delay = 40
         
+        self._write_batch_supported = True
+        self._cache_dependencies.update({
+            'measurement_function': ['range', 'auto_range', 'resolution']
+        })
+        self._reset_defaults.update({
+            'measurement_function': 'dc_volts',
+            'auto_range': 'on',
+            'trigger_delay_auto': True,
+            'trigger_source': 'immediate',
+            'trigger_multi_point_count': 1,
+            'trigger_multi_point_sample_count': 1
+        })
+        self._state_dependencies = {
+            'range': ['measurement_function'],
+            'auto_range': ['measurement_function'],
+            'resolution': ['measurement_function', 'range', 'auto_range'],
+            'trigger.delay': ['trigger.delay_auto']
+        }
+        
         self._identity_description = "Generic SCPI IVI DMM driver"
         self._identity_identifier = ""
         self._identity_revision = ""
@@ -128,12 +147,6 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
     def _utility_disable(self):
         pass
     
-    def _utility_lock_object(self):
-        pass
-    
-    def _utility_unlock_object(self):
-        pass
-    
     def _get_measurement_function(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
             value = self._ask(":sense:function?").lower().strip('"')
@@ -149,9 +162,7 @@ class Base(common.IdnCommand, common.ErrorQuery, common.Reset, common.SelfTest,
             self._write(":sense:function '%s'" % MeasurementFunctionMapping[value])
         self._measurement_function = value
         self._set_cache_valid()
-        self._set_cache_valid(False, 'range')
-        self._set_cache_valid(False, 'auto_range')
-        self._set_cache_valid(False, 'resolution')
+        self._invalidate_dependencies('measurement_function')
     
     def _get_range(self):
         if not self._driver_operation_simulate and not self._get_cache_valid():
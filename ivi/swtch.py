@@ -24,6 +24,10 @@ THE SOFTWARE.
 
 """
 
+import time
+
+import numpy as np
+
 from . import ivi
 
 # Exceptions
@@ -47,6 +51,7 @@ class DiscontinuousPathException(ivi.IviException): pass
 class CannotConnectDirectlyException(ivi.IviException): pass
 class ChannelsAlreadyConnectedException(ivi.IviException): pass
 class CannotConnectToItselfException(ivi.IviException): pass
+class ResourceInUseException(ivi.IviException): pass
 
 # Parameter Values
 ScanMode = set(['none', 'break_before_make', 'break_after_make'])
@@ -54,6 +59,72 @@ ScanActionType = set(['connect_path', 'disconnect_path', 'wait_for_trigger'])
 Path = set(['available', 'exists', 'unsupported', 'resource_in_use',
             'source_conflict', 'channel_not_available'])
 
+
+class Router(object):
+    """Precomputed routes between the channels of a switch module
+
+    The switch module is a graph with the channels as vertices and an edge
+    for each pair of channels that a relay can connect directly.  Routes
+    between terminal channels may only pass through configuration channels.
+    All routes are found with a breadth first search from every terminal
+    channel when the router is built, so looking up a route later takes
+    microseconds."""
+
+    def __init__(self, channel_count, edges, is_configuration_channel):
+        n = channel_count
+        self.channel_count = n
+        self.configuration = [bool(c) for c in is_configuration_channel]
+        edges = np.array(edges, dtype=int).reshape(-1, 2)
+        self.edges = set(frozenset(e) for e in edges.tolist())
+
+        # compact adjacency, neighbors of channel i are
+        # indices[indptr[i]:indptr[i+1]]
+        both = np.concatenate((edges, edges[:, ::-1]))
+        both = both[np.lexsort((both[:, 1], both[:, 0]))]
+        self.indptr = np.searchsorted(both[:, 0], np.arange(n+1))
+        self.indices = both[:, 1].astype(np.int32)
+
+        # pred[a, b] is the channel before b on the route from a to b, -1
+        # if there is no route.  via[a][b] is a bit mask of the
+        # configuration channels on the route.
+        self.pred = np.full((n, n), -1, dtype=np.int32)
+        self.via = [[0]*n for i in range(n)]
+        for a in range(n):
+            if not self.configuration[a]:
+                self._search(a)
+
+    def _search(self, a):
+        pred = self.pred[a]
+        via = self.via[a]
+        pred[a] = a
+        queue = [a]
+        for u in queue:
+            if u != a and not self.configuration[u]:
+                # terminal channels are the ends of a route
+                continue
+            mask = via[u] | (1 << u if u != a else 0)
+            for v in self.indices[self.indptr[u]:self.indptr[u+1]].tolist():
+                if pred[v] < 0:
+                    pred[v] = u
+                    via[v] = mask
+                    queue.append(v)
+
+    def has_route(self, a, b):
+        "Return True if there is a route between two channels"
+        return a != b and self.pred[a, b] >= 0
+
+    def route(self, a, b):
+        "Return the channels on the route from a to b, including a and b"
+        if not self.has_route(a, b):
+            return None
+        route = [b]
+        pred = self.pred[a]
+        while b != a:
+            b = int(pred[b])
+            route.append(b)
+        route.reverse()
+        return route
+
 class Base(ivi.IviContainer):
     "Base IVI methods for all switch modules"
     
@@ -84,7 +155,12 @@ class Base(ivi.IviContainer):
         self._channel_is_source_channel = list()
         self._channel_characteristics_settling_time = list()
         self._channel_characteristics_wire_mode = list()
-        self._path_is_debounced = False
+        self._path_debounce_time = 0.0
+        self._path_edges = list()
+        self._path_router = None
+        self._path_list = dict()
+        self._path_in_use = 0
+        self._path_source = dict()
         
         self._add_property('channels[].characteristics.ac_current_carry_max',
                         self._get_channel_characteristics_ac_current_carry_max,
@@ -555,6 +631,17 @@ class Base(ivi.IviContainer):
             self._channel_characteristics_wire_mode.append(1)
         
         self.channels._set_list(self._channel_name)
+        
+        self._init_path_router()
+    
+    def _init_path_router(self):
+        "Build the routing tables from the channel list and _path_edges"
+        edges = [(ivi.get_index(self._channel_name, a), ivi.get_index(self._channel_name, b))
+                for a, b in self._path_edges]
+        self._path_router = Router(self._channel_count, edges, self._channel_is_configuration_channel)
+        self._path_list = dict()
+        self._path_in_use = 0
+        self._path_source = dict()
     
     
     def _get_channel_characteristics_ac_current_carry_max(self, index):
@@ -616,11 +703,20 @@ class Base(ivi.IviContainer):
     def _set_channel_is_configuration_channel(self, index, value):
         index = ivi.get_index(self._channel_name, index)
         value = bool(value)
-        self._channel_is_configuration_channel[index] = value
-    
-    def _get_path_is_debounced(self, index):
-        index = ivi.get_index(self._channel_name, index)
-        return self._path_is_debounced[index]
+        if value != self._channel_is_configuration_channel[index]:
+            # the relays of existing paths stay closed, so refuse to change a
+            # channel that is part of one and keep the others
+            for path in self._path_list.values():
+                if index in path:
+                    raise ResourceInUseException()
+            path_list = self._path_list
+            self._channel_is_configuration_channel[index] = value
+            self._init_path_router()
+            self._path_list = path_list
+            self._update_path_state()
+    
+    def _get_path_is_debounced(self):
+        return time.time() >= self._path_debounce_time
     
     def _get_channel_is_source_channel(self, index):
         index = ivi.get_index(self._channel_name, index)
@@ -639,32 +735,156 @@ class Base(ivi.IviContainer):
         index = ivi.get_index(self._channel_name, index)
         return self._channel_characteristics_wire_mode[index]
     
+    def _get_path_channel_source(self, index):
+        if self._channel_is_source_channel[index]:
+            return index
+        return self._path_source.get(index)
+    
+    def _check_path_sources(self, channel1, channel2):
+        source1 = self._get_path_channel_source(channel1)
+        source2 = self._get_path_channel_source(channel2)
+        return source1 is None or source2 is None or source1 == source2
+    
+    def _update_path_state(self):
+        "Recompute the configuration channels and sources in use from the path list"
+        self._path_in_use = 0
+        self._path_source = dict()
+        for path in self._path_list.values():
+            for ch in path[1:-1]:
+                self._path_in_use |= 1 << ch
+            source = self._get_path_channel_source(path[0])
+            if source is None:
+                source = self._get_path_channel_source(path[-1])
+            if source is not None:
+                for ch in path:
+                    self._path_source[ch] = source
+    
+    def _path_close_legs(self, legs):
+        "Close the relays for a list of (channel, channel) legs"
+        pass
+    
+    def _path_open_legs(self, legs):
+        "Open the relays for a list of (channel, channel) legs"
+        pass
+    
+    def _path_settle(self, path):
+        "Extend the debounce time by the settling time of the channels in a path"
+        settling_time = max(self._channel_characteristics_settling_time[ch] for ch in path)
+        self._path_debounce_time = max(self._path_debounce_time, time.time() + settling_time)
+    
+    def _path_add(self, path):
+        legs = [(self._channel_name[a], self._channel_name[b]) for a, b in zip(path[:-1], path[1:])]
+        self._path_close_legs(legs)
+        self._path_settle(path)
+        self._path_list[frozenset((path[0], path[-1]))] = path
+        self._update_path_state()
+    
     def _path_can_connect(self, channel1, channel2):
         channel1 = ivi.get_index(self._channel_name, channel1)
         channel2 = ivi.get_index(self._channel_name, channel2)
-        return False
+        if (self._channel_is_configuration_channel[channel1] or
+                self._channel_is_configuration_channel[channel2]):
+            return 'channel_not_available'
+        if frozenset((channel1, channel2)) in self._path_list:
+            return 'exists'
+        router = self._path_router
+        if not router.has_route(channel1, channel2):
+            return 'unsupported'
+        if router.via[channel1][channel2] & self._path_in_use:
+            return 'resource_in_use'
+        if not self._check_path_sources(channel1, channel2):
+            return 'source_conflict'
+        return 'available'
     
     def _path_connect(self, channel1, channel2):
         channel1 = ivi.get_index(self._channel_name, channel1)
         channel2 = ivi.get_index(self._channel_name, channel2)
+        if channel1 == channel2:
+            raise CannotConnectToItselfException()
+        status = self._path_can_connect(channel1, channel2)
+        if status == 'channel_not_available':
+            raise IsConfigurationChannelException()
+        if status == 'exists':
+            raise ExplicitConnectionExistsException()
+        if status == 'unsupported':
+            raise PathNotFoundException()
+        if status == 'resource_in_use':
+            raise ResourceInUseException()
+        if status == 'source_conflict':
+            raise AttemptToConnectSourcesException()
+        self._path_add(self._path_router.route(channel1, channel2))
     
     def _path_disconnect(self, channel1, channel2):
         channel1 = ivi.get_index(self._channel_name, channel1)
         channel2 = ivi.get_index(self._channel_name, channel2)
+        key = frozenset((channel1, channel2))
+        if key not in self._path_list:
+            raise NoSuchPathException()
+        path = self._path_list.pop(key)
+        legs = [(self._channel_name[a], self._channel_name[b]) for a, b in zip(path[:-1], path[1:])]
+        self._path_open_legs(legs)
+        self._path_settle(path)
+        self._update_path_state()
     
     def _path_disconnect_all(self):
-        pass
+        legs = list()
+        for path in self._path_list.values():
+            legs.extend((self._channel_name[a], self._channel_name[b]) for a, b in zip(path[:-1], path[1:]))
+            self._path_settle(path)
+        if legs:
+            self._path_open_legs(legs)
+        self._path_list = dict()
+        self._update_path_state()
     
     def _path_get_path(self, channel1, channel2):
         channel1 = ivi.get_index(self._channel_name, channel1)
         channel2 = ivi.get_index(self._channel_name, channel2)
-        return []
+        key = frozenset((channel1, channel2))
+        if key not in self._path_list:
+            raise NoSuchPathException()
+        path = self._path_list[key]
+        if path[0] != channel1:
+            path = path[::-1]
+        return [self._channel_name[ch] for ch in path]
     
     def _path_set_path(self, path):
-        pass
+        if len(path) == 0:
+            raise EmptySwitchPathException()
+        if len(path) < 2:
+            raise LegMissingSecondChannelException()
+        path = [ivi.get_index(self._channel_name, ch) for ch in path]
+        for a, b in zip(path[:-1], path[1:]):
+            if a == b:
+                raise ChannelDuplicatedInLegException()
+        if len(set(path)) != len(path):
+            raise ChannelDuplicatedInPathException()
+        if (self._channel_is_configuration_channel[path[0]] or
+                self._channel_is_configuration_channel[path[-1]]):
+            raise IsConfigurationChannelException()
+        mask = 0
+        for ch in path[1:-1]:
+            if not self._channel_is_configuration_channel[ch]:
+                raise NotAConfigurationChannelException()
+            mask |= 1 << ch
+        if mask & self._path_in_use:
+            raise ResourceInUseException()
+        for a, b in zip(path[:-1], path[1:]):
+            if frozenset((a, b)) not in self._path_router.edges:
+                raise CannotConnectDirectlyException()
+        if frozenset((path[0], path[-1])) in self._path_list:
+            raise ExplicitConnectionExistsException()
+        if not self._check_path_sources(path[0], path[-1]):
+            raise AttemptToConnectSourcesException()
+        self._path_add(path)
     
     def _path_wait_for_debounce(self, maximum_time):
-        pass
+        t = self._path_debounce_time - time.time()
+        if t <= 0:
+            return
+        if maximum_time is not None and maximum_time >= 0 and t > maximum_time:
+            time.sleep(maximum_time)
+            raise ivi.MaxTimeoutExceededException()
+        time.sleep(t)
     
     
 # Scanner
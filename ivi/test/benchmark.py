@@ -0,0 +1,256 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+Performance benchmarks
+
+Runs offline against virtual instruments and loopback transports:
+
+    python -m ivi.test.benchmark [--quick] [--json results.json] [name ...]
+
+Each benchmark reports the time per operation in seconds (min, median and
+mean over several repeats).  The JSON output also records the library and
+Python versions so results can be compared between releases.
+
+"""
+
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import ivi
+from ivi.agilent import agilent34401A, agilentDSOX3024A, agilentMSO7104A
+from ivi.agilent import agilentDSO90254A
+from ivi.agilent import hprtl
+from ivi.lecroy import lecroyWR104XIA
+from ivi.interface import record
+from ivi.interface import sim
+from ivi.test import virtual
+
+try:
+    import serial
+    from ivi.interface import pyserial
+except ImportError:
+    serial = None
+
+benchmarks = list()
+
+def benchmark(func):
+    "Register a benchmark; the function sets up and returns the callable to time"
+    benchmarks.append(func)
+    return func
+
+
+def timeit(func, min_time=0.2, repeat=5):
+    "Return a list of times per call of func over several repeats"
+    # calibrate number of calls per repeat
+    n = 1
+    while True:
+        start = time.time()
+        for i in range(n):
+            func()
+        t = time.time() - start
+        if t >= min_time / repeat or n >= 1 << 20:
+            break
+        n *= 2
+    times = [t / n]
+    for k in range(repeat - 1):
+        start = time.time()
+        for i in range(n):
+            func()
+        times.append((time.time() - start) / n)
+    return n, times
+
+
+@benchmark
+def import_ivi():
+    cmd = [sys.executable, '-c', 'import ivi']
+    def run():
+        subprocess.check_call(cmd)
+    return run
+
+@benchmark
+def construct_dmm():
+    return agilent34401A
+
+@benchmark
+def construct_scope():
+    return agilentMSO7104A
+
+@benchmark
+def property_get_cached():
+    dmm = agilent34401A(virtual.VirtualDmm())
+    dmm.trigger.delay
+    return lambda: dmm.trigger.delay
+
+@benchmark
+def property_get_uncached():
+    dmm = agilent34401A(virtual.VirtualDmm())
+    dmm.driver_operation.cache = False
+    return lambda: dmm.trigger.delay
+
+@benchmark
+def property_set():
+    dmm = agilent34401A(virtual.VirtualDmm())
+    def run():
+        dmm.trigger.delay = 0.1
+    return run
+
+@benchmark
+def indexed_property_get():
+    scope = agilentMSO7104A(virtual.VirtualScope())
+    scope.channels[1].offset
+    return lambda: scope.channels[1].offset
+
+@benchmark
+def indexed_property_get_by_name():
+    scope = agilentMSO7104A(virtual.VirtualScope())
+    scope.channels['channel2'].offset
+    return lambda: scope.channels['channel2'].offset
+
+@benchmark
+def decode_ieee_block_1M():
+    block = ivi.build_ieee_block(bytes(bytearray(1 << 20)))
+    return lambda: ivi.decode_ieee_block(block)
+
+@benchmark
+def waveform_fetch_agilent_1k():
+    scope = agilentMSO7104A(virtual.VirtualScope(points=1000))
+    return lambda: scope.channels[0].measurement.fetch_waveform()
+
+@benchmark
+def waveform_fetch_infiniium_1k():
+    model = sim.ScopeModel(manufacturer='AGILENT TECHNOLOGIES', model='DSO90254A')
+    # Infiniium reports format 2 for word data
+    model.add_response(r'wav(eform)?:pre(amble)?\?', "2,0,1000,1,1e-6,-5e-4,0,1e-4,0,0")
+    scope = agilentDSO90254A(sim.SimInstrument(model))
+    return lambda: scope.channels[0].measurement.fetch_waveform()
+
+@benchmark
+def waveform_fetch_lecroy_1k():
+    model = sim.ScpiModel(manufacturer='LECROY', model='WR104XI-A')
+    desc = ["COMM_TYPE : word", "PNTS_PER_SCREEN : 1000", "HORIZ_INTERVAL : 1e-6",
+            "HORIZ_OFFSET : -5e-4", "VERTICAL_GAIN : 1e-4", "VERTICAL_OFFSET : 0"]
+    model.add_response(r'\S+:insp(ect)?\? wavedesc', '\r\n'.join(desc))
+    data = np.arange(1, 1001).astype('>u2').tobytes()
+    model.add_response(r'\S+:wav(eform)?\? dat1', ivi.build_ieee_block(data))
+    scope = lecroyWR104XIA(sim.SimInstrument(model))
+    return lambda: scope.channels[0].measurement.fetch_waveform()
+
+@benchmark
+def arb_waveform_encode_agilent_1k():
+    scope = agilentDSOX3024A(virtual.VirtualScope())
+    data = np.sin(np.linspace(0, 2*np.pi, 1000))
+    return lambda: scope.outputs[0].arbitrary.create_waveform(data)
+
+@benchmark
+def hprtl_parse_640x480():
+    rtl = b'\x1b*r1U\x1b*r640S\x1b*r1A'
+    rtl += (b'\x1b*b80W' + bytes(bytearray(range(80)))) * 480
+    rtl += b'\x1b*rC'
+    return lambda: hprtl.parse_hprtl(io.BytesIO(rtl))
+
+@benchmark
+def transport_sim_ask():
+    instr = sim.SimInstrument('dmm')
+    return lambda: instr.ask('read?')
+
+@benchmark
+def transport_replay_ask():
+    f = io.BytesIO()
+    rec = record.RecordingInstrument(sim.SimInstrument('dmm'), f)
+    for i in range(1000):
+        rec.ask_raw(b'read?')
+    f.seek(0)
+    instr = record.ReplayInstrument(f)
+    def run():
+        if instr.index >= len(instr.frames):
+            instr.rewind()
+        instr.ask_raw(b'read?')
+    return run
+
+@benchmark
+def transport_serial_loopback_1k():
+    if serial is None:
+        return None
+    instr = pyserial.SerialInstrument('loop://')
+    data = b'x' * 1023
+    def run():
+        instr.write_raw(data)
+        instr.read_raw()
+    return run
+
+
+def run(names=None, min_time=0.2, repeat=5, out=sys.stdout):
+    "Run benchmarks and return the results as a dict"
+    results = dict()
+    for func in benchmarks:
+        name = func.__name__
+        if names and name not in names:
+            continue
+        f = func()
+        if f is None:
+            out.write("%-36s skipped\n" % name)
+            continue
+        n, times = timeit(f, min_time, repeat)
+        results[name] = dict(
+            n=n,
+            min=min(times),
+            median=float(np.median(times)),
+            mean=float(np.mean(times))
+        )
+        out.write("%-36s %12.3f us %12.0f ops/s\n" % (name, min(times)*1e6, 1/min(times)))
+    return dict(
+        version=ivi.ivi.__version__,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        time=time.time(),
+        results=results
+    )
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="python-ivi performance benchmarks")
+    parser.add_argument('names', nargs='*', help="benchmarks to run (default all)")
+    parser.add_argument('--json', help="write results to file")
+    parser.add_argument('--quick', action='store_true', help="shorter runs")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        res = run(args.names, 0.02, 3)
+    else:
+        res = run(args.names)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(res, f, indent=2, sort_keys=True)
+
+if __name__ == '__main__':
+    main()
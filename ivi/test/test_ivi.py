@@ -24,9 +24,24 @@ THE SOFTWARE.
 
 """
 
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
 import unittest
 
+import numpy as np
+
 import ivi
+from ivi.interface import middleware
+from ivi.interface import modbus
+from ivi.interface import record
+from ivi.interface import sim
+from ivi.agilent import agilent34401A, agilentE3631A
+from ivi.test import virtual
 
 class TestIndex(unittest.TestCase):
 
@@ -57,5 +72,624 @@ class TestIndex(unittest.TestCase):
         self.assertRaises(ivi.SelectorRangeException, ivi.get_index, self.index_dict, 100);
         self.assertRaises(ivi.SelectorNameException, ivi.get_index, self.index_dict, 'bad_item');
 
+class TestSimInstrument(unittest.TestCase):
+
+    def test_echo(self):
+        instr = sim.SimInstrument('scpi', model='TEST')
+        self.assertEqual(instr.ask('*IDN?'), 'Simulated,TEST,0,1.0')
+        instr.write(':trigger:delay 0.5;:trigger:source ext')
+        self.assertEqual(instr.ask('trigger:delay?'), '0.5')
+        self.assertEqual(instr.ask('TRIGGER:SOURCE?'), 'ext')
+        self.assertRaises(IOError, instr.read)
+
+    def test_waveform(self):
+        instr = sim.SimInstrument('SIM::scope::INSTR', points=100)
+        pre = instr.ask(':waveform:preamble?').split(',')
+        self.assertEqual(int(pre[2]), 100)
+        data = ivi.decode_ieee_block(instr.ask_raw(b':waveform:data?'))
+        self.assertEqual(len(data), 200)
+
+class TestRecordReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_replay(self):
+        for compress in (False, True):
+            filename = os.path.join(self.dir, 'session.ivirec')
+            dmm = agilent34401A()
+            dmm.initialize(record.RecordingInstrument(sim.SimInstrument('dmm'), filename, compress))
+            dmm.trigger.delay = 0.5
+            readings = [dmm.measurement.read(1) for i in range(10)]
+            dmm.close()
+
+            dmm = agilent34401A()
+            dmm.initialize(record.ReplayInstrument(filename))
+            dmm.trigger.delay = 0.5
+            self.assertEqual([dmm.measurement.read(1) for i in range(10)], readings)
+            self.assertRaises(IOError, dmm.measurement.read, 1)
+
+def import_interface(name, **modules):
+    "Import an interface module of ivi.interface against fake library modules"
+    saved = dict((k, sys.modules.get(k)) for k in modules)
+    sys.modules.update(modules)
+    try:
+        __import__('ivi.interface.' + name)
+        return sys.modules.pop('ivi.interface.' + name)
+    finally:
+        if hasattr(ivi.interface, name):
+            delattr(ivi.interface, name)
+        for k, v in saved.items():
+            if v is None:
+                del sys.modules[k]
+            else:
+                sys.modules[k] = v
+
+class FakeVisaLib(object):
+    "Fake VISA library, returns the response in reads of at most size bytes"
+
+    success = 0
+    success_max_count_read = 0x3FFF0006
+
+    def __init__(self):
+        self.data = b''
+        self.reads = list()
+
+    def read(self, session, size):
+        data, self.data = self.data[:size], self.data[size:]
+        self.reads.append(size)
+        return data, (self.success_max_count_read if self.data else self.success)
+
+class FakeVisaResource(object):
+    "Fake PyVISA message based resource"
+
+    def __init__(self):
+        self.visalib = FakeVisaLib()
+        self.session = 1
+        self.calls = list()
+
+    def write_raw(self, data):
+        self.calls.append(data)
+
+    def read_raw(self, size=None):
+        ret = bytearray()
+        status = self.visalib.success_max_count_read
+        while status == self.visalib.success_max_count_read:
+            data, status = self.visalib.read(self.session, size)
+            ret.extend(data)
+        return bytes(ret)
+
+    def read_bytes(self, count, chunk_size=None, break_on_termchar=False):
+        ret = bytearray()
+        while len(ret) < count:
+            data, status = self.visalib.read(self.session, min(chunk_size, count - len(ret)))
+            ret.extend(data)
+            if break_on_termchar and status == self.visalib.success:
+                break
+        return bytes(ret)
+
+    def read_stb(self):
+        return 0x40
+
+    def clear(self):
+        self.calls.append('clear')
+
+class TestPyVisa(unittest.TestCase):
+
+    def setUp(self):
+        constants = types.ModuleType('pyvisa.constants')
+        constants.StatusCode = FakeVisaLib
+        package = types.ModuleType('pyvisa')
+        package.constants = constants
+        visa = types.ModuleType('visa')
+        visa.instrument = FakeVisaResource
+        self.pyvisa = import_interface('pyvisa', visa=visa, pyvisa=package,
+                **{'pyvisa.constants': constants})
+        self.resource = FakeVisaResource()
+        self.instr = self.pyvisa.PyVisaInstrument(self.resource)
+        self.instr.chunk_size = 4
+
+    def test_read(self):
+        self.resource.visalib.data = b'0123456789\n'
+        self.assertEqual(self.instr.read_raw(), b'0123456789\n')
+        self.resource.visalib.data = b'0123456789\n'
+        self.assertEqual(self.instr.read_raw(6), b'012345')
+        self.assertEqual(self.instr.read_raw(20), b'6789\n')
+        self.assertEqual(self.resource.visalib.reads[-2:], [4, 4])
+
+    def test_read_into(self):
+        buf = bytearray(8)
+        self.resource.visalib.data = b'01234'
+        self.assertEqual(self.instr.read_into(buf), 5)
+        self.assertEqual(bytes(buf[:5]), b'01234')
+
+    def test_optional(self):
+        self.assertEqual(self.instr.read_stb(), 0x40)
+        self.instr.clear()
+        self.assertEqual(self.resource.calls, ['clear'])
+        self.assertRaises(NotImplementedError, self.instr.local)
+        self.assertRaises(NotImplementedError, self.instr.lock)
+
+class FakeGpib(object):
+    "Fake linux-gpib device, returns the response in reads of at most size bytes"
+
+    def __init__(self, name, pad, sad, timeout, send_eoi, eos_mode):
+        self.data = b''
+        self.reads = list()
+        self.sta = 0
+
+    def read(self, size):
+        data, self.data = self.data[:size], self.data[size:]
+        self.reads.append(size)
+        self.sta = 0 if self.data else 0x2000
+        return data
+
+    def ibsta(self):
+        return self.sta
+
+class TestLinuxGpib(unittest.TestCase):
+
+    def setUp(self):
+        gpib = types.ModuleType('Gpib')
+        gpib.Gpib = FakeGpib
+        self.linuxgpib = import_interface('linuxgpib', Gpib=gpib)
+        self.instr = self.linuxgpib.LinuxGpibInstrument('GPIB0::10::INSTR')
+        self.instr.chunk_size = 4
+
+    def test_read(self):
+        data = ','.join('%03d' % i for i in range(100)).encode('utf-8')
+        self.instr.gpib.data = data
+        self.assertEqual(self.instr.read_raw(), data)
+        self.assertEqual(self.instr.gpib.reads[:4], [4, 8, 16, 32])
+        self.instr.gpib.data = b'0123456789'
+        self.assertEqual(self.instr.read_raw(6), b'012345')
+        self.assertEqual(self.instr.read_raw(20), b'6789')
+
+    def test_read_into(self):
+        buf = bytearray(8)
+        self.instr.gpib.data = b'01234'
+        self.assertEqual(self.instr.read_into(buf), 5)
+        self.assertEqual(bytes(buf[:5]), b'01234')
+
+class TestMiddleware(unittest.TestCase):
+
+    def test_profiler(self):
+        dmm = agilent34401A("SIM::dmm::INSTR")
+        prof = middleware.Profiler()
+        dmm.add_middleware(prof)
+        for i in range(10):
+            dmm.measurement.read(1)
+        dmm.trigger.delay = 0.5
+        summary = prof.get_summary()
+        self.assertEqual(summary[':read?']['count'], 10)
+        self.assertEqual(summary[':read?']['bytes_out'], 60)
+        self.assertEqual(summary['trigger:delay']['count'], 1)
+        dmm.remove_middleware(prof)
+        self.assertTrue(isinstance(dmm._interface, sim.SimInstrument))
+
+    def test_passthrough(self):
+        instr = sim.SimInstrument('dmm')
+        asks = list()
+        def ask_raw(data, num=-1):
+            asks.append(data)
+            return b'1\n'
+        instr.ask_raw = ask_raw
+        instr.term_char = '\n'
+        instr.lock = lambda: 'locked'
+        trace = middleware.Trace()
+        prof = middleware.Profiler()
+        dmm = agilent34401A(instr)
+        dmm.add_middleware(trace)
+        dmm.add_middleware(prof)
+        self.assertEqual(dmm._ask_raw(b'read?'), b'1\n')
+        self.assertEqual(asks, [b'read?'])
+        self.assertEqual([op for t, op, data in trace.log], ['write', 'read'])
+        self.assertEqual(prof.get_summary()['read?']['bytes_in'], 2)
+        self.assertEqual(dmm._interface.lock(), 'locked')
+        dmm._interface.term_char = '\r'
+        self.assertEqual(instr.term_char, '\r')
+
+class TestVirtualInstrument(unittest.TestCase):
+
+    def test_command_tree(self):
+        instr = virtual.VirtualInstrument(latency=1e-3, bandwidth=1e6)
+        instr.add_command('[SENSe:]VOLTage:DC:RANGe', float, 1.0, max=100)
+        instr.add_command('CHANnel#:SCALe', float, 1.0)
+        instr.write_raw(b':volt:dc:rang 10;:SENSE:VOLTAGE:DC:RANGE?')
+        self.assertEqual(instr.read_raw(), b'+1.000000E+01\n')
+        instr.write_raw(b':channel2:scale 0.5')
+        self.assertEqual(instr.vals['channel2:scale'], 0.5)
+        self.assertEqual(instr.read_stb(), 0)
+        instr.write_raw(b'volt:dc:range 1000')
+        instr.write_raw(b'volt:dc:bad 1')
+        self.assertEqual(instr.read_stb(), virtual.STB_EAV)
+        instr.write_raw(b'syst:err?')
+        self.assertEqual(instr.read_raw(), b'-222,"Data out of range"\n')
+        instr.write_raw(b'system:error:next?')
+        self.assertEqual(instr.read_raw(), b'-113,"Undefined header"\n')
+        self.assertTrue(instr.elapsed > 5e-3)
+
+    def test_ask_many(self):
+        instr = virtual.VirtualDmm()
+        dmm = agilent34401A(instr)
+        queries = ['sense:function?', 'trigger:delay?', 'trigger:count?', 'trigger:delay:auto?']
+        for batch in (True, False):
+            dmm._write_batch_supported = batch
+            n = len(instr.rx_log)
+            self.assertEqual(dmm.ask_many(queries, [str, float, int, bool]),
+                    ['volt', 0.01, 1, True])
+            self.assertEqual(len(instr.rx_log) - n, 1 if batch else 4)
+
+    def test_dcpwr_select(self):
+        instr = virtual.VirtualDCPwr(outputs=3)
+        psu = agilentE3631A(instr)
+        psu.outputs[1].enabled = True
+        psu.outputs[1].voltage_level = 2.5
+        instr.cmd_log = list()
+        psu.outputs[1].measure('voltage')
+        psu.outputs[1].measure('current')
+        self.assertEqual(instr.cmd_log, ['measure:voltage?', 'measure:current?'])
+        n = len(instr.rx_log)
+        self.assertEqual(list(psu.measure_all('voltage')), [0.0, 2.5, 0.0])
+        self.assertEqual(len(instr.rx_log) - n, 1)
+        self.assertEqual(instr.selected, 3)
+
+    def test_dcpwr_list(self):
+        class ListDCPwr(ivi.scpi.dcpwr.ListMode, agilentE3631A):
+            pass
+        instr = virtual.VirtualDCPwr(outputs=3)
+        psu = ListDCPwr(instr)
+        n = len(instr.rx_log)
+        psu.outputs[1].list.configure(np.linspace(0, 20, 1000), 0.5, 0.01)
+        psu.outputs[1].list.count = 0
+        psu.outputs[1].list.enabled = True
+        self.assertTrue(len(instr.rx_log) - n < 50)
+        self.assertEqual(instr.vals['source:voltage:mode@2'], 'list')
+        self.assertEqual(instr.vals['source:list:count@2'], 'inf')
+        data = psu.outputs[1].list.fetch_measurement('voltage')
+        self.assertEqual(len(data), 1000)
+        self.assertAlmostEqual(data[-1], 20)
+        with self.assertRaises(ivi.OutOfRangeException):
+            psu.outputs[1].list.configure([0, 30], 0.5, 0.01)
+
+    def test_counter_array(self):
+        class Counter(ivi.scpi.counter.Base, ivi.scpi.counter.ArrayMeasurement):
+            pass
+        model = sim.ScpiModel(seed=0)
+        data = 10e6 * (1 + 1e-9 * np.random.RandomState(0).randn(1000))
+        model.add_response(r':?fetch\?', ivi.build_ieee_block(data.astype('>f8').tobytes()))
+        instr = sim.SimInstrument(model)
+        cnt = Counter(instr)
+        cnt.frequency.configure_with_aperture('channel2', 0.01)
+        self.assertEqual(cnt.measurement_function, 'frequency_with_aperture')
+        self.assertEqual(model.state['configure:freq'], '(@2)')
+        self.assertEqual(model.state['sense:frequency:gate:time'], '0.01')
+        cnt.measurement.sample_count = 1000
+        values = cnt.measurement.fetch_array()
+        self.assertTrue(np.array_equal(values, data))
+        self.assertEqual(model.state['format:data'], 'ascii')
+        tau, adev = ivi.extra.counter.allan_deviation(values, 0.01)
+        self.assertEqual(tau[0], 0.01)
+        self.assertTrue(0.5e-9 < adev[0] < 2e-9)
+
+
+class Mux(ivi.Driver, ivi.swtch.Base):
+    "Two 1x2 multiplexers, sharing bus channels b1 and b2"
+
+    def _init_channels(self):
+        self._channel_count = 6
+        super(Mux, self)._init_channels()
+        self._channel_name = ['com1', 'com2', 'ch1', 'ch2', 'b1', 'b2']
+        self._channel_is_configuration_channel[4] = True
+        self._channel_is_configuration_channel[5] = True
+        self._channel_is_source_channel[0] = True
+        self._channel_is_source_channel[1] = True
+        self._path_edges = [('com1', 'b1'), ('com2', 'b2'), ('b1', 'ch1'), ('b1', 'ch2'),
+                ('b2', 'ch1'), ('b2', 'ch2')]
+        self.channels._set_list(self._channel_name)
+        self._init_path_router()
+
+
+class ScanMux(ivi.extra.swtch.ScanList, Mux):
+    "Mux that logs relay operations and write batches"
+
+    def _init_channels(self):
+        super(ScanMux, self)._init_channels()
+        self._channel_characteristics_settling_time = [0.01] * self._channel_count
+        self.log = list()
+
+    def _path_close_legs(self, legs):
+        self.log.append(('close', legs))
+
+    def _path_open_legs(self, legs):
+        self.log.append(('open', legs))
+
+    def _end_write_batch(self):
+        self.log.append('write')
+
+
+class TestSwtch(unittest.TestCase):
+
+    def test_routing(self):
+        mux = Mux()
+        self.assertEqual(mux.path.can_connect('com1', 'ch1'), 'available')
+        self.assertEqual(mux.path.can_connect('com1', 'com2'), 'unsupported')
+        self.assertEqual(mux.path.can_connect('b1', 'ch1'), 'channel_not_available')
+        mux.path.connect('com1', 'ch1')
+        self.assertEqual(mux.path.get_path('ch1', 'com1'), ['ch1', 'b1', 'com1'])
+        self.assertEqual(mux.path.can_connect('ch1', 'com1'), 'exists')
+        self.assertEqual(mux.path.can_connect('com1', 'ch2'), 'resource_in_use')
+        self.assertEqual(mux.path.can_connect('com2', 'ch1'), 'source_conflict')
+        with self.assertRaises(ivi.swtch.ResourceInUseException):
+            mux.path.connect('com1', 'ch2')
+        mux.path.connect('com2', 'ch2')
+        mux.path.disconnect('com1', 'ch1')
+        self.assertEqual(mux.path.can_connect('com1', 'ch1'), 'available')
+        with self.assertRaises(ivi.swtch.NoSuchPathException):
+            mux.path.get_path('com1', 'ch1')
+        mux.path.disconnect_all()
+        with self.assertRaises(ivi.swtch.CannotConnectDirectlyException):
+            mux.path.set_path(['com1', 'b1', 'b2', 'ch1'])
+        mux.path.set_path(['com1', 'b1', 'ch2'])
+        self.assertEqual(mux.path.get_path('com1', 'ch2'), ['com1', 'b1', 'ch2'])
+        # channels in a path cannot change role, other changes keep the path
+        with self.assertRaises(ivi.swtch.ResourceInUseException):
+            mux.channels['b1'].is_configuration_channel = False
+        mux.channels['b2'].is_configuration_channel = False
+        self.assertEqual(mux.path.get_path('com1', 'ch2'), ['com1', 'b1', 'ch2'])
+        self.assertEqual(mux.path.can_connect('com2', 'ch1'), 'unsupported')
+
+    def test_scan_list(self):
+        mux = ScanMux()
+
+        def measure(name):
+            def acquire():
+                mux.log.append(('measure', name, mux.path.is_debounced))
+                def fetch():
+                    mux.log.append(('fetch', name))
+                    return name
+                return fetch
+            return acquire
+
+        res = mux.scan_list.run([('connect', 'com1', 'ch1'), ('connect', 'com2', 'ch2'),
+                measure('a'), ('disconnect_all',), ('connect', 'com1', 'ch2'), measure('b')])
+        self.assertEqual(res, ['a', 'b'])
+        self.assertEqual(mux.log, [
+            ('close', [('com1', 'b1'), ('b1', 'ch1')]),
+            ('close', [('com2', 'b2'), ('b2', 'ch2')]),
+            'write',
+            ('measure', 'a', True),
+            ('open', [('com1', 'b1'), ('b1', 'ch1'), ('com2', 'b2'), ('b2', 'ch2')]),
+            'write',
+            ('close', [('com1', 'b1'), ('b1', 'ch2')]),
+            'write',
+            ('fetch', 'a'),
+            ('measure', 'b', True),
+            ('fetch', 'b')])
+
+class TestRegisterMap(unittest.TestCase):
+
+    def test_read_all(self):
+        regs = {100: 235, 104: 450, 108: -123, 300: 250, 606: 1, 616: 1, 626: 0}
+        def read(m):
+            start, count = int(m.group(1)), int(m.group(2))
+            return ','.join(str(regs.get(r, 0)) for r in range(start, start+count))
+        model = sim.ScpiModel()
+        model.add_response(r'R\? (\d+), (\d+)', read)
+        instr = sim.SimInstrument(model)
+        chamber = ivi.testequity.testequity140(instr)
+        trace = middleware.Trace()
+        chamber.add_middleware(trace)
+        for i in range(2):
+            state = chamber.read_all()
+        self.assertEqual(state['temperature'], 23.5)
+        self.assertEqual(state['part_temperature'], -123)
+        self.assertEqual(state['temperature_setpoint'], 25.0)
+        writes = [data for t, op, data in trace.log if op == 'write']
+        # config registers are cached after the first read
+        self.assertEqual(writes[:4], [b'R? 100, 9', b'R? 300, 20', b'R? 606, 21', b'R? 2000, 71'])
+        self.assertEqual(writes[4:], [b'R? 100, 9', b'R? 300, 20', b'R? 2000, 71'])
+
+class TestModbus(unittest.TestCase):
+
+    regs = {100: 235, 104: 450, 108: -123, 300: 250, 606: 1, 616: 1, 626: 0}
+
+    def check_chamber(self, chamber, slave):
+        state = chamber.read_all()
+        self.assertEqual(state['temperature'], 23.5)
+        self.assertEqual(state['part_temperature'], -123)
+        chamber.chamber_temperature_setpoint = -40
+        self.assertEqual(slave.registers[300], -400)
+        chamber.write_registers(2000, [1, 0])
+        self.assertEqual(slave.log[-1], modbus.write_registers_request(2000, [1, 0]))
+
+    def test_crc(self):
+        self.assertEqual(modbus.crc16(b'\x01\x03\x00\x00\x00\x01'), 0x0A84)
+
+    def test_rtu(self):
+        slave = virtual.VirtualModbus(self.regs)
+        instr = modbus.ModbusRtuInstrument(slave.serial(), baudrate=115200)
+        self.check_chamber(ivi.testequity.testequity140(instr), slave)
+        with self.assertRaises(modbus.ModbusException):
+            instr.read_registers(0, 200)
+
+    def test_utility(self):
+        slave = virtual.VirtualModbus(self.regs)
+        chamber = ivi.testequity.testequity140(modbus.ModbusRtuInstrument(slave.serial()))
+        n = len(slave.log)
+        self.assertEqual(chamber.identity.instrument_model, '140')
+        self.assertEqual(chamber.identity.instrument_manufacturer, 'TestEquity')
+        self.assertEqual(chamber.utility.error_query(), (0, "No error"))
+        self.assertRaises(ivi.ResetNotSupportedException, chamber.utility.reset)
+        self.assertRaises(ivi.OperationNotSupportedException, chamber.utility.self_test)
+        self.assertEqual(len(slave.log), n)
+
+    def test_tcp(self):
+        slave = virtual.VirtualModbus(self.regs)
+        server = slave.serve_tcp()
+        try:
+            instr = modbus.ModbusTcpInstrument(*server.server_address)
+            self.check_chamber(ivi.testequity.testequity140(instr), slave)
+            instr.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+class TestPoll(unittest.TestCase):
+
+    def test_ring_buffer(self):
+        buf = ivi.poll.RingBuffer(3)
+        for i in range(5):
+            buf.append(i, 10*i)
+        t, v = buf.get()
+        self.assertEqual(list(t), [2, 3, 4])
+        self.assertEqual(list(v), [20, 30, 40])
+        self.assertEqual(buf.last(), (4, 40))
+
+    def test_scheduler(self):
+        dmm = agilent34401A(virtual.VirtualDmm())
+        trace = middleware.Trace()
+        dmm.add_middleware(trace)
+        sched = ivi.poll.Scheduler()
+        delay = sched.add(dmm, 'trigger.delay', 0.01)
+        reading = sched.add(dmm, 'measurement.read', 0.01, args=(1.0,))
+        values = list()
+        reading.subscribe(lambda t, value: values.append(value))
+        for i in range(2):
+            sched.poll(dmm, [delay, reading])
+        # cached attributes are read again, in one compound query
+        self.assertEqual(trace.log[-2][2], b'trigger:delay?;:read?')
+        sched.start()
+        time.sleep(0.05)
+        sched.stop()
+        self.assertGreater(len(delay.buffer), 2)
+        self.assertEqual(len(values), len(reading.buffer))
+        self.assertEqual(reading.buffer.last()[1], 1.0)
+
+    def test_lock_object(self):
+        dmm = agilent34401A(virtual.VirtualDmm())
+        # unbalanced unlocks are ignored
+        dmm.utility.unlock_object()
+        dmm.utility.lock_object()
+        acquired = list()
+        def other():
+            dmm.utility.unlock_object()
+            acquired.append(dmm._io_lock.acquire(False))
+        t = threading.Thread(target=other)
+        t.start()
+        t.join()
+        self.assertEqual(acquired, [False])
+        dmm.utility.unlock_object()
+        dmm.utility.unlock_object()
+        t = threading.Thread(target=other)
+        t.start()
+        t.join()
+        self.assertEqual(acquired, [False, True])
+
+class TestDataLog(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_log(self):
+        dmm = agilent34401A(virtual.VirtualDmm())
+        dmm.range
+        log = ivi.datalog.Logger(self.dir, chunk_records=3)
+        log.add_stream('volts', dmm)
+        for i in range(7):
+            log.log('volts', float(i), t=i)
+        log.log('trace', np.arange(4), t=0)
+        with self.assertRaises(ValueError):
+            log.log('trace', np.arange(5))
+        log.close()
+
+        store = ivi.datalog.Store(self.dir)
+        self.assertEqual(store.streams, ['trace', 'volts'])
+        self.assertEqual(len(store.index['streams']['volts']['chunks']), 3)
+        t, v = store.read('volts', 2, 5)
+        self.assertEqual(list(v), [2.0, 3.0, 4.0])
+        self.assertEqual(store.read('trace')[1].shape, (1, 4))
+        md = store.get_metadata('volts')
+        self.assertEqual(md['identity']['instrument_model'], 'DMM')
+        self.assertEqual(md['configuration']['range'], 1.0)
+
+        # appends to an existing store
+        log = ivi.datalog.Logger(self.dir)
+        log.log('volts', 7.0, t=7)
+        log.close()
+        self.assertEqual(ivi.datalog.Store(self.dir).count('volts'), 8)
+
+class TestIdentityCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_directory = ivi.get_cache_directory()
+        self.dir = tempfile.mkdtemp()
+        self.vdmm = virtual.VirtualDmm()
+        self.vdmm.add_command('*OPT?', handler=lambda c, k, a, q: '"0,MEM"')
+
+    def tearDown(self):
+        ivi.set_cache_directory(self.cache_directory)
+        shutil.rmtree(self.dir)
+
+    def get_options(self):
+        dmm = agilent34401A(self.vdmm)
+        dmm._driver_operation_io_resource_descriptor = 'TCPIP0::dmm::INSTR'
+        self.vdmm.cmd_log = list()
+        return dmm, dmm.identity.instrument_options
+
+    def test_session(self):
+        ivi.set_cache_directory(None)
+        dmm, options = self.get_options()
+        self.assertEqual(options, ['MEM'])
+        self.assertEqual(dmm.identity.instrument_options, ['MEM'])
+        self.assertEqual(self.vdmm.cmd_log, ['*idn?', '*opt?'])
+
+    def test_persistent(self):
+        ivi.set_cache_directory(self.dir)
+        self.assertEqual(self.get_options()[1], ['MEM'])
+        self.assertEqual(self.vdmm.cmd_log, ['*idn?', '*opt?'])
+        self.assertTrue(os.path.exists(os.path.join(self.dir, 'identity.json')))
+        # new session, validated with *IDN? only
+        self.assertEqual(self.get_options()[1], ['MEM'])
+        self.assertEqual(self.vdmm.cmd_log, ['*idn?'])
+        # different instrument on the same resource
+        self.vdmm.idn = 'Virtual,DMM,1,1.0'
+        self.assertEqual(self.get_options()[1], ['MEM'])
+        self.assertEqual(self.vdmm.cmd_log, ['*idn?', '*opt?'])
+
+class TestWaveform(unittest.TestCase):
+
+    def test_scaling(self):
+        raw = np.array([0, 10, 20, 30], dtype='>u2')
+        w = ivi.scope.Waveform(raw, 0.5, 1.0, 2, 0.1, 1.0, 10, hole=0)
+        self.assertEqual(len(w), 4)
+        self.assertEqual(list(w.x), [0.0, 0.5, 1.0, 1.5])
+        self.assertTrue(np.isnan(w[0][1]))
+        self.assertAlmostEqual(w[-1][1], 3.0)
+        self.assertEqual(w.to_float32().y.dtype, np.float64)
+        self.assertEqual(w.to_float32().data.dtype, np.float32)
+        self.assertEqual(np.asarray(w).shape, (4, 2))
+
+        s = w[1::2]
+        self.assertEqual(list(s.x), [0.5, 1.5])
+        self.assertEqual(s[1], w[3])
+        self.assertEqual(list(s), [w[1], w[3]])
+
+    def test_fetch(self):
+        scope = ivi.agilent.agilentMSO7104A(virtual.VirtualScope(points=100))
+        w = scope.channels[0].measurement.fetch_waveform()
+        self.assertIsInstance(w, ivi.scope.Waveform)
+        self.assertEqual(len(w), 100)
+        self.assertEqual(w.data.nbytes, 200)
+        x, y = w[50]
+        self.assertAlmostEqual(x, w.x[50])
+        self.assertAlmostEqual(y, w.y[50])
+
 if __name__ == '__main__':
     unittest.main()
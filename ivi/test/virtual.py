@@ -0,0 +1,606 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2014 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+Virtual instruments for driver tests and benchmarks
+
+A VirtualInstrument is an interface object with a table of SCPI commands.
+Commands are declared with the usual SCPI notation, where the upper case part
+of a node is its short form, optional nodes are in brackets and # stands for
+a numeric suffix:
+
+    instr.add_command('[SENSe:]VOLTage:DC:RANGe', float, 1.0)
+    instr.add_command('CHANnel#:SCALe', float, 1.0)
+
+Values are stored in instr.vals under the lower case command name with the
+numeric suffix filled in, e.g. 'sense:voltage:dc:range' or 'channel1:scale'.
+Every command can be written and queried unless declared otherwise.  Errors
+go to the error queue read by SYSTem:ERRor?, and the status byte and
+standard event status register are maintained as for a IEEE 488.2 device.
+*SAV and *RCL store and restore copies of instr.vals in instr.saved.
+
+The latency and bandwidth settings model the transport.  By default the
+resulting delays are only added up in instr.elapsed, so benchmarks can
+report instrument time without waiting for it; set sleep to True to
+actually wait.
+
+VirtualModbus is a Modbus slave with a table of holding registers, reachable
+over RTU through a virtual serial port or over TCP on the loopback interface.
+
+ivi.interface.sim.SimInstrument is the lightweight counterpart for users.
+It is selected with a SIM:: resource string and echoes any setting back
+without checking it, which is too lenient to catch driver bugs.
+
+"""
+
+import io
+import re
+import struct
+import threading
+import time
+from collections import deque
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+from .. import ivi
+from ..interface import modbus
+
+STB_EAV = 0x04
+STB_MAV = 0x10
+STB_ESB = 0x20
+
+ESR_OPC = 0x01
+ESR_QYE = 0x04
+ESR_EXE = 0x10
+ESR_CME = 0x20
+
+class VirtualInstrumentError(Exception): pass
+
+
+def compile_pattern(pattern):
+    """Return a regular expression and a storage key template for a SCPI
+    command pattern such as '[SENSe:]VOLTage:DC:RANGe' or 'CHANnel#:SCALe'"""
+    regex = ':?'
+    key = ''
+    for t in re.findall(r'\[|\]|:|[^\[\]:]+', pattern):
+        if t == '[':
+            regex += '(?:'
+        elif t == ']':
+            regex += ')?'
+        elif t == ':':
+            regex += ':'
+            key += ':'
+        else:
+            suffix = t.endswith('#')
+            name = t.rstrip('#')
+            short = re.match(r'[A-Z0-9*]*', name).group(0)
+            if short and short != name:
+                regex += '(?:%s|%s)' % (re.escape(short.lower()), re.escape(name.lower()))
+            else:
+                regex += re.escape(name.lower())
+            key += name.lower()
+            if suffix:
+                regex += r'(\d*)'
+                key += '%s'
+    return re.compile('^' + regex + '$', re.I), key
+
+
+class Command(object):
+    "Virtual instrument command"
+
+    def __init__(self, pattern, type=str, value=None, query=True, write=True,
+                handler=None, min=None, max=None, latency=0):
+        self.regex, self.key = compile_pattern(pattern)
+        self.type = type
+        self.value = value
+        self.query = query
+        self.write = write
+        self.handler = handler
+        self.min = min
+        self.max = max
+        self.latency = latency
+
+
+class VirtualInstrument(object):
+    "SCPI virtual instrument interface"
+
+    def __init__(self, idn='Virtual,Instrument,0,1.0', latency=0, bandwidth=None,
+                sleep=False, strict=False):
+        self.read_buffer = io.BytesIO()
+        self.tx_log = list()
+        self.rx_log = list()
+        self.cmd_log = list()
+
+        self.commands = list()
+        self.vals = dict()
+        self.defaults = dict()
+        self.saved = dict()
+        self.error_queue = deque(maxlen=32)
+
+        self.idn = idn
+        self.stb = 0
+        self.esr = 0
+        self.ese = 0
+
+        self.int_format = '{0:+d}'
+        self.float_format = '{0:+E}'
+        self.bool_format = ('1', '0')
+
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.sleep = sleep
+        self.elapsed = 0.0
+        self.strict = strict
+
+        self.add_command('*IDN?', handler=lambda c, k, a, q: self.idn)
+        self.add_command('*RST', handler=self._rst)
+        self.add_command('*SAV', handler=self._sav)
+        self.add_command('*RCL', handler=self._rcl)
+        self.add_command('*CLS', handler=self._cls)
+        self.add_command('*ESE', int, 0)
+        self.add_command('*ESR?', handler=self._esr)
+        self.add_command('*STB?', handler=lambda c, k, a, q: self.int_format.format(self.read_stb()))
+        self.add_command('*OPC', handler=self._opc)
+        self.add_command('*TST?', int, 0)
+        self.add_command('*TRG', handler=lambda c, k, a, q: None)
+        self.add_command('*WAI', handler=lambda c, k, a, q: None)
+        self.add_command('SYSTem:ERRor[:NEXT]?', handler=self._syst_err)
+
+    def add_command(self, pattern, type=str, value=None, **kwargs):
+        """Add a command.  type is the value type: int, float, bool, str,
+        'qstr' for a quoted string or a list of allowed strings.  A handler
+        function is called as handler(command, key, args, query) and returns
+        the response to a query."""
+        query = pattern.endswith('?')
+        if query:
+            pattern = pattern[:-1]
+            kwargs.setdefault('write', False)
+        cmd = Command(pattern, type, value, **kwargs)
+        self.commands.append(cmd)
+        if value is not None and '%s' not in cmd.key:
+            self.vals[cmd.key] = value
+            self.defaults[cmd.key] = value
+        return cmd
+
+    def push_error(self, code, message):
+        "Add an error to the error queue"
+        self.error_queue.append((code, message))
+        if -199 <= code <= -100:
+            self.esr |= ESR_CME
+        elif -299 <= code <= -200:
+            self.esr |= ESR_EXE
+        elif -499 <= code <= -400:
+            self.esr |= ESR_QYE
+
+    def command_error(self, code, message):
+        "Report an error in a received command; raises if strict is set"
+        self.push_error(code, message)
+        if self.strict:
+            raise VirtualInstrumentError("%d, %s" % (code, message))
+
+    def read_stb(self):
+        "Read status byte"
+        stb = self.stb & ~(STB_EAV | STB_MAV | STB_ESB)
+        if self.error_queue:
+            stb |= STB_EAV
+        if self.read_buffer.tell() < len(self.read_buffer.getvalue()):
+            stb |= STB_MAV
+        if self.esr & self.vals.get('*ese', 0):
+            stb |= STB_ESB
+        return stb
+
+    def _rst(self, cmd, key, args, query):
+        self.vals = dict(self.defaults)
+
+    def _sav(self, cmd, key, args, query):
+        self.saved[int(args)] = dict(self.vals)
+
+    def _rcl(self, cmd, key, args, query):
+        if int(args) not in self.saved:
+            self.command_error(-222, "Data out of range")
+            return None
+        self.vals = dict(self.saved[int(args)])
+
+    def _cls(self, cmd, key, args, query):
+        self.error_queue.clear()
+        self.esr = 0
+
+    def _esr(self, cmd, key, args, query):
+        esr = self.esr
+        self.esr = 0
+        return self.int_format.format(esr)
+
+    def _opc(self, cmd, key, args, query):
+        if query:
+            return '1'
+        self.esr |= ESR_OPC
+
+    def _syst_err(self, cmd, key, args, query):
+        if not self.error_queue:
+            return '+0,"No error"'
+        code, message = self.error_queue.popleft()
+        return '%+d,"%s"' % (code, message)
+
+    def _delay(self, num, latency=0):
+        t = self.latency + latency
+        if self.bandwidth:
+            t += float(num) / self.bandwidth
+        self.elapsed += t
+        if self.sleep and t > 0:
+            time.sleep(t)
+
+    def format_value(self, cmd, value):
+        "Format a value for a query response"
+        if type(value) is bytes:
+            return value
+        if cmd.type is bool:
+            return self.bool_format[0] if value else self.bool_format[1]
+        if type(value) is int:
+            return self.int_format.format(value)
+        if type(value) is float:
+            return self.float_format.format(value)
+        if cmd.type == 'qstr':
+            return '"%s"' % value
+        return str(value)
+
+    def parse_value(self, cmd, args):
+        "Parse the parameter of a command; raises ValueError if not valid"
+        t = cmd.type
+        if t is bool:
+            a = args.lower()
+            if a in ('1', 'on'):
+                return True
+            if a in ('0', 'off'):
+                return False
+            raise ValueError()
+        if t is int:
+            try:
+                return int(args)
+            except ValueError:
+                return float(args)
+        if t is float:
+            return float(args)
+        if t == 'qstr':
+            return args.strip('\'"')
+        if type(t) is list:
+            for v in t:
+                if v.lower() == args.lower():
+                    return v
+            raise ValueError()
+        return args
+
+    def handle(self, message):
+        "Process a single command and return the response, if any"
+        header, sep, args = message.partition(' ')
+        args = args.strip()
+        self.cmd_log.append(header.lower().lstrip(':'))
+        query = header.endswith('?')
+        header = header.rstrip('?')
+
+        for cmd in self.commands:
+            m = cmd.regex.match(header)
+            if m is not None:
+                break
+        else:
+            self.command_error(-113, "Undefined header")
+            return None
+
+        key = cmd.key
+        if m.groups():
+            key = key % tuple(g or '1' for g in m.groups())
+
+        self._delay(0, cmd.latency)
+
+        if (query and not cmd.query) or (not query and not cmd.write):
+            self.command_error(-113, "Undefined header")
+            return None
+
+        if cmd.handler is not None:
+            return cmd.handler(cmd, key, args, query)
+
+        if query:
+            if key not in self.vals:
+                self.vals[key] = cmd.value
+            return self.format_value(cmd, self.vals[key])
+
+        try:
+            value = self.parse_value(cmd, args)
+        except ValueError:
+            self.command_error(-224, "Illegal parameter value")
+            return None
+        if ((cmd.min is not None and value < cmd.min) or
+                (cmd.max is not None and value > cmd.max)):
+            self.command_error(-222, "Data out of range")
+            return None
+        self.vals[key] = value
+        return None
+
+    def write_raw(self, data):
+        "Write binary data to instrument"
+        self.rx_log.append(data)
+        self._delay(len(data))
+
+        if b'#' in data:
+            # binary block data, may contain separators
+            messages = [data.decode('utf-8', 'replace')]
+        else:
+            messages = data.decode('utf-8').split(';')
+
+        resp = list()
+        for message in messages:
+            message = message.strip()
+            if not message:
+                continue
+            r = self.handle(message)
+            if r is not None:
+                resp.append(r if type(r) is bytes else str(r).encode('utf-8'))
+
+        if resp:
+            d = b';'.join(resp) + b'\n'
+            self.tx_log.append(d)
+            self.read_buffer = io.BytesIO(d)
+
+    def read_raw(self, num=-1):
+        "Read binary data from instrument"
+        data = self.read_buffer.read(num)
+        if not data:
+            self.push_error(-420, "Query UNTERMINATED")
+        self._delay(len(data))
+        return data
+
+
+class VirtualDmm(VirtualInstrument):
+    "Virtual SCPI DMM, for scpi.dmm based drivers"
+
+    def __init__(self, idn='Virtual,DMM,0,1.0', **kwargs):
+        super(VirtualDmm, self).__init__(idn, **kwargs)
+
+        self.add_command('[SENSe:]FUNCtion', 'qstr', 'volt')
+        for func in ['VOLT:DC', 'VOLT:AC', 'CURR:DC', 'CURR:AC', 'RES', 'FRES', 'CAP']:
+            self.add_command(func + ':RANGe', float, 1.0)
+            self.add_command(func + ':RANGe:AUTO', int, 1)
+        for func in ['FREQ', 'PER']:
+            self.add_command(func + ':RANGe:LOWer', float, 1.0)
+            self.add_command(func + ':RANGe:AUTO', int, 1)
+        for func in ['VOLT:DC', 'VOLT:AC', 'CURR:DC', 'CURR:AC', 'RES', 'FRES']:
+            self.add_command(func + ':RESolution', float, 0.001)
+        self.add_command('TRIGger:DELay', float, 0.01)
+        self.add_command('TRIGger:DELay:AUTO', int, 1)
+        self.add_command('TRIGger:SOURce', str, 'imm')
+        self.add_command('TRIGger:COUNt', int, 1)
+        self.add_command('SAMPle:COUNt', int, 1)
+        self.add_command('ABORt', handler=lambda c, k, a, q: None)
+        self.add_command('INITiate', handler=lambda c, k, a, q: None)
+        self.add_command('FETCh?', float, 1.0)
+        self.add_command('READ?', float, 1.0)
+
+
+class VirtualDCPwr(VirtualInstrument):
+    "Virtual SCPI DC power supply, for scpi.dcpwr based drivers"
+
+    def __init__(self, idn='Virtual,DCPWR,0,1.0', outputs=1, **kwargs):
+        super(VirtualDCPwr, self).__init__(idn, **kwargs)
+
+        self.outputs = outputs
+        self.selected = 1
+
+        self.add_command('INSTrument:NSELect', int, 1, min=1, max=outputs,
+                handler=self._nselect)
+        for name, t, value in [
+                ('OUTPut[:STATe]', bool, False),
+                ('[SOURce:]VOLTage[:LEVel][:IMMediate][:AMPLitude]', float, 0.0),
+                ('[SOURce:]VOLTage[:LEVel]:TRIGgered[:AMPLitude]', float, 0.0),
+                ('[SOURce:]VOLTage:PROTection[:LEVel]', float, 0.0),
+                ('[SOURce:]VOLTage:PROTection:STATe', bool, True),
+                ('[SOURce:]VOLTage:RANGe', str, 'P8V'),
+                ('[SOURce:]CURRent[:LEVel][:IMMediate][:AMPLitude]', float, 1.0),
+                ('[SOURce:]CURRent[:LEVel]:TRIGgered[:AMPLitude]', float, 1.0),
+                ('[SOURce:]CURRent:PROTection[:LEVel]', float, 1.0),
+                ('[SOURce:]CURRent:PROTection:STATe', bool, False),
+                ('TRIGger:SOURce', str, 'bus'),
+                ('TRIGger:DELay', float, 0.0),
+                ('[SOURce:]VOLTage:MODE', str, 'FIX'),
+                ('[SOURce:]CURRent:MODE', str, 'FIX'),
+                ('[SOURce:]LIST:VOLTage', str, '0'),
+                ('[SOURce:]LIST:CURRent', str, '0'),
+                ('[SOURce:]LIST:DWELl', str, '0.01'),
+                ('[SOURce:]LIST:COUNt', str, '1')]:
+            self.add_command(pattern=name, type=t, value=value, handler=self._output_value)
+        self.add_command('[SOURce:]VOLTage:PROTection:CLEar', handler=lambda c, k, a, q: None)
+        self.add_command('[SOURce:]CURRent:PROTection:CLEar', handler=lambda c, k, a, q: None)
+        self.add_command('INITiate', handler=lambda c, k, a, q: None)
+        self.add_command('MEASure[:SCALar]:VOLTage[:DC]?', handler=self._measure)
+        self.add_command('MEASure[:SCALar]:CURRent[:DC]?', handler=self._measure)
+        self.add_command('FETCh:ARRay:VOLTage[:DC]?', handler=self._fetch_array)
+        self.add_command('FETCh:ARRay:CURRent[:DC]?', handler=self._fetch_array)
+
+    def _nselect(self, cmd, key, args, query):
+        if query:
+            return self.int_format.format(self.selected)
+        value = int(args)
+        if value < 1 or value > self.outputs:
+            self.command_error(-222, "Data out of range")
+            return None
+        self.selected = value
+
+    def _output_value(self, cmd, key, args, query):
+        # settings are kept per output, selected with INSTrument:NSELect
+        key = '%s@%d' % (key, self.selected)
+        if query:
+            return self.format_value(cmd, self.vals.get(key, cmd.value))
+        try:
+            self.vals[key] = self.parse_value(cmd, args)
+        except ValueError:
+            self.command_error(-224, "Illegal parameter value")
+
+    def _measure(self, cmd, key, args, query):
+        if not self.vals.get('output:state@%d' % self.selected, False):
+            return self.float_format.format(0.0)
+        if 'volt' in key:
+            value = self.vals.get('source:voltage:level:immediate:amplitude@%d' % self.selected, 0.0)
+        else:
+            value = 0.0
+        return self.float_format.format(value)
+
+    def _fetch_array(self, cmd, key, args, query):
+        # the list setpoints, as if measured at each step
+        values = self.vals.get('source:list:voltage@%d' % self.selected, '0').split(',')
+        if 'curr' in key:
+            values = ['0'] * len(values)
+        return ','.join(self.float_format.format(float(v)) for v in values)
+
+
+class VirtualScope(VirtualInstrument):
+    "Virtual oscilloscope, for agilentBaseScope based drivers"
+
+    def __init__(self, idn='AGILENT TECHNOLOGIES,MSO7104A,0,1.0', points=1000, **kwargs):
+        super(VirtualScope, self).__init__(idn, **kwargs)
+
+        self.points = points
+        self.data = None
+
+        self.add_command('CHANnel#:DISPlay', int, 1)
+        self.add_command('CHANnel#:SCALe', float, 1.0)
+        self.add_command('CHANnel#:OFFSet', float, 0.0)
+        self.add_command('CHANnel#:RANGe', float, 8.0)
+        self.add_command('CHANnel#:COUPling', str, 'DC')
+        self.add_command('CHANnel#:PROBe', float, 1.0)
+        self.add_command('TIMebase:SCALe', float, 1e-3)
+        self.add_command('TIMebase:RANGe', float, 10e-3)
+        self.add_command('TIMebase:POSition', float, 0.0)
+        self.add_command('WAVeform:BYTeorder', str, 'MSBF')
+        self.add_command('WAVeform:UNSigned', int, 1)
+        self.add_command('WAVeform:FORMat', str, 'WORD')
+        self.add_command('WAVeform:POINts', str, 'NORM')
+        self.add_command('WAVeform:SOURce', str, 'CHAN1')
+        self.add_command('SYSTem:SETup?', handler=self._setup)
+        self.add_command('WAVeform:PREamble?', handler=self._preamble)
+        self.add_command('WAVeform:DATA?', handler=self._data)
+
+    def _setup(self, cmd, key, args, query):
+        setup = ';'.join('%s %r' % (k, self.vals[k]) for k in sorted(self.vals))
+        return ivi.build_ieee_block(setup.encode('utf-8'))
+
+    def _preamble(self, cmd, key, args, query):
+        # format word, type normal, points, count, x increment, x origin,
+        # x reference, y increment, y origin, y reference
+        return "+1,+0,%d,+1,%E,%E,+0,%E,%E,+32768" % (self.points, 1e-6,
+                -self.points*1e-6/2, 1e-4, 0.0)
+
+    def _data(self, cmd, key, args, query):
+        data = self.data
+        if data is None:
+            # ramp through all codes except the hole value
+            data = b''.join(bytes(bytearray([(i >> 8) & 0xff, i & 0xff]))
+                    for i in (1 + (k * 65534) // self.points for k in range(self.points)))
+        return ivi.build_ieee_block(data)
+
+
+class VirtualModbus(object):
+    """Virtual Modbus slave with a table of holding registers, for Modbus
+    interfaces and register based drivers.  serial() returns a port for
+    ModbusRtuInstrument and serve_tcp() starts a server on the loopback
+    interface for ModbusTcpInstrument."""
+
+    def __init__(self, registers=None, unit=1):
+        self.registers = dict(registers or {})
+        self.unit = unit
+        self.log = list()
+
+    def handle_pdu(self, pdu):
+        "Process a request PDU and return the response PDU"
+        function = bytearray(pdu)[0]
+        self.log.append(bytes(pdu))
+        if function == 3:
+            start, count = struct.unpack('>HH', pdu[1:5])
+            if count < 1 or count > 125:
+                return struct.pack('BB', function | 0x80, 3)
+            values = [self.registers.get(r, 0) & 0xFFFF for r in range(start, start+count)]
+            return struct.pack('>BB%dH' % count, 3, 2*count, *values)
+        if function == 6:
+            register, value = struct.unpack('>Hh', pdu[1:5])
+            self.registers[register] = value
+            return pdu
+        if function == 16:
+            start, count, n = struct.unpack('>HHB', pdu[1:6])
+            for r, value in enumerate(struct.unpack('>%dh' % count, pdu[6:6+n]), start):
+                self.registers[r] = value
+            return pdu[:5]
+        return struct.pack('BB', function | 0x80, 1)
+
+    def serial(self):
+        "Return a serial port connected to the slave over Modbus RTU"
+        return VirtualModbusSerial(self)
+
+    def serve_tcp(self):
+        "Start a Modbus TCP server, call shutdown() and server_close() when done"
+        slave = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                f = self.request.makefile('rb')
+                while True:
+                    header = f.read(7)
+                    if len(header) < 7:
+                        break
+                    t, protocol, length, unit = struct.unpack('>HHHB', header)
+                    resp = slave.handle_pdu(f.read(length - 1))
+                    self.request.sendall(struct.pack('>HHHB', t, 0, len(resp) + 1, unit) + resp)
+
+        server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+        thread.daemon = True
+        thread.start()
+        return server
+
+
+class VirtualModbusSerial(object):
+    "Serial port for VirtualModbus"
+
+    def __init__(self, slave):
+        self.slave = slave
+        self.buffer = b''
+
+    def write(self, data):
+        unit = bytearray(data)[0]
+        if modbus.crc16(data[:-2]) != struct.unpack('<H', data[-2:])[0]:
+            return
+        if unit != self.slave.unit:
+            return
+        frame = data[0:1] + self.slave.handle_pdu(data[1:-2])
+        self.buffer += frame + struct.pack('<H', modbus.crc16(frame))
+
+    def read(self, num=1):
+        data = self.buffer[:num]
+        self.buffer = self.buffer[num:]
+        return data
+
+    def reset_input_buffer(self):
+        self.buffer = b''
+
+    def close(self):
+        pass
@@ -25,9 +25,30 @@ THE SOFTWARE.
 
 """
 
+
 from .. import ivi
 from .. import ics
 
+# name: (register, decimal config register or None)
+RegisterMap = {
+    'temperature': (100, 606),
+    'humidity': (104, 616),
+    'part_temperature': (108, 626),
+    'temperature_setpoint': (300, 606),
+    'humidity_setpoint': (319, 616),
+    'event_one_state': (2000, None),
+    'event_two_state': (2010, None),
+    'event_three_state': (2020, None),
+    'event_four_state': (2030, None),
+    'event_five_state': (2040, None),
+    'event_six_state': (2050, None),
+    'event_seven_state': (2060, None),
+    'compressor_state': (2070, None)
+}
+
+# decimal configs and temperature unit, only changed from the front panel setup menus
+ConfigRegisters = [606, 616, 626, 901]
+
 class testequityf4(ivi.IviContainer):
     "Watlow F4 controller used in TestEquity Enviromental Chambers"
 
@@ -44,244 +65,131 @@ class testequityf4(ivi.IviContainer):
         self._add_property('humidity_decimal_config', self._get_humidity_decimal_config)
         self._add_property('part_temperature_decimal_config', self._get_part_temperature_decimal_config)
         self._add_property('temperature_unit', self._get_temperature_unit_config)
-        self._temperature_decimal_config = 1 #default to 500 means 50.0degC
-        self._humidity_decimal_config = 1 #default to 500 means 50.0%RH
-        self._part_temperature_decimal_config = 1 #default to 500 means 50.0degC
-        self._temperature_unit = 1 #default to degC
+        self._add_method('read_all', self._read_all,
+                         "Read temperatures, humidity, setpoints and event states in one transaction")
+        self._register_nonvolatile.update(ConfigRegisters)
+    
+    
+    #read registers by name from the register map and scale them with their decimal config.
+    #the data and decimal config registers are read together, and the configs are cached by the register layer.
+    def _read_values(self, names):
+        regs = [RegisterMap[name] for name in names]
+        lst = [reg for reg, dec in regs] + [dec for reg, dec in regs if dec is not None]
+        values = dict(zip(lst, self._read_registers(lst)))
+        result = list()
+        for reg, dec in regs:
+            if dec is None:
+                result.append(values[reg])
+            else:
+                result.append(float(values[reg]) / 10**values[dec])
+        return result
     
+    def _write_value(self, name, value):
+        reg, dec = RegisterMap[name]
+        if dec is not None:
+            value = int(round(float(value) * 10**self._read_register(dec)))
+        self._write_register(reg, int(value))
     
-    #grab the decimal configrutions for the controller and chache them.  provide a method to change them if allowed (i.e. if someone changes the defualt config from TestEquity).
+    def _read_all(self):
+        names = sorted(RegisterMap)
+        return dict(zip(names, self._read_values(names)))
+    
+    #the decimal configurations and the UOM for temperature only change when written, so the register layer caches them.
     def _get_temperature_decimal_config(self):
-       if not self._driver_operation_simulate and not self._get_cache_valid():
-           self._temperature_decimal_config = self._read_register(606)
-           self._set_cache_valid()
-       return self._temperature_decimal_config
+        return self._read_register(606)
     
     def _get_humidity_decimal_config(self):
-       if not self._driver_operation_simulate and not self._get_cache_valid():
-           self._humidity_decimal_config = self._read_register(616)
-           self._set_cache_valid()
-       return self._humidity_decimal_config
+        return self._read_register(616)
     
     def _get_part_temperature_decimal_config(self):
-       if not self._driver_operation_simulate and not self._get_cache_valid():
-           self._part_temperature_decimal_config = self._read_register(626)
-           self._set_cache_valid()
-       return self._part_temperature_decimal_config       
+        return self._read_register(626)
     
     def _set_temperature_decimal_config(self, value):
-       value = int(value)
-       if not self._driver_operation_simulate:
-           self._write_register(606,value)
-       self._temperature_decimal_config= value
+        self._write_register(606, int(value))
 
     def _set_humidity_decimal_config(self, value):
-       value = int(value)
-       if not self._driver_operation_simulate:
-           self._write_register(616,value)
-       self._humidity_decimal_config= value    
+        self._write_register(616, int(value))
     
     def _set_part_temperature_decimal_config(self, value):
-       value = int(value)
-       if not self._driver_operation_simulate:
-           self._write_register(626,value)
-       self._part_temperature_decimal_config= value
+        self._write_register(626, int(value))
     
-    #Provide ability to read and write the config on the UOM for temperature.  Cache results to make sure things work nicely
     def _get_temperature_unit_config(self):
-       if not self._driver_operation_simulate and not self._get_cache_valid():
-           self._temperature_unit = self._read_register(901)
-           self._set_cache_valid()
-       return self._temperature_unit
+        return self._read_register(901)
        
     def _set_temperature_unit_config(self, unit_of_measure="c"):
-        self.driver_operation.invalidate_all_attributes()
         if unit_of_measure=="f":
             value = 0
         else:
             value = 1
-        value = int(value)
-        if not self._driver_operation_simulate:
-            self._write_register(901,value)
-        self._temperature_unit= value
-    
+        self._write_register(901, value)
     
     
     #_get_temperature(), _get_humidity(), and _get_part_temperature() are not cached so that the reads are accruate.    
     def _get_temperature(self):
-        if not self._driver_operation_simulate: 
-            resp=int(self._read_register(100))
-            if self._temperature_decimal_config==1:
-                temperature=float(resp)/10
-            else:
-                temperature=float(resp)
-            return temperature
-        return 0
+        return self._read_values(['temperature'])[0]
     
     def _get_humidity(self):
-        if not self._driver_operation_simulate: 
-            resp=int(self._read_register(104))
-            if self._humidity_decimal_config==1:
-                humidity=float(resp)/10
-            else:
-                humidity=float(resp)
-            return humidity
-        return 0
+        return self._read_values(['humidity'])[0]
         
     def _get_part_temperature(self):
-        if not self._driver_operation_simulate: 
-            resp=int(self._read_register(108))
-            if self._part_temperature_decimal_config==1:
-                part_temperature=float(resp)/10
-            else:
-                part_temperature=float(resp)
-            return part_temperature
-        return 0
+        return self._read_values(['part_temperature'])[0]
      
     #get the compressor state
     def _get_compressor_state(self):
-        if not self._driver_operation_simulate: 
-            resp=int(self._read_register(2070))
-            return resp
-        return 0
+        return self._read_register(2070)
     
-    #get the event 1 register state
+    #get the event register states
     def _get_event_one_state(self):
-        if not self._driver_operation_simulate: 
-            resp=int(self._read_register(2000))
-            return resp
-        return 0        
+        return self._read_register(2000)
    
-   #get the event 2 register state
     def _get_event_two_state(self):
-        if not self._driver_operation_simulate: 
-            resp=int(self._read_register(2010))
-            return resp
-        return 0
+        return self._read_register(2010)
     
-    #get the event 3 register state
     def _get_event_three_state(self):
-        if not self._driver_operation_simulate: 
-            resp=int(self._read_register(2020))
-            return resp
-        return 0  
+        return self._read_register(2020)
         
-    #get the event 4 register state
     def _get_event_four_state(self):
-        if not self._driver_operation_simulate: 
-            resp=int(self._read_register(2030))
-            return resp
-        return 0 
+        return self._read_register(2030)
 
-    #get the event 5 register state
     def _get_event_five_state(self):
-        if not self._driver_operation_simulate: 
-            resp=int(self._read_register(2040))
-            return resp
-        return 0 
-
+        return self._read_register(2040)
         
-    #get the event 6 register state
     def _get_event_six_state(self):
-        if not self._driver_operation_simulate: 
-            resp=int(self._read_register(2050))
-            return resp
-        return 0 
+        return self._read_register(2050)
     
-    #get the event 7 register state
     def _get_event_seven_state(self):
-        if not self._driver_operation_simulate: 
-            resp=int(self._read_register(2060))
-            return resp
-        return 0
+        return self._read_register(2060)
         
-    #set the event 1 register state
+    #set the event register states
     def _set_event_one_state(self, state):
-        value=int(bool(state))
-        if not self._driver_operation_simulate: 
-            self._write_register(2000, value)
-            
-                
+        self._write_register(2000, int(bool(state)))
    
-   #set the event 2 register state
     def _set_event_two_state(self, state):
-        value=int(bool(state))
-        if not self._driver_operation_simulate: 
-            self._write_register(2010, value)
-           
+        self._write_register(2010, int(bool(state)))
     
-    #set the event 3 register state
     def _set_event_three_state(self, state):
-        value=int(bool(state))
-        if not self._driver_operation_simulate: 
-            self._write_register(2020, value)
- 
+        self._write_register(2020, int(bool(state)))
         
-    #set the event 4 register state
     def _set_event_four_state(self, state):
-        value=int(bool(state))
-        if not self._driver_operation_simulate: 
-            self._write_register(2030, value)
-
+        self._write_register(2030, int(bool(state)))
 
-    #set the event 5 register state
     def _set_event_five_state(self, state):
-        value=int(bool(state))
-        if not self._driver_operation_simulate: 
-            self._write_register(2040, value)
- 
-
+        self._write_register(2040, int(bool(state)))
         
-    #set the event 6 register state
     def _set_event_six_state(self, state):
-        value=int(bool(state))
-        if not self._driver_operation_simulate: 
-            self._write_register(2050, value)
-
+        self._write_register(2050, int(bool(state)))
     
-    #set the event 7 register state
-    def _set_event_six_state(self, state):
-        value=int(bool(state))
-        if not self._driver_operation_simulate: 
-            self._write_register(2060, value)
+    def _set_event_seven_state(self, state):
+        self._write_register(2060, int(bool(state)))
             
     def _get_temperature_setpoint(self):
-        resp=int(self._read_register(300))
-        #print(resp)
-        #print(self._temperature_decimal_config)
-        if self._temperature_decimal_config==1:
-            temperature=float(resp)/10
-        else:
-            temperature=float(resp)
-        return temperature
+        return self._read_values(['temperature_setpoint'])[0]
         
     def _get_humidity_setpoint(self):
-        resp=int(self._read_register(319))
-        if self._humidity_decimal_config==1:
-            humidity=float(resp)/10
-        else:
-            humidity=float(resp)
-        return humidity
-                
-
+        return self._read_values(['humidity_setpoint'])[0]
         
     def _set_temperature_setpoint(self, value):
-        if self._temperature_decimal_config==1:
-            temperature=int(float(value)*10)
-        else:
-            temperature=int(value)        
-          
-        if not self._driver_operation_simulate: 
-            self._write_register(300, temperature)
-
-            
-            
+        self._write_value('temperature_setpoint', value)
             
     def _set_humidity_setpoint(self, value):
-        if self._humidity_decimal_config==1:
-            humidity=int(float(value)*10)
-        else:
-            humidity=int(value)        
-          
-        if not self._driver_operation_simulate: 
-            self._write_register(319, humidity)
\ No newline at end of file
+        self._write_value('humidity_setpoint', value)